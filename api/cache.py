@@ -0,0 +1,305 @@
+import hashlib
+import threading
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+GENERATION_KEY = 'api:cache:generation'
+HITS_KEY = 'api:cache:hits'
+MISSES_KEY = 'api:cache:misses'
+
+_state = threading.local()
+
+
+def _incr(key):
+    """Increment a counter in the cache, creating it if it has expired."""
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        return cache.incr(key)
+
+
+def get_generation():
+    """
+    Return the current cache generation.
+
+    Every cached response key includes the generation, so bumping it
+    invalidates all of them at once without having to find and delete keys.
+    """
+    generation = cache.get(GENERATION_KEY)
+
+    if generation is None:
+        cache.add(GENERATION_KEY, 1, None)
+        generation = cache.get(GENERATION_KEY, 1)
+
+    return generation
+
+
+def invalidate_api_cache():
+    """
+    Invalidate every cached API response.
+
+    The generation is bumped immediately and again once the surrounding
+    transaction commits, so a response built from data read before the
+    commit can't stay cached under the new generation.
+    """
+    if getattr(_state, 'suppressed', False):
+        return
+
+    _incr(GENERATION_KEY)
+    transaction.on_commit(lambda: _incr(GENERATION_KEY))
+
+
+@contextmanager
+def suppress_api_cache_invalidation():
+    """
+    Leave cached API responses alone for writes made inside the block.
+
+    Only for writes that are rolled back, such as a dry run import, since
+    nothing else will invalidate the responses they would have changed.
+    """
+    previous = getattr(_state, 'suppressed', False)
+    _state.suppressed = True
+
+    try:
+        yield
+    finally:
+        _state.suppressed = previous
+
+
+def get_cache_key(request):
+    """
+    Build the cache key for a GET request.
+
+    Keyed on API version, path and the query parameters sorted by name, so
+    `?a=1&b=2` and `?b=2&a=1` share an entry.
+
+    Arguments:
+    request -- Incoming request. (Request)
+    """
+    params = sorted(request.query_params.lists())
+    raw = f'{request.version}|{request.path}|{params}'
+    digest = hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    return f'api:cache:response:{get_generation()}:{digest}'
+
+
+def get_cache_stats():
+    """Return the number of cache hits and misses since the last reset."""
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / total if total else 0
+    }
+
+
+def reset_cache_stats():
+    cache.delete_many([HITS_KEY, MISSES_KEY])
+
+
+class CachedResponseMixin:
+    """
+    Cache `list` and `retrieve` responses for a viewset.
+
+    Only successful responses are cached. Each response carries an `X-Cache`
+    header of HIT or MISS. Entries are dropped whenever one of the models in
+    `api.signals` is written to.
+    """
+    cache_timeout = None
+
+    def get_cache_timeout(self):
+        if self.cache_timeout is not None:
+            return self.cache_timeout
+
+        return getattr(settings, 'API_CACHE_TIMEOUT', 300)
+
+    def cached_response(self, request, build_response):
+        key = get_cache_key(request)
+        data = cache.get(key)
+
+        if data is not None:
+            _incr(HITS_KEY)
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        _incr(MISSES_KEY)
+        response = build_response()
+
+        if response.status_code == 200:
+            cache.set(key, response.data, self.get_cache_timeout())
+
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, lambda: super(CachedResponseMixin, self).list(
+                request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, lambda: super(CachedResponseMixin, self).retrieve(
+                request, *args, **kwargs))
+
+
+class NotModified(Exception):
+    """Raised from `initial` to short-circuit a view with a 304."""
+    def __init__(self, response):
+        self.response = response
+
+
+class ConditionalGetMixin:
+    """
+    Answer `If-None-Match` and `If-Modified-Since` on `list` and `retrieve`.
+
+    Validators come from one aggregate over the filtered queryset: the
+    latest of `modified_fields` and the row count. When the client's copy
+    is current a 304 is returned before any serializer runs.
+
+    The ETag also includes the API cache generation, so deletes and writes
+    to related models that don't touch a `modified` column still change it,
+    and validators are cached for the rest of the generation so repeat
+    requests skip the aggregate. Both rely on every model a viewset
+    serializes being listed in `api.signals`, or on whatever writes it in
+    bulk calling `invalidate_api_cache`; a model that does neither leaves
+    ETags unchanged when it is written to.
+
+    Last-Modified is only sent for `retrieve`: removing a row from a list
+    doesn't move the latest `modified` of what's left, so `If-Modified-Since`
+    can't tell a list has changed.
+    """
+    modified_fields = ['modified']
+
+    def get_conditional_queryset(self):
+        queryset = self.filter_queryset(self.get_queryset())
+
+        if self.action == 'retrieve':
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            queryset = queryset.filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+
+        return queryset
+
+    def get_validators(self, request):
+        """
+        Return the ETag and Last-Modified values for this request, from the
+        cache when they were already worked out in this generation.
+
+        Arguments:
+        request -- Incoming request. (Request)
+        """
+        user_id = request.user.pk if request.user.is_authenticated else None
+        key = f'{get_cache_key(request)}:validators:{user_id}'
+
+        validators = cache.get(key)
+        if validators is None:
+            validators = self.build_validators(request)
+            cache.set(
+                key, validators, getattr(settings, 'API_CACHE_TIMEOUT', 300))
+
+        return validators
+
+    def build_validators(self, request):
+        """
+        Work out the ETag and Last-Modified values for this request.
+
+        Arguments:
+        request -- Incoming request. (Request)
+        """
+        queryset = self.get_conditional_queryset().order_by()
+
+        aggregates = {
+            f'latest_{i}': Max(field)
+            for i, field in enumerate(self.modified_fields)
+        }
+        aggregates['total'] = Count('pk', distinct=True)
+
+        values = queryset.aggregate(**aggregates)
+        total = values.pop('total')
+        timestamps = [value for value in values.values() if value]
+
+        last_modified = None
+        if self.action == 'retrieve' and timestamps:
+            last_modified = max(timestamps)
+
+        params = sorted(request.query_params.lists())
+        user_id = request.user.pk if request.user.is_authenticated else None
+
+        raw = (
+            f'{request.version}|{request.path}|{params}|{user_id}|'
+            f'{get_generation()}|{total}|{timestamps}'
+        )
+        etag = quote_etag(hashlib.sha1(raw.encode('utf-8')).hexdigest())
+
+        return etag, last_modified
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+
+        self.etag = self.last_modified = None
+
+        if request.method not in ('GET', 'HEAD'):
+            return
+
+        if self.action not in ('list', 'retrieve'):
+            return
+
+        # Without a conditional header there's nothing to answer early, and
+        # finalize_response works the validators out for a 200 instead
+        conditional_headers = ('HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE')
+        if not any(header in request.META for header in conditional_headers):
+            return
+
+        self.etag, self.last_modified = self.get_validators(request)
+        timestamp = None
+        if self.last_modified:
+            timestamp = int(self.last_modified.timestamp())
+
+        response = get_conditional_response(
+            request, etag=self.etag, last_modified=timestamp)
+
+        if response is not None:
+            self.set_validator_headers(response)
+            raise NotModified(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return exc.response
+
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs)
+
+        is_read = (
+            request.method in ('GET', 'HEAD') and
+            getattr(self, 'action', None) in ('list', 'retrieve')
+        )
+
+        if response.status_code == 200 and is_read:
+            if getattr(self, 'etag', None) is None:
+                self.etag, self.last_modified = self.get_validators(request)
+
+            self.set_validator_headers(response)
+
+        return response
+
+    def set_validator_headers(self, response):
+        if getattr(self, 'etag', None):
+            response['ETag'] = self.etag
+
+        if getattr(self, 'last_modified', None):
+            response['Last-Modified'] = http_date(
+                self.last_modified.timestamp())
@@ -1,5 +1,7 @@
 from django_filters import rest_framework as filters
 from awards.models import Award
+from search.models import SearchEntry
+from .search import IndexedNameFilter
 
 class AwardFilter(filters.FilterSet):
     category_name = filters.CharFilter(
@@ -7,8 +9,8 @@ class AwardFilter(filters.FilterSet):
         label='Award Category Name'
     )
 
-    player_name = filters.CharFilter(
-        field_name='player__name', lookup_expr='icontains',
+    player_name = IndexedNameFilter(
+        field_name='player__name', kind=SearchEntry.PLAYER,
         label='Player Name'
     )
 
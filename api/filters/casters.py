@@ -1,7 +1,11 @@
 from django_filters import rest_framework as filters
 from casters.models import Caster
+from search.models import SearchEntry
+from .search import IndexedNameFilter
 
 class CasterFilter(filters.FilterSet):
+    name = IndexedNameFilter(kind=SearchEntry.CASTER, label='Caster Name')
+
     is_active = filters.BooleanFilter(
         field_name='is_active', label='Is Active?')
     does_solo_casts = filters.BooleanFilter(
@@ -10,5 +14,5 @@ class CasterFilter(filters.FilterSet):
     class Meta:
         model = Caster
         fields = [
-            'is_active', 'does_solo_casts'
+            'name', 'is_active', 'does_solo_casts'
         ]
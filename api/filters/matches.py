@@ -4,6 +4,9 @@ from datetime import datetime, timedelta
 import pytz
 from django_filters import rest_framework as filters
 from matches.models import Match
+from search.models import SearchEntry
+from search.services import name_lookup
+from .search import IndexedNameFilter
 
 
 class MatchFilter(filters.FilterSet):
@@ -42,12 +45,12 @@ class MatchFilter(filters.FilterSet):
         label='Start Time Ending Range'
     )
 
-    home = filters.CharFilter(
-        field_name='home__name', lookup_expr='icontains', label='Home Team Name'
+    home = IndexedNameFilter(
+        field_name='home__name', kind=SearchEntry.TEAM, label='Home Team Name'
     )
 
-    away = filters.CharFilter(
-        field_name='away__name', lookup_expr='icontains', label='Away Team Name'
+    away = IndexedNameFilter(
+        field_name='away__name', kind=SearchEntry.TEAM, label='Away Team Name'
     )
 
     team = filters.CharFilter(
@@ -70,13 +73,13 @@ class MatchFilter(filters.FilterSet):
         label='Get matches by Player ID'
     )
 
-    winner = filters.CharFilter(
-        field_name='result__winner__name', lookup_expr='icontains',
+    winner = IndexedNameFilter(
+        field_name='result__winner__name', kind=SearchEntry.TEAM,
         label='Winning Team\'s Name'
     )
 
-    loser = filters.CharFilter(
-        field_name='result__loser__name', lookup_expr='icontains',
+    loser = IndexedNameFilter(
+        field_name='result__loser__name', kind=SearchEntry.TEAM,
         label='Losing Team\'s Name'
     )
 
@@ -239,15 +242,15 @@ class MatchFilter(filters.FilterSet):
     def get_by_team_name(self, queryset, field_name, value):
 
         return queryset.filter(
-            Q(home__name__icontains=value) |
-            Q(away__name__icontains=value)
+            name_lookup('home__name', SearchEntry.TEAM, value) |
+            name_lookup('away__name', SearchEntry.TEAM, value)
         )
 
     def get_by_dynasty_name(self, queryset, field_name, value):
 
         return queryset.filter(
-            Q(home__dynasty__name__icontains=value) |
-            Q(away__dynasty__name__icontains=value)
+            name_lookup('home__dynasty__name', SearchEntry.DYNASTY, value) |
+            name_lookup('away__dynasty__name', SearchEntry.DYNASTY, value)
         )
 
     def get_by_player_id(self, queryset, field_name, value):
@@ -279,8 +282,8 @@ class MatchFilter(filters.FilterSet):
         # Return all matches for just single team if only one valid team passed
         except ValueError:
             return queryset.filter(
-                Q(home__name__icontains=value) |
-                Q(away__name__icontains=value) 
+                name_lookup('home__name', SearchEntry.TEAM, value) |
+                name_lookup('away__name', SearchEntry.TEAM, value) 
         )
 
         # Remove extra whitespace, restore stripped values
@@ -288,8 +291,14 @@ class MatchFilter(filters.FilterSet):
         team_b = team_b.strip().replace('%2C', ',')
 
         return queryset.filter(
-            Q(home__name__icontains=team_a, away__name__icontains=team_b) |
-            Q(home__name__icontains=team_b, away__name__icontains=team_a) 
+            (
+                name_lookup('home__name', SearchEntry.TEAM, team_a) &
+                name_lookup('away__name', SearchEntry.TEAM, team_b)
+            ) |
+            (
+                name_lookup('home__name', SearchEntry.TEAM, team_b) &
+                name_lookup('away__name', SearchEntry.TEAM, team_a)
+            ) 
         ).distinct()
 
     def get_by_dynasty_names(self, queryset, field_name, value):
@@ -311,8 +320,8 @@ class MatchFilter(filters.FilterSet):
         # Return all matches for just single team if only one valid team passed
         except ValueError:
             return queryset.filter(
-                Q(home__dynasty__name__icontains=value) |
-                Q(away__dynasty__name__icontains=value) 
+                name_lookup('home__dynasty__name', SearchEntry.DYNASTY, value) |
+                name_lookup('away__dynasty__name', SearchEntry.DYNASTY, value) 
         )
 
         # Remove extra whitespace, restore stripped values
@@ -320,8 +329,14 @@ class MatchFilter(filters.FilterSet):
         dynasty_b = dynasty_b.strip().replace('%2C', ',')
 
         return queryset.filter(
-            Q(home__dynasty__name__icontains=dynasty_a, away__dynasty__name__icontains=dynasty_b) |
-            Q(home__dynasty__name__icontains=dynasty_b, away__dynasty__name__icontains=dynasty_a) 
+            (
+                name_lookup('home__dynasty__name', SearchEntry.DYNASTY, dynasty_a) &
+                name_lookup('away__dynasty__name', SearchEntry.DYNASTY, dynasty_b)
+            ) |
+            (
+                name_lookup('home__dynasty__name', SearchEntry.DYNASTY, dynasty_b) &
+                name_lookup('away__dynasty__name', SearchEntry.DYNASTY, dynasty_a)
+            ) 
         ).distinct()
 
     def get_round_is_current(self, queryset, field_name, value):
@@ -342,3 +357,4 @@ class MatchFilter(filters.FilterSet):
             'status', 'league', 'season', 'season_is_active', 'circuit',
             'group', 'region', 'tier'
         ]
+
@@ -1,15 +1,17 @@
 from django_filters import rest_framework as filters
 from players.models import Player
+from search.models import SearchEntry
+from .search import IndexedNameFilter
 
 class PlayerFilter(filters.FilterSet):
-    name = filters.CharFilter(lookup_expr='icontains', label='Player Name')
+    name = IndexedNameFilter(kind=SearchEntry.PLAYER, label='Player Name')
     discord_username = filters.CharFilter(
         lookup_expr='icontains', label='Discord Username')
     twitch_username = filters.CharFilter(
         lookup_expr='icontains', label='Twitch Username')
     
-    team = filters.CharFilter(
-        field_name='teams__name', lookup_expr='icontains', label='Team Name')
+    team = IndexedNameFilter(
+        field_name='teams__name', kind=SearchEntry.TEAM, label='Team Name')
     
     league = filters.CharFilter(
         field_name='teams__circuit__season__league__name',
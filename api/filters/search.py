@@ -0,0 +1,28 @@
+from django_filters import rest_framework as filters
+from django_filters.constants import EMPTY_VALUES
+from search.services import name_lookup
+
+
+class IndexedNameFilter(filters.CharFilter):
+    """
+    Filter on a name containing the value, through the search index.
+
+    Works like a CharFilter with `lookup_expr='icontains'` on `field_name`,
+    which must end at the `name` of a Player, Team, Dynasty or Caster whose
+    SearchEntry kind is passed as `kind`.
+    """
+    def __init__(self, *args, kind, include_aliases=False, **kwargs):
+        kwargs.setdefault('lookup_expr', 'icontains')
+        super().__init__(*args, **kwargs)
+
+        self.kind = kind
+        self.include_aliases = include_aliases
+
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+
+        qs = qs.filter(name_lookup(
+            self.field_name, self.kind, value, self.include_aliases))
+
+        return qs.distinct() if self.distinct else qs
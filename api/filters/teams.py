@@ -3,14 +3,16 @@ from django.utils import timezone
 from datetime import datetime, timedelta
 import pytz
 from django_filters import rest_framework as filters
+from search.models import SearchEntry
 from teams.models import Dynasty, Team
+from .search import IndexedNameFilter
 
 class DynastyFilter(filters.FilterSet):
-    name = filters.CharFilter(lookup_expr='icontains')
+    name = IndexedNameFilter(kind=SearchEntry.DYNASTY)
 
-    team = filters.CharFilter(
+    team = IndexedNameFilter(
         field_name='teams__name',
-        lookup_expr='icontains',
+        kind=SearchEntry.TEAM,
         label='Team Name'
     )
     class Meta:
@@ -19,7 +21,7 @@ class DynastyFilter(filters.FilterSet):
 
 
 class TeamFilter(filters.FilterSet):
-    name = filters.CharFilter(lookup_expr='icontains', label='Team Name')
+    name = IndexedNameFilter(kind=SearchEntry.TEAM, label='Team Name')
     
     league = filters.CharFilter(
         field_name='circuit__season__league__name',
@@ -51,9 +53,9 @@ class TeamFilter(filters.FilterSet):
         label='Circuit ID Number'
     )
 
-    dynasty = filters.CharFilter(
+    dynasty = IndexedNameFilter(
         field_name='dynasty__name',
-        lookup_expr='icontains',
+        kind=SearchEntry.DYNASTY,
         label='Dynasty Name'
     )
 
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.cache import get_cache_stats, reset_cache_stats
+
+class Command(BaseCommand):
+    help = 'Show hit and miss counts for the API response cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Reset the counters after displaying them')
+
+    def handle(self, *args, **options):
+        stats = get_cache_stats()
+
+        self.stdout.write(self.style.SUCCESS(f'Hits {stats["hits"]}'))
+        self.stdout.write(self.style.SUCCESS(f'Misses {stats["misses"]}'))
+        self.stdout.write(
+            self.style.SUCCESS(f'Hit Rate {stats["hit_rate"]:.1%}'))
+
+        if options['reset']:
+            reset_cache_stats()
+            self.stdout.write(self.style.SUCCESS('Counters reset'))
@@ -1,6 +1,233 @@
+import base64
+import datetime
+import json
+from django.core.exceptions import FieldDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Model, Q
+from django.db.models.constants import LOOKUP_SEP
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """JSON encoder that keeps full microsecond precision on datetimes."""
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+
+        return super().default(o)
+
 
 class StandardResultsSetPagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination with an opt-in keyset mode.
+
+    Passing `?cursor=` (empty for the first page) switches to keyset
+    pagination: each page filters on the last row of the previous one using
+    the view's own ordering, so deep pages cost the same as the first and no
+    COUNT query is run. Responses in this mode only contain `next` and
+    `results`.
+    """
     page_size_query_param = 'page_size'
     max_page_size = 1000
     default_limit = 10
+
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+
+        if self.cursor_query_param in request.query_params:
+            self.keyset = get_keyset(queryset)
+
+        if self.keyset is None:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.display_page_controls = False
+
+        queryset = queryset.order_by(
+            *[key.order_expression() for key in self.keyset])
+
+        cursor = request.query_params[self.cursor_query_param]
+        if cursor:
+            queryset = queryset.filter(self.after(self.decode_cursor(cursor)))
+
+        results = list(queryset[:self.limit + 1])
+        self.has_next = len(results) > self.limit
+
+        results = results[:self.limit]
+        self.last_values = None
+        if results:
+            self.last_values = [key.value(results[-1]) for key in self.keyset]
+
+        return results
+
+    def get_paginated_response(self, data):
+        if self.keyset is None:
+            return super().get_paginated_response(data)
+
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_next_link(self):
+        if self.keyset is None:
+            return super().get_next_link()
+
+        if not self.has_next:
+            return None
+
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.offset_query_param)
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.last_values))
+
+    def encode_cursor(self, values):
+        data = json.dumps(values, cls=CursorEncoder).encode('utf-8')
+        return base64.urlsafe_b64encode(data).decode('ascii')
+
+    def decode_cursor(self, cursor):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            if len(values) != len(self.keyset):
+                raise ValueError
+
+            return [
+                key.field.to_python(value) if value is not None else None
+                for key, value in zip(self.keyset, values)
+            ]
+
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def after(self, values):
+        """
+        Build the filter matching every row that sorts after `values`.
+
+        For an ordering (a, b, id) this is a > x OR (a = x AND b > y) OR
+        (a = x AND b = y AND id > z), with NULLs handled explicitly since they
+        can't be compared with > or <.
+        """
+        condition = Q(pk__in=[])
+        equal = Q()
+
+        for key, value in zip(self.keyset, values):
+            condition |= equal & key.after(value)
+            equal &= key.equals(value)
+
+        return condition
+
+
+class KeysetField:
+    """
+    One column of a keyset ordering.
+
+    NULLs are placed first when ascending and last when descending, which is
+    MySQL's default, so pages come back in the same order as offset paging.
+
+    Arguments:
+    path -- Lookup path to order by, e.g. `round__round_number`. (str)
+    field -- Model field at the end of the path. (Field)
+    descending -- Whether the ordering is reversed. (bool)
+    nullable -- Whether the path can resolve to NULL. (bool)
+    """
+    def __init__(self, path, field, descending, nullable):
+        self.path = path
+        self.field = field
+        self.descending = descending
+        self.nullable = nullable
+
+    def order_expression(self):
+        if self.descending:
+            return F(self.path).desc(nulls_last=self.nullable or None)
+
+        return F(self.path).asc(nulls_first=self.nullable or None)
+
+    def value(self, obj):
+        for name in self.path.split(LOOKUP_SEP):
+            obj = getattr(obj, name)
+            if obj is None:
+                return None
+
+        if isinstance(obj, Model):
+            return obj.pk
+
+        return obj
+
+    def equals(self, value):
+        if value is None:
+            return Q(**{f'{self.path}__isnull': True})
+
+        return Q(**{self.path: value})
+
+    def after(self, value):
+        if self.descending:
+            if value is None:
+                return Q(pk__in=[])
+
+            condition = Q(**{f'{self.path}__lt': value})
+            if self.nullable:
+                condition |= Q(**{f'{self.path}__isnull': True})
+
+            return condition
+
+        if value is None:
+            return Q(**{f'{self.path}__isnull': False})
+
+        return Q(**{f'{self.path}__gt': value})
+
+
+def get_keyset(queryset):
+    """
+    Return the KeysetFields for a queryset's ordering.
+
+    The primary key is appended as a tie breaker when the ordering doesn't
+    already end on it. Returns None if the ordering can't be expressed as a
+    keyset, e.g. when ordering by an annotation or expression.
+
+    Arguments:
+    queryset -- Queryset as it would be passed to the paginator. (QuerySet)
+    """
+    model = queryset.model
+    ordering = list(queryset.query.order_by or model._meta.ordering)
+    pk_name = model._meta.pk.name
+
+    if not ordering or ordering[-1] not in ('pk', '-pk', pk_name, f'-{pk_name}'):
+        ordering.append('pk')
+
+    keyset = []
+
+    for item in ordering:
+        if not isinstance(item, str) or item == '?':
+            return None
+
+        descending = item.startswith('-')
+        path = item.lstrip('-')
+        if path == 'pk':
+            path = pk_name
+
+        current = model
+        nullable = False
+        field = None
+
+        try:
+            for name in path.split(LOOKUP_SEP):
+                if current is None:
+                    return None
+
+                field = current._meta.get_field(name)
+                nullable = nullable or field.null
+                current = field.related_model
+
+        except FieldDoesNotExist:
+            return None
+
+        if field.related_model:
+            field = field.target_field
+
+        keyset.append(KeysetField(path, field, descending, nullable))
+
+    return keyset
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from beegame.models import Playing, Release
+from beegame.models import Playing, PlayingRollup, Release
 
 class PlayingSerializer(serializers.ModelSerializer):
     
@@ -12,6 +12,16 @@ class PlayingSerializer(serializers.ModelSerializer):
             'quickplay_total', 'custom_total'
         ]
 
+class PlayingRollupSerializer(serializers.ModelSerializer):
+    
+    platform = serializers.CharField(source='get_platform_display')
+
+    class Meta:
+        model = PlayingRollup
+        fields = [
+            'start', 'platform', 'samples', 'minimum', 'maximum', 'average'
+        ]
+
 class ReleaseSerializer(serializers.ModelSerializer):
     
     class Meta:
@@ -0,0 +1,131 @@
+from rest_framework import serializers
+
+
+def _split_param(request, name):
+    """Return the comma separated values of a query parameter as a set."""
+    values = set()
+
+    for value in request.query_params.getlist(name):
+        values.update(item.strip() for item in value.split(',') if item.strip())
+
+    return values
+
+
+class FieldOptions:
+    """
+    Which fields a caller asked for with `?fields=`, `?omit=` and `?expand=`.
+
+    `fields` and `omit` take top level field names. `expand` takes relation
+    names, using dots for nested relations (`home.members`). Without
+    `expand` every relation is nested as before; with it, only the listed
+    relations are nested and the rest collapse to their ids.
+
+    Arguments:
+    fields -- Field names to include, None for all. (set) (optional)
+    omit -- Field names to leave out. (set) (optional)
+    expand -- Relation paths to nest, None for all. (set) (optional)
+    """
+    def __init__(self, fields=None, omit=None, expand=None):
+        self.fields = fields
+        self.omit = omit or set()
+        self.expand = expand
+
+    @classmethod
+    def from_request(cls, request):
+        """Read options from a GET request's query parameters."""
+        if request is None or request.method != 'GET':
+            return cls()
+
+        params = request.query_params
+        fields = _split_param(request, 'fields') if 'fields' in params else None
+        expand = _split_param(request, 'expand') if 'expand' in params else None
+
+        return cls(fields, _split_param(request, 'omit'), expand)
+
+    def is_default(self):
+        """Return True if nothing was trimmed or collapsed."""
+        return self.fields is None and not self.omit and self.expand is None
+
+    def wants(self, name):
+        """Return True if the top level field `name` is included."""
+        if name in self.omit:
+            return False
+
+        return self.fields is None or name in self.fields
+
+    def expands(self, path):
+        """Return True if relation `path` (e.g. `home.members`) is nested."""
+        if not self.wants(path.split('.')[0]):
+            return False
+
+        if self.expand is None:
+            return True
+
+        return any(
+            item == path or item.startswith(f'{path}.')
+            for item in self.expand
+        )
+
+    def nested(self, name):
+        """Return the options that apply inside relation `name`."""
+        prefix = f'{name}.'
+        omit = {item[len(prefix):] for item in self.omit if item.startswith(prefix)}
+
+        expand = None
+        if self.expand is not None:
+            expand = {
+                item[len(prefix):] for item in self.expand
+                if item.startswith(prefix)
+            }
+
+        return FieldOptions(omit=omit, expand=expand)
+
+
+class DynamicFieldsMixin:
+    """
+    Let callers trim a serializer's output with `FieldOptions`.
+
+    `expandable_fields` maps relation field names to a callable returning the
+    field to use when the relation isn't expanded, or None to leave it out.
+    Options are read from the request in the serializer context unless passed
+    in as `field_options`, which is how nested serializers receive theirs.
+    """
+    expandable_fields = {}
+
+    def __init__(self, *args, field_options=None, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        if field_options is None:
+            field_options = FieldOptions.from_request(
+                self._context.get('request'))
+
+        self.field_options = field_options
+
+        if not field_options.is_default():
+            self.apply_field_options(field_options)
+
+    def apply_field_options(self, options):
+        for name in list(self.fields):
+            if not options.wants(name):
+                self.fields.pop(name)
+
+            elif name not in self.expandable_fields:
+                continue
+
+            elif not options.expands(name):
+                collapsed = self.expandable_fields[name]
+
+                if collapsed is None:
+                    self.fields.pop(name)
+                else:
+                    self.fields[name] = collapsed()
+
+            elif isinstance(self.fields[name], DynamicFieldsMixin):
+                field = self.fields[name]
+                kwargs = dict(field._kwargs, field_options=options.nested(name))
+                self.fields[name] = field.__class__(*field._args, **kwargs)
+
+
+def collapsed_pk(**kwargs):
+    """Return a factory for a read only primary key field."""
+    return lambda: serializers.PrimaryKeyRelatedField(read_only=True, **kwargs)
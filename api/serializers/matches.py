@@ -1,9 +1,13 @@
 from rest_framework import serializers
+from rest_framework.reverse import reverse
 from casters.models import Caster
 from matches.models import (
-    Game, Match, Result, Set, SetLog, PlayerMapping, TeamMapping)
+    Game, Match, Result, ResultSubmission, Set, SetLog, PlayerMapping,
+    TeamMapping)
 from matches.permissions import can_create_match, can_create_result
+from matches.services import generate_games
 from teams.models import Team
+from .dynamic import DynamicFieldsMixin, collapsed_pk
 
 class MatchPlayerSerializer(serializers.ModelSerializer):
     
@@ -72,12 +76,18 @@ class SetSerializer(serializers.ModelSerializer):
 
 class SetDetailLogSerializer(serializers.ModelSerializer):
     
+    url = serializers.SerializerMethodField()
+
     class Meta:
         model = SetLog
         fields = [
-            'id', 'filename', 'body'
+            'id', 'filename', 'size', 'url'
         ]
 
+    def get_url(self, obj):
+        return reverse(
+            'set-log', args=[obj.set_id], request=self.context.get('request'))
+
 class SetDetailSerializer(serializers.ModelSerializer):
     
     winner = MatchTeamSummary()
@@ -96,6 +106,8 @@ class SetDetailSerializer(serializers.ModelSerializer):
 ################
 class ResultSetLogSerializer(serializers.ModelSerializer):
     
+    body = serializers.JSONField()
+
     class Meta:
         model = SetLog
         fields = [
@@ -196,6 +208,7 @@ class ResultSerializer(serializers.ModelSerializer):
         for data in team_mappings_data:
             TeamMapping.objects.create(result=result, **data)
         
+        logged_sets = []
         for data in sets_data:
             
             log_data = None
@@ -206,7 +219,10 @@ class ResultSerializer(serializers.ModelSerializer):
             
             if log_data:
                 SetLog.objects.create(set=set, **log_data)
-                set.generate_games()
+                logged_sets.append(set)
+
+        # Build every set's games at once
+        generate_games(logged_sets)
     
         return result
     
@@ -218,7 +234,12 @@ class ResultSerializer(serializers.ModelSerializer):
         - Set winner & loser must be same as teams associated with Match
         """
         teams = [data['match'].home, data['match'].away]
-        user = self.context['request'].user
+
+        # Queued submissions are validated again by a worker with no request
+        if 'user' in self.context:
+            user = self.context['user']
+        else:
+            user = self.context['request'].user
 
         has_permission, error = can_create_result(
             data['match'], user, return_error_msg=True)
@@ -259,6 +280,34 @@ class ResultSerializer(serializers.ModelSerializer):
         ]
 
 
+class ResultSubmissionSerializer(serializers.ModelSerializer):
+
+    status_url = serializers.SerializerMethodField()
+    result_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ResultSubmission
+        fields = [
+            'id', 'match', 'status', 'attempts', 'error', 'result', 'created',
+            'modified', 'status_url', 'result_url'
+        ]
+
+    def get_status_url(self, obj):
+        return reverse(
+            'results-submission', kwargs={'submission_id': obj.id},
+            request=self.context.get('request')
+        )
+
+    def get_result_url(self, obj):
+        if not obj.result_id:
+            return None
+
+        return reverse(
+            'results-detail', args=[obj.result_id],
+            request=self.context.get('request')
+        )
+
+
 class ResultDetailSetGameSerializer(serializers.ModelSerializer):
     
     winner = MatchTeamSummary()
@@ -271,13 +320,27 @@ class ResultDetailSetGameSerializer(serializers.ModelSerializer):
             'duration'
         ]
 
+class ResultDetailSetLogSerializer(serializers.ModelSerializer):
+    
+    url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = SetLog
+        fields = [
+            'id', 'filename', 'size', 'url'
+        ]
+
+    def get_url(self, obj):
+        return reverse(
+            'set-log', args=[obj.set_id], request=self.context.get('request'))
+
 class ResultDetailSetSerializer(serializers.ModelSerializer):
     
     winner = serializers.PrimaryKeyRelatedField(read_only=True)
     loser = serializers.PrimaryKeyRelatedField(read_only=True)
 
     games = ResultDetailSetGameSerializer(many=True, read_only=True)
-    log = ResultSetLogSerializer(read_only=True)
+    log = ResultDetailSetLogSerializer(read_only=True)
 
     class Meta:
         model = Set
@@ -349,7 +412,12 @@ class MatchGroupSerializer(serializers.ModelSerializer):
         model = Group
         fields = ['id', 'name', 'number']
 
-class MatchTeamSerializer(serializers.ModelSerializer):
+class MatchTeamSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+
+    expandable_fields = {
+        'members': None,
+        'group': collapsed_pk(),
+    }
 
     members = MatchPlayerSerializer(many=True, read_only=True)
     group = MatchGroupSerializer(read_only=True)
@@ -393,8 +461,23 @@ class MatchResultSerializer(serializers.ModelSerializer):
             'sets_total'
         ]
                 
-class MatchSerializer(serializers.ModelSerializer):
-    
+class MatchSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """
+    Supports `?fields=`, `?omit=` and `?expand=`, see `FieldOptions`.
+    Relations left out of `expand` are returned as ids, team members are
+    left out unless `home.members` or `away.members` is expanded.
+    """
+    expandable_fields = {
+        'home': collapsed_pk(),
+        'away': collapsed_pk(),
+        'circuit': collapsed_pk(),
+        'round': collapsed_pk(),
+        'group': collapsed_pk(),
+        'primary_caster': collapsed_pk(),
+        'secondary_casters': collapsed_pk(many=True),
+        'result': collapsed_pk(allow_null=True),
+    }
+
     circuit = MatchCircuitSerializer()
     home = MatchTeamSerializer()
     away = MatchTeamSerializer()
@@ -0,0 +1,9 @@
+from rest_framework import serializers
+
+class SearchResultSerializer(serializers.Serializer):
+    
+    kind = serializers.CharField()
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    matched = serializers.CharField()
+    score = serializers.FloatField()
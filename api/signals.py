@@ -0,0 +1,35 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from awards.models import Award, Stat
+from casters.models import Caster
+from leagues.models import Circuit, Group, League, Round, Season
+from matches.models import Match, Result, Set
+from players.models import Alias, Player
+from teams.models import Team
+from .cache import invalidate_api_cache
+
+# Writes to any of these models drop every cached API response
+CACHE_INVALIDATING_MODELS = [
+    Match, Result, Set, Team, Player, Alias, Circuit, Group, Round, League,
+    Season, Caster, Award, Stat
+]
+
+
+def invalidate_cached_responses(sender, **kwargs):
+    invalidate_api_cache()
+
+
+def invalidate_cached_responses_m2m(sender, action, **kwargs):
+    if action.startswith('post_'):
+        invalidate_api_cache()
+
+
+for model in CACHE_INVALIDATING_MODELS:
+    post_save.connect(invalidate_cached_responses, sender=model)
+    post_delete.connect(invalidate_cached_responses, sender=model)
+
+M2M_THROUGH_MODELS = [
+    Team.members.through, Match.secondary_casters.through, Award.stats.through
+]
+
+for through in M2M_THROUGH_MODELS:
+    m2m_changed.connect(invalidate_cached_responses_m2m, sender=through)
@@ -83,6 +83,16 @@ class BuzzClient:
             url, data=data, method=method, expect_errors=expect_errors
         )
 
+    def search(self, params, expect_errors=False):
+        url = f'{self.API_BASE}/search/?{params}&format=json'
+        return self.request(url, expect_errors=expect_errors)
+
+    def submit_result(self, data, expect_errors=False):
+        url = f'{self.API_BASE}/results/submit/?format=json'
+        return self.request(
+            url, data=data, method='POST', expect_errors=expect_errors
+        )
+
     def teams(self, params, data=None, method='GET', expect_errors=False):
         
         url = f'{self.API_BASE}/teams/?{params}&format=json'
@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+from pytest import mark
+from django.utils import timezone
+from beegame.models import PlayingRollup
+
+
+@mark.django_db
+def test_get_playing_series(django_app):
+    """
+    Get hourly or daily player count rollups within a range.
+    """
+    start = datetime(2021, 3, 1, tzinfo=timezone.utc)
+
+    for hour in range(48):
+        PlayingRollup.objects.create(
+            bucket=PlayingRollup.HOUR, platform='ST',
+            start=start + timedelta(hours=hour), samples=12, minimum=hour,
+            maximum=hour + 10, average=hour + 5
+        )
+
+    PlayingRollup.objects.create(
+        bucket=PlayingRollup.DAY, platform='ST', start=start, samples=288,
+        minimum=0, maximum=33, average=16.5
+    )
+
+    resp = django_app.get(
+        '/playing/series/?bucket=hour&from=2021-03-01T10:00:00Z'
+        '&to=2021-03-01T12:00:00Z&format=json'
+    )
+    assert [entry['minimum'] for entry in resp.json['results']] == [10, 11, 12]
+    assert resp.json['results'][0]['platform'] == 'Steam'
+
+    resp = django_app.get(
+        '/playing/series/?bucket=day&from=2021-02-01&to=2021-03-31&format=json')
+    assert resp.json['results'] == [{
+        'start': '2021-03-01T00:00:00Z', 'platform': 'Steam', 'samples': 288,
+        'minimum': 0, 'maximum': 33, 'average': 16.5
+    }]
+
+    resp = django_app.get(
+        '/playing/series/?bucket=day&from=2021-02-01&platform=SW&format=json')
+    assert resp.json['results'] == []
+
+
+@mark.django_db
+def test_get_playing_series_bad_params(django_app):
+    django_app.get('/playing/series/?bucket=week&format=json', status=400)
+    django_app.get('/playing/series/?from=yesterday&format=json', status=400)
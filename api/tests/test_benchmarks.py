@@ -0,0 +1,323 @@
+"""
+Query count, row count and latency budgets for the API endpoints.
+
+Skipped unless BUZZ_BENCHMARK is set, since seeding a season takes a while:
+
+    BUZZ_BENCHMARK=1 pytest api/tests/test_benchmarks.py
+
+Optional settings:
+
+    BUZZ_BENCHMARK_SCALE   multiplier for the seeded season size (default 1)
+    BUZZ_BENCHMARK_RUNS    timed requests per endpoint (default 20)
+    BUZZ_BENCHMARK_REPORT  path to also write the measurements to as JSON
+
+Each case fails if it issues more queries, reads more rows or has a slower
+p95 than its budget. Query and row budgets catch N+1 regressions regardless
+of machine speed; latency budgets are deliberately loose.
+"""
+import itertools
+import json
+import os
+import random
+import time
+from datetime import timedelta
+from faker import Faker
+from pytest import fixture, mark, param
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from casters.tests.factories import CasterFactory
+from leagues.models import Circuit
+from leagues.tests.factories import (
+    CircuitFactory, GroupFactory, SeasonFactory)
+from matches.models import Game, Match
+from matches.services import bulk_create_set_logs
+from matches.signals import defer_standings_updates
+from matches.tests.factories import (
+    GameFactory, MatchFactory, ResultFactory, SetFactory, SetLogFactory)
+from players.tests.factories import PlayerFactory
+from teams.tests.factories import DynastyFactory, TeamFactory
+
+pytestmark = mark.skipif(
+    not os.environ.get('BUZZ_BENCHMARK'),
+    reason='Set BUZZ_BENCHMARK=1 to run the benchmark suite'
+)
+
+SCALE = float(os.environ.get('BUZZ_BENCHMARK_SCALE', 1))
+RUNS = int(os.environ.get('BUZZ_BENCHMARK_RUNS', 20))
+
+NUM_CIRCUITS = 4
+TEAMS_PER_CIRCUIT = max(4, int(50 * SCALE))
+MEMBERS_PER_TEAM = 4
+NUM_ROUNDS = 15
+GROUPS_PER_CIRCUIT = 2
+
+# (name, url, max queries, max rows, max p95 milliseconds)
+#
+# Query and row budgets are for the default scale.
+CASES = [
+    ('leagues', '/leagues/', 4, 10, 250),
+    ('seasons', '/seasons/', 4, 30, 250),
+    ('circuits', '/circuits/', 8, 1300, 750),
+    ('groups', '/groups/', 4, 1300, 750),
+    ('rounds', '/rounds/', 3, 1300, 250),
+    ('matches', '/matches/', 11, 180, 250),
+    ('matches page 100', '/matches/?limit=100', 11, 1750, 1000),
+    ('matches deep offset', '/matches/?offset=1400', 11, 180, 250),
+    ('matches cursor', '/matches/?cursor=', 10, 200, 250),
+    ('matches current round', '/matches/?round_is_current=true', 11, 180, 250),
+    ('matches by circuit', '/matches/?circuit={circuit}', 11, 180, 250),
+    ('matches by team', '/matches/?team_id={team}', 11, 180, 250),
+    ('matches awaiting results', '/matches/?awaiting_results=true', 11, 180, 250),
+    (
+        'matches slim',
+        '/matches/?limit=200&fields=id,start_time,home,away&expand=',
+        3, 250, 250
+    ),
+    ('match detail', '/matches/{match}/', 10, 20, 250),
+    ('results', '/results/', 12, 725, 500),
+    ('result detail', '/results/{result}/', 10, 110, 250),
+    ('sets', '/sets/', 7, 310, 250),
+    ('games', '/games/', 5, 90, 250),
+    ('teams', '/teams/', 4, 70, 250),
+    ('teams by circuit', '/teams/?circuit={circuit}', 4, 70, 250),
+    ('team detail', '/teams/{team}/', 25, 130, 250),
+    ('dynasties', '/dynasties/', 3, 130, 250),
+    ('players', '/players/', 6, 15, 250),
+    ('player detail', '/players/{player}/', 7, 10, 250),
+    ('casters', '/casters/', 2, 15, 250),
+    ('search', '/search/?q=benchmark player 12', 5, 100, 250),
+    ('players by name', '/players/?name=player 12', 8, 40, 250),
+]
+
+# Open N+1 regressions, not accepted baselines. These endpoints still load
+# each team's circuit and season, and each set's games and log, one row at
+# a time; their budgets above are what they should issue once prefetched.
+# Queries issued at the default scale when last measured are kept here so
+# the size of each problem is on record. Strict xfail, so fixing one fails
+# the suite until its entry is removed. Remove entries only by fixing them.
+N_PLUS_ONE_CASES = {
+    'results': 473,
+    'sets': 206,
+    'result detail': 77,
+    'games': 62,
+}
+
+_measurements = []
+_player_numbers = itertools.count(1)
+
+
+def _player():
+    """Create a Player with a name and username that can't collide."""
+    number = next(_player_numbers)
+
+    return PlayerFactory(
+        name=f'Benchmark Player {number}',
+        user__username=f'benchmark_{number}@example.com'
+    )
+
+
+def _seed_season():
+    """
+    Create an active season of circuits, teams, matches, results, sets,
+    games and logs. Returns ids used to fill in detail URLs.
+    """
+    random.seed(1)
+    Faker.seed(1)
+
+    # Start far enough back that the played rounds are in the past and the
+    # last three are still to come
+    season = SeasonFactory(
+        num_regular_rounds=NUM_ROUNDS - 3, num_tournament_rounds=3,
+        regular_start=timezone.now() - timedelta(weeks=NUM_ROUNDS - 2))
+    rounds = list(season.rounds.order_by('round_number'))
+    season.current_round = rounds[-3]
+    season.save()
+
+    casters = [CasterFactory(player=_player()) for _ in range(10)]
+    dynasties = DynastyFactory.create_batch(20)
+    past_rounds = rounds[:-3]
+
+    for index in range(NUM_CIRCUITS):
+        region, _ = Circuit.REGION_CHOICES[index % len(Circuit.REGION_CHOICES)]
+        circuit = CircuitFactory(season=season, region=region, tier=str(index + 1))
+        groups = [
+            GroupFactory(circuit=circuit, number=n)
+            for n in range(1, GROUPS_PER_CIRCUIT + 1)
+        ]
+
+        teams = [
+            TeamFactory(
+                circuit=circuit,
+                group=groups[n % len(groups)],
+                dynasty=random.choice(dynasties + [None]),
+                captain=_player(),
+                members=[_player() for _ in range(MEMBERS_PER_TEAM - 1)]
+            )
+            for n in range(TEAMS_PER_CIRCUIT)
+        ]
+
+        sets = []
+
+        for game_round in rounds:
+            random.shuffle(teams)
+
+            for pairing, (home, away) in enumerate(zip(teams[::2], teams[1::2])):
+                match = MatchFactory(
+                    circuit=circuit, round=game_round, home=home, away=away,
+                    group=home.group,
+                    start_time=season.regular_start + timedelta(
+                        weeks=int(game_round.round_number),
+                        hours=random.randrange(144)),
+                    primary_caster=random.choice(casters + [None] * 3)
+                )
+
+                # One match a round goes unreported, so it's awaiting results
+                if game_round not in past_rounds or pairing == 0:
+                    continue
+
+                winner, loser = random.sample([home, away], 2)
+                result = ResultFactory(match=match, winner=winner, loser=loser)
+
+                for number in range(1, random.choice([2, 3]) + 1):
+                    set_winner, set_loser = random.sample([winner, loser], 2)
+                    sets.append(SetFactory(
+                        result=result, number=number, winner=set_winner,
+                        loser=set_loser
+                    ))
+
+        Game.objects.bulk_create([
+            GameFactory.build(set=game_set, number=number)
+            for game_set in sets for number in range(1, 4)
+        ])
+        bulk_create_set_logs([
+            SetLogFactory.build(set=game_set) for game_set in sets
+        ])
+
+    # Keep the awaiting results case measuring something
+    assert Match.objects.filter(
+        result__isnull=True, start_time__lte=timezone.now()).exists()
+
+    match = Match.objects.filter(result__isnull=False).order_by('id').first()
+
+    return {
+        'circuit': match.circuit_id,
+        'match': match.id,
+        'result': match.result.id,
+        'team': match.home_id,
+        'player': match.home.captain_id,
+    }
+
+
+@fixture(scope='module')
+def season(django_db_setup, django_db_blocker, request):
+    """Seed once for the module and roll everything back afterwards."""
+    with django_db_blocker.unblock():
+        with transaction.atomic():
+            with defer_standings_updates():
+                ids = _seed_season()
+
+            yield ids
+
+            transaction.set_rollback(True)
+
+    _report(request.config)
+
+
+def _count_rows(queries):
+    """Re-run each captured SELECT as a COUNT to total the rows it read."""
+    rows = 0
+
+    with connection.cursor() as cursor:
+        for query in queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+
+            cursor.execute(f'SELECT COUNT(*) FROM ({sql})')
+            rows += cursor.fetchone()[0]
+
+    return rows
+
+
+def _percentile(timings, percent):
+    timings = sorted(timings)
+    index = max(0, int(round(percent / 100 * len(timings))) - 1)
+    return timings[index]
+
+
+def _report(config):
+    reporter = config.pluginmanager.get_plugin('terminalreporter')
+    capture = config.pluginmanager.get_plugin('capturemanager')
+
+    if reporter and capture and _measurements:
+        with capture.global_and_fixture_disabled():
+            reporter.write_line('')
+            reporter.write_line(
+                f'{"endpoint":<28}{"queries":>8}{"rows":>8}'
+                f'{"p50 ms":>9}{"p95 ms":>9}'
+            )
+
+            for entry in _measurements:
+                flag = '  N+1' if entry['name'] in N_PLUS_ONE_CASES else ''
+                reporter.write_line(
+                    f'{entry["name"]:<28}{entry["queries"]:>8}'
+                    f'{entry["rows"]:>8}{entry["p50_ms"]:>9.1f}'
+                    f'{entry["p95_ms"]:>9.1f}{flag}'
+                )
+
+    path = os.environ.get('BUZZ_BENCHMARK_REPORT')
+    if path:
+        with open(path, 'w') as report:
+            json.dump(_measurements, report, indent=2)
+
+
+@mark.django_db
+@mark.parametrize('name,url,max_queries,max_rows,max_p95_ms', [
+    param(*case, id=case[0], marks=[
+        mark.xfail(
+            reason=(
+                f'Open N+1 regression: {N_PLUS_ONE_CASES[case[0]]} queries '
+                f'against a budget of {case[2]}'),
+            strict=True)
+    ] if case[0] in N_PLUS_ONE_CASES else [])
+    for case in CASES
+])
+def test_endpoint_budget(
+    django_app, season, name, url, max_queries, max_rows, max_p95_ms):
+    url = url.format(**season)
+    url += ('&' if '?' in url else '?') + 'format=json'
+
+    # Measure the uncached path; the response cache would hide regressions
+    cache.clear()
+
+    # The query log is a bounded deque that seeding has already filled
+    connection.queries_log.clear()
+    with CaptureQueriesContext(connection) as context:
+        django_app.get(url)
+
+    queries = list(context.captured_queries)
+    rows = _count_rows(queries)
+
+    timings = []
+    for _ in range(RUNS):
+        cache.clear()
+        start = time.perf_counter()
+        django_app.get(url)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    measurement = {
+        'name': name,
+        'url': url,
+        'queries': len(queries),
+        'rows': rows,
+        'p50_ms': _percentile(timings, 50),
+        'p95_ms': _percentile(timings, 95),
+    }
+    _measurements.append(measurement)
+
+    assert measurement['queries'] <= max_queries, [
+        query['sql'][:200] for query in queries]
+    assert measurement['rows'] <= max_rows
+    assert measurement['p95_ms'] <= max_p95_ms
@@ -1,11 +1,15 @@
+import factory
 from pytest import mark
 from dateutil import parser
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from datetime import datetime, timedelta
 from casters.tests.factories import CasterFactory
 from players.tests.factories import PlayerFactory
 from leagues.tests.factories import CircuitFactory
 from matches.tests.factories import MatchFactory, ResultFactory
+from api.cache import get_cache_stats
 from api.tests.services import BuzzClient
 
 @mark.filterwarnings(
@@ -368,3 +372,179 @@ def test_update_match_time_has_result_permission_denied(django_app):
     match.refresh_from_db() 
     assert match.start_time == current_start_time
 
+
+@mark.django_db
+def test_get_matches_cursor_pagination(django_app):
+    """
+    Paging with `cursor` returns the same rows in the same order as offset
+    paging, without a count, including matches that have no start time.
+    """
+    client = BuzzClient(django_app)
+    circuit = CircuitFactory()
+
+    # Sixteen random captain names would often collide
+    captains = {
+        'home__captain__name': factory.Sequence(lambda n: f'Home Captain {n}'),
+        'away__captain__name': factory.Sequence(lambda n: f'Away Captain {n}'),
+    }
+
+    matches = MatchFactory.create_batch(5, circuit=circuit, **captains)
+    MatchFactory.create_batch(
+        2, circuit=circuit, round=matches[0].round, **captains)
+    MatchFactory(circuit=circuit, start_time=None, **captains)
+
+    params = f'circuit={circuit.id}&limit=3'
+    expected = [entry['id'] for entry in client.matches(f'{params}&limit=100')['results']]
+
+    resp = client.matches(f'{params}&cursor=')
+    assert 'count' not in resp
+
+    seen = [entry['id'] for entry in resp['results']]
+
+    while resp['next']:
+        resp = django_app.get(resp['next']).json
+        assert len(resp['results']) <= 3
+        seen += [entry['id'] for entry in resp['results']]
+
+    assert len(expected) == 8
+    assert seen == expected
+
+
+@mark.django_db
+def test_get_matches_invalid_cursor(django_app):
+    """
+    A cursor that can't be decoded is a 404 rather than a server error.
+    """
+    resp = django_app.get(
+        '/matches/?cursor=not-a-cursor&format=json', expect_errors=True)
+
+    assert resp.status_code == 404
+
+
+@mark.django_db
+def test_get_match_cached_until_result_written(django_app):
+    """
+    Repeat reads of a match are served from cache until a write touches it.
+    """
+    client = BuzzClient(django_app, return_json=False)
+    match = MatchFactory()
+
+    resp = client.match(match.id)
+    assert resp.headers['X-Cache'] == 'MISS'
+    assert resp.json['result'] is None
+
+    resp = client.match(match.id)
+    assert resp.headers['X-Cache'] == 'HIT'
+
+    ResultFactory(match=match)
+
+    resp = client.match(match.id)
+    assert resp.headers['X-Cache'] == 'MISS'
+    assert resp.json['result']['winner'] == match.home.name
+
+    stats = get_cache_stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 2
+
+
+@mark.django_db
+def test_get_matches_cache_key_ignores_param_order(django_app):
+    """
+    The same query parameters in a different order share a cache entry.
+    """
+    client = BuzzClient(django_app, return_json=False)
+    match = MatchFactory()
+
+    resp = client.matches(f'circuit={match.circuit.id}&limit=5')
+    assert resp.headers['X-Cache'] == 'MISS'
+
+    resp = client.matches(f'limit=5&circuit={match.circuit.id}')
+    assert resp.headers['X-Cache'] == 'HIT'
+
+
+@mark.django_db
+def test_get_matches_conditional(django_app):
+    """
+    A client holding the current ETag gets a 304 until the matches change.
+    Lists don't send Last-Modified, since it can't reflect deleted rows.
+    """
+    match = MatchFactory()
+    url = f'/matches/?circuit={match.circuit.id}&format=json'
+
+    resp = django_app.get(url)
+    etag = resp.headers['ETag']
+    assert 'Last-Modified' not in resp.headers
+
+    resp = django_app.get(url, headers={'If-None-Match': etag}, status=304)
+    assert resp.headers['ETag'] == etag
+    assert not resp.body
+
+    detail_url = f'/matches/{match.id}/?format=json'
+    last_modified = django_app.get(detail_url).headers['Last-Modified']
+    django_app.get(
+        detail_url, headers={'If-Modified-Since': last_modified}, status=304)
+
+    ResultFactory(match=match)
+
+    resp = django_app.get(url, headers={'If-None-Match': etag})
+    assert resp.status_code == 200
+    assert resp.headers['ETag'] != etag
+    assert resp.json['results'][0]['result']
+
+
+@mark.django_db
+def test_get_matches_conditional_reuses_validators(django_app):
+    """
+    Cache hits and repeat conditional requests reuse the validators worked
+    out on the first request instead of aggregating again.
+    """
+    match = MatchFactory()
+    url = f'/matches/?circuit={match.circuit.id}&format=json'
+
+    etag = django_app.get(url).headers['ETag']
+
+    with CaptureQueriesContext(connection) as queries:
+        resp = django_app.get(url)
+        django_app.get(url, headers={'If-None-Match': etag}, status=304)
+
+    assert resp.headers['X-Cache'] == 'HIT'
+    assert resp.headers['ETag'] == etag
+    assert not [
+        query for query in queries.captured_queries
+        if 'MAX(' in query['sql'].upper()
+    ]
+
+
+@mark.django_db
+def test_get_matches_sparse_fields(django_app):
+    """
+    `fields` and `expand` trim the response and the queries behind it.
+    """
+    client = BuzzClient(django_app)
+    match = MatchFactory()
+    match.home.members.add(PlayerFactory())
+
+    params = f'circuit={match.circuit.id}&fields=id,start_time,home,result&expand='
+
+    with CaptureQueriesContext(connection) as queries:
+        resp = client.matches(params)
+
+    entry = resp['results'][0]
+    assert set(entry.keys()) == {'id', 'start_time', 'home', 'result'}
+    assert entry['home'] == match.home.id
+    assert entry['result'] is None
+    assert not any('players_player' in query['sql'] for query in queries)
+
+    resp = client.matches(f'circuit={match.circuit.id}&omit=circuit&expand=home')
+    entry = resp['results'][0]
+
+    assert 'circuit' not in entry
+    assert entry['away'] == match.away.id
+    assert entry['home']['name'] == match.home.name
+    assert entry['home']['group'] is None
+    assert 'members' not in entry['home']
+
+    resp = client.matches(f'circuit={match.circuit.id}&expand=home.members')
+    entry = resp['results'][0]
+
+    assert entry['home']['members'][0]['id'] == match.home.members.first().id
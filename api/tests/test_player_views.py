@@ -1,4 +1,7 @@
 from pytest import mark
+from awards.models import Award, AwardCategory, Stat, StatCategory
+from leagues.tests.factories import CircuitFactory, RoundFactory
+from players.models import Alias
 from players.tests.factories import PlayerFactory
 from teams.tests.factories import TeamFactory
 from api.tests.services import BuzzClient
@@ -91,6 +94,42 @@ def test_get_player_detail(django_app):
     # Keep these out!
     assert 'token' not in entry.keys()
 
+@mark.django_db
+def test_get_player_detail_conditional(django_app):
+    """
+    The ETag of a player changes when their embedded awards, award stats or
+    aliases do, none of which touch Player.modified.
+    """
+    player = PlayerFactory()
+    url = f'/players/{player.id}/?format=json'
+
+    def assert_changed(etag):
+        resp = django_app.get(url, headers={'If-None-Match': etag})
+        assert resp.status_code == 200
+        assert resp.headers['ETag'] != etag
+        return resp
+
+    etag = django_app.get(url).headers['ETag']
+    django_app.get(url, headers={'If-None-Match': etag}, status=304)
+
+    circuit = CircuitFactory()
+    award = Award.objects.create(
+        award_category=AwardCategory.objects.create(name='Queen of the Hive'),
+        circuit=circuit, round=RoundFactory(season=circuit.season),
+        player=player
+    )
+    resp = assert_changed(etag)
+    assert len(resp.json['awards']) == 1
+
+    etag = resp.headers['ETag']
+    award.stats.add(Stat.objects.create(
+        stat_category=StatCategory.objects.create(name='KDR'), total=2))
+    etag = assert_changed(etag).headers['ETag']
+
+    Alias.objects.create(player=player, name='Bumble')
+    assert_changed(etag)
+
+
 @mark.django_db
 def test_update_player_permission_granted(django_app):
     """
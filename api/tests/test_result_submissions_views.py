@@ -0,0 +1,162 @@
+from pytest import mark
+from matches.models import Result, ResultSubmission
+from matches.services import run_result_submissions
+from matches.tests.factories import MatchFactory
+from players.tests.factories import PlayerFactory
+from api.tests.services import BuzzClient
+
+
+def _result_data(match):
+    return {
+        'match': match.id,
+        'status': 'C',
+        'winner': match.home.id,
+        'loser': match.away.id,
+        'sets': [
+            {'number': 1, 'winner': match.home.id, 'loser': match.away.id},
+            {'number': 2, 'winner': match.home.id, 'loser': match.away.id},
+        ]
+    }
+
+
+@mark.django_db
+def test_submit_result_is_queued(django_app):
+    """
+    Submitting a result answers 202 with a status URL and leaves the work to
+    the worker.
+    """
+    match = MatchFactory()
+    player = match.home.captain
+    client = BuzzClient(
+        django_app, token=player.get_or_create_token(), return_json=False)
+
+    resp = client.submit_result(_result_data(match))
+
+    assert resp.status_code == 202
+    assert resp.json['status'] == ResultSubmission.QUEUED
+    assert resp.headers['Location'] == resp.json['status_url']
+    assert not Result.objects.filter(match=match).exists()
+
+    counts = run_result_submissions()
+    assert counts == {'succeeded': 1, 'retried': 0, 'failed': 0}
+
+    resp = django_app.get(
+        resp.json['status_url'],
+        headers={'Authorization': f'Token {player.get_or_create_token().key}'}
+    )
+    assert resp.json['status'] == ResultSubmission.SUCCEEDED
+
+    result = Result.objects.get(match=match)
+    assert resp.json['result'] == result.id
+    assert result.created_by == player
+    assert result.sets.count() == 2
+
+
+@mark.django_db
+def test_submit_result_resubmission_is_idempotent(django_app):
+    """
+    Posting the same result twice returns the first submission, and a
+    different result for a match already in the queue is refused.
+    """
+    match = MatchFactory()
+    player = match.home.captain
+    client = BuzzClient(
+        django_app, token=player.get_or_create_token(), return_json=False)
+
+    data = _result_data(match)
+    first = client.submit_result(data)
+    second = client.submit_result(data)
+
+    assert second.status_code == 202
+    assert second.json['id'] == first.json['id']
+    assert ResultSubmission.objects.count() == 1
+
+    data['winner'], data['loser'] = data['loser'], data['winner']
+    resp = client.submit_result(data, expect_errors=True)
+    assert resp.status_code == 409
+
+    run_result_submissions()
+
+    # Resending after it went through still finds the same submission
+    resp = client.submit_result(_result_data(match))
+    assert resp.json['id'] == first.json['id']
+    assert resp.json['status'] == ResultSubmission.SUCCEEDED
+    assert Result.objects.filter(match=match).count() == 1
+
+
+@mark.django_db
+def test_submit_result_permission_denied(django_app):
+    """
+    Submissions are validated up front, and their status is private.
+    """
+    match = MatchFactory()
+    outsider = PlayerFactory()
+    client = BuzzClient(
+        django_app, token=outsider.get_or_create_token(), return_json=False)
+
+    resp = client.submit_result(_result_data(match), expect_errors=True)
+    assert resp.status_code == 400
+    assert not ResultSubmission.objects.exists()
+
+    captain = match.home.captain
+    resp = BuzzClient(
+        django_app, token=captain.get_or_create_token(), return_json=False
+    ).submit_result(_result_data(match))
+
+    resp = django_app.get(
+        resp.json['status_url'], expect_errors=True,
+        headers={'Authorization': f'Token {outsider.get_or_create_token().key}'}
+    )
+    assert resp.status_code == 404
+
+
+@mark.django_db
+def test_submit_result_sent_by_another_player(django_app):
+    """
+    The same result already sent by someone else is refused rather than
+    re-queued and credited to the first sender.
+    """
+    match = MatchFactory()
+    home, away = match.home.captain, match.away.captain
+
+    first = BuzzClient(
+        django_app, token=home.get_or_create_token(), return_json=False
+    ).submit_result(_result_data(match))
+
+    ResultSubmission.objects.filter(id=first.json['id']).update(
+        status=ResultSubmission.FAILED)
+
+    resp = BuzzClient(
+        django_app, token=away.get_or_create_token(), return_json=False
+    ).submit_result(_result_data(match), expect_errors=True)
+
+    assert resp.status_code == 409
+
+    submission = ResultSubmission.objects.get()
+    assert submission.status == ResultSubmission.FAILED
+    assert submission.created_by == home
+
+
+@mark.django_db
+def test_submit_result_requeue_waits_for_pending(django_app):
+    """
+    A failed submission isn't re-queued while another result for the same
+    match is still waiting to be processed.
+    """
+    match = MatchFactory()
+    player = match.home.captain
+    client = BuzzClient(
+        django_app, token=player.get_or_create_token(), return_json=False)
+
+    data = _result_data(match)
+    first = client.submit_result(data)
+    ResultSubmission.objects.filter(id=first.json['id']).update(
+        status=ResultSubmission.FAILED)
+
+    other = dict(data, winner=data['loser'], loser=data['winner'])
+    client.submit_result(other)
+
+    resp = client.submit_result(data, expect_errors=True)
+    assert resp.status_code == 409
+    assert ResultSubmission.objects.get(
+        id=first.json['id']).status == ResultSubmission.FAILED
@@ -1,4 +1,5 @@
 from pytest import mark
+from matches.models import Game
 from matches.tests.factories import MatchFactory, ResultFactory
 from players.tests.factories import PlayerFactory
 from teams.tests.factories import TeamFactory
@@ -187,8 +188,12 @@ def test_create_result_with_log_permission_granted(django_app):
     assert resp.status_code == 302
     resp = resp.follow()
 
-    assert resp.json['sets'][0]['log']['filename'] == 'myfilename1.json'
-    assert resp.json['sets'][0]['log']['body'] == '{"results": "yadayada"}'
+    log = resp.json['sets'][0]['log']
+    assert log['filename'] == 'myfilename1.json'
+    assert 'body' not in log
+
+    # Bodies are only served from the log endpoint
+    assert django_app.get(log['url']).json == '{"results": "yadayada"}'
 
 @mark.django_db
 def test_create_result_not_captain_permission_denied(django_app):
@@ -464,3 +469,58 @@ def test_create_result_set_loser_must_be_match_team_permission_denied(django_app
 
     match.refresh_from_db()
     assert not hasattr(match, 'result')
+
+
+@mark.django_db
+def test_create_result_with_log_generates_games(django_app):
+    """
+    Uploading set logs with team mappings creates each set's games.
+    """
+    match = MatchFactory()
+    player = match.home.captain
+
+    client = BuzzClient(
+        django_app, token=player.get_or_create_token(), return_json=False)
+
+    def log(winners):
+        return {
+            'filename': 'set.json',
+            'body': {
+                'games': [
+                    {'winCondition': 1, 'duration': 120} for _ in winners],
+                'gameWinners': winners,
+                'mapPool': [2, 4, 7][:len(winners)],
+            }
+        }
+
+    data = {
+        'match': match.id,
+        'status': 'C',
+        'winner': match.home.id,
+        'loser': match.away.id,
+        'team_mappings': [
+            { 'color': 1, 'team': match.home.id },
+            { 'color': 2, 'team': match.away.id }
+        ],
+        'sets': [
+            {
+                'number': 1, 'winner': match.home.id, 'loser': match.away.id,
+                'log': log([1, 2, 1])
+            },
+            {
+                'number': 2, 'winner': match.home.id, 'loser': match.away.id,
+                'log': log([1, 1])
+            },
+        ]
+    }
+
+    resp = client.results(None, method='POST', data=data, expect_errors=False)
+    assert resp.status_code == 302
+
+    match.refresh_from_db()
+    games = Game.objects.filter(set__result=match.result)
+
+    assert games.count() == 5
+    assert games.filter(winner=match.home, loser=match.away).count() == 4
+    assert games.get(set__number=1, number=2).winner == match.away
+    assert games.get(set__number=1, number=2).map == 'BQ'
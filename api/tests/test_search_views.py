@@ -0,0 +1,93 @@
+from pytest import mark
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from api.tests.services import BuzzClient
+from casters.tests.factories import CasterFactory
+from leagues.tests.factories import CircuitFactory
+from matches.tests.factories import MatchFactory
+from players.models import Alias
+from players.tests.factories import PlayerFactory
+from teams.tests.factories import DynastyFactory, TeamFactory
+
+
+@mark.django_db
+def test_search(django_app):
+    """
+    Search players, teams, dynasties and casters by name, best match first.
+    """
+    team = TeamFactory(name='Bee Keepers')
+    dynasty = DynastyFactory(name='Bee Dynasty')
+    player = PlayerFactory(name='Honey Bee')
+    Alias.objects.create(player=player, name='Bumble')
+    caster = CasterFactory(player=PlayerFactory(name='Bee Caster'))
+
+    client = BuzzClient(django_app)
+
+    resp = client.search('q=bee')
+    assert {(result['kind'], result['id']) for result in resp['results']} == {
+        ('team', team.id), ('dynasty', dynasty.id), ('player', player.id),
+        ('player', caster.player.id), ('caster', caster.id)
+    }
+
+    resp = client.search('q=bumble&kind=player')
+    assert resp['results'] == [{
+        'kind': 'player', 'id': player.id, 'name': 'Honey Bee',
+        'matched': 'Bumble', 'score': 1.0
+    }]
+
+    resp = client.search('q=bee&kind=team,dynasty&limit=1')
+    assert len(resp['results']) == 1
+
+    resp = django_app.get('/casters/?name=caster&format=json')
+    assert [result['id'] for result in resp.json['results']] == [caster.id]
+
+
+@mark.django_db
+def test_search_errors(django_app):
+    client = BuzzClient(django_app, return_json=False)
+
+    assert client.search('q=', expect_errors=True).status_code == 400
+    assert client.search('q=bee&kind=wasp', expect_errors=True).status_code == 400
+    assert client.search('q=bee&limit=all', expect_errors=True).status_code == 400
+
+
+@mark.django_db
+def test_name_filters_use_search_index(django_app, settings):
+    """
+    Name filters match the same rows through the index as with icontains.
+    """
+    circuit = CircuitFactory()
+    hive = TeamFactory(
+        circuit=circuit, name='Hive Mind', dynasty=DynastyFactory(name='Hive'))
+    swarm = TeamFactory(circuit=circuit, name='Swarm')
+    other = TeamFactory(circuit=circuit, name='Other Team')
+    match = MatchFactory(circuit=circuit, home=hive, away=swarm)
+    MatchFactory(circuit=circuit, home=other, away=swarm)
+
+    client = BuzzClient(django_app)
+
+    for enabled in (True, False):
+        settings.SEARCH_INDEX_FILTERS = enabled
+
+        connection.queries_log.clear()
+        with CaptureQueriesContext(connection) as context:
+            resp = client.teams('name=hive')
+
+        assert [team['id'] for team in resp['results']] == [hive.id]
+        assert any(
+            'search_searchtrigram' in query['sql']
+            for query in context.captured_queries
+        ) is enabled
+
+        resp = client.matches('team=mind')
+        assert [result['id'] for result in resp['results']] == [match.id]
+
+        resp = client.matches('teams=swarm,hive')
+        assert [result['id'] for result in resp['results']] == [match.id]
+
+        resp = client.matches('dynasty=hive')
+        assert [result['id'] for result in resp['results']] == [match.id]
+
+        resp = client.players('team=swarm')
+        assert {player['id'] for player in resp['results']} == set(
+            swarm.members.values_list('id', flat=True))
@@ -0,0 +1,41 @@
+import json
+from pytest import mark
+from matches.tests.factories import SetLogFactory
+
+
+@mark.django_db
+def test_get_set_log(django_app):
+    """
+    Set details link to the log instead of including it, and the log can be
+    fetched whole or by byte range.
+    """
+    log = SetLogFactory(filename='set.json')
+    raw = json.dumps(log.body, separators=(',', ':')).encode('utf-8')
+
+    resp = django_app.get(f'/sets/{log.set_id}/?format=json')
+    entry = resp.json['log']
+
+    assert 'body' not in entry
+    assert entry['size'] == len(raw)
+
+    resp = django_app.get(entry['url'])
+    assert resp.body == raw
+    assert resp.headers['Accept-Ranges'] == 'bytes'
+    assert resp.headers['Content-Disposition'] == 'inline; filename="set.json"'
+
+    resp = django_app.get(entry['url'], headers={'Range': 'bytes=5-14'})
+    assert resp.status_code == 206
+    assert resp.body == raw[5:15]
+    assert resp.headers['Content-Range'] == f'bytes 5-14/{len(raw)}'
+
+    resp = django_app.get(
+        entry['url'], headers={'Range': f'bytes={len(raw)}-'}, status=416)
+    assert resp.headers['Content-Range'] == f'bytes */{len(raw)}'
+
+
+@mark.django_db
+def test_get_missing_set_log(django_app):
+    """
+    Sets without a log 404.
+    """
+    django_app.get('/sets/999/log/', status=404)
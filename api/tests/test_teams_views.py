@@ -1,4 +1,6 @@
 from pytest import mark
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from teams.tests.factories import TeamFactory
 from api.tests.services import BuzzClient
 from leagues.tests.factories import CircuitFactory
@@ -33,6 +35,39 @@ def test_get_teams_by_name(django_app):
     assert not 'invite_code' in entry.keys()
 
 @mark.django_db
+def test_get_teams_query_count_independent_of_page_size(django_app):
+    """
+    Team listings use annotations for roster flags instead of per-team queries.
+    """
+    client = BuzzClient(django_app)
+    circuit = CircuitFactory()
+    TeamFactory.create_batch(2, circuit=circuit)
+
+    with CaptureQueriesContext(connection) as few_teams:
+        client.teams(params=f'circuit={circuit.id}')
+
+    full_team = TeamFactory(
+        circuit=circuit,
+        members=PlayerFactory.create_batch(
+            circuit.season.max_team_members - 1)
+    )
+    TeamFactory.create_batch(4, circuit=circuit)
+
+    with CaptureQueriesContext(connection) as more_teams:
+        resp = client.teams(params=f'circuit={circuit.id}')
+
+    assert len(more_teams) == len(few_teams)
+
+    entries = {entry['id']: entry for entry in resp['results']}
+    assert len(entries) == 7
+    assert entries[full_team.id]['can_add_members'] is False
+    assert entries[full_team.id]['is_active'] is True
+    assert all(
+        entry['can_add_members'] for id, entry in entries.items()
+        if id != full_team.id
+    )
+
+@mark.django_db(transaction=True)
 def test_get_team_detail(django_app):
     """
     Get team detail view by object id
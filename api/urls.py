@@ -5,7 +5,7 @@ from .views import (
     CircuitViewSet, MatchViewSet, TeamViewSet, DynastyViewSet, PlayerViewSet,
     EventViewSet, RoundViewSet, CasterViewSet, StreamViewSet, PlayingViewSet,
     ReleaseViewSet, ResultViewSet, SetViewSet, StatViewSet, StatCategoryViewSet,
-    MeViewSet, GameViewSet, GroupViewSet)
+    MeViewSet, GameViewSet, GroupViewSet, SearchViewSet)
 
 router = routers.DefaultRouter()
 router.register(r'awards', AwardViewSet)
@@ -23,6 +23,7 @@ router.register(r'players', PlayerViewSet)
 router.register(r'playing', PlayingViewSet)
 router.register(r'results', ResultViewSet, basename='results'),
 router.register(r'releases', ReleaseViewSet)
+router.register(r'search', SearchViewSet, basename='search')
 router.register(r'sets', SetViewSet),
 router.register(r'rounds', RoundViewSet, basename='rounds')
 router.register(r'stats', StatViewSet)
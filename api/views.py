@@ -1,3 +1,4 @@
+from datetime import datetime, time, timedelta
 from allauth.socialaccount.providers.discord.views import DiscordOAuth2Adapter
 from rest_framework import filters, status, viewsets
 from rest_framework.decorators import action, api_view, permission_classes
@@ -6,9 +7,14 @@ from rest_framework.response import Response
 from rest_framework.reverse import reverse
 from django.contrib.auth.models import User
 from django.core.exceptions import PermissionDenied
+from django.db import transaction
 from django.db.models import Count, OuterRef, Prefetch, Sum, Q, Subquery, Case, When, F, IntegerField
 from django.db.models.functions import Coalesce
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from .cache import CachedResponseMixin, ConditionalGetMixin
 from .filters.awards import AwardFilter
 from .filters.casters import CasterFilter
 from .filters.events import EventFilter    
@@ -22,30 +28,40 @@ from .serializers.awards import (
     AwardSerializer, AwardCategorySerializer, CreateAwardSerializer,
     StatSerializer, StatCategorySerializer)
 from .serializers.casters import CasterSerializer
+from .serializers.dynamic import FieldOptions
 from .serializers.leagues import (
     LeagueSerializer, SeasonSerializer, CircuitSerializer, GroupSerializer,
     RoundSerializer)
 from api import permissions
-from .serializers.beegame import PlayingSerializer, ReleaseSerializer
+from .serializers.beegame import (
+    PlayingRollupSerializer, PlayingSerializer, ReleaseSerializer)
 from .serializers.matches import (
     GameSerializer, CreateMatchSerializer, MatchSerializer,
     MatchUpdateSerializer, ResultSerializer, ResultDetailSerializer,
+    ResultSubmissionSerializer,
     SetSerializer, SetDetailSerializer
 )
 from .serializers.teams import (
     DynastySerializer, JoinTeamSerializer, TeamSerializer, TeamDetailSerializer)
 from .serializers.players import PlayerSerializer
+from .serializers.search import SearchResultSerializer
 from .serializers.events import EventSerializer
 from .serializers.streams import StreamSerializer
 from .serializers.users import MeSerializer, UserSerializer
 from awards.models import Award, AwardCategory, Stat, StatCategory
-from beegame.models import Playing, Release
+from beegame.models import Playing, PlayingRollup, Release
+from buzz.services import parse_byte_range
 from events.models import Event
 from leagues.models import League, Season, Circuit, Group, Round
-from matches.models import Game, Match, Result, Set
+from matches.models import (
+    Game, Match, Result, ResultSubmission, Set, SetLog)
 from matches.permissions import can_update_match
+from matches.services import (
+    get_payload_checksum, get_stored_log, iter_log_bytes,
+    queue_result_submission, requeue_result_submission)
 from casters.models import Caster
 from players.models import Player
+from search.services import KIND_NAMES, search_names
 from streams.models import Stream
 from teams.models import Dynasty, Team
 from teams.permissions import can_regenerate_team_invite_code
@@ -77,99 +93,126 @@ class StatCategoryViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = StatCategory.objects.all().order_by('id')
     serializer_class = StatCategorySerializer    
 
-class LeagueViewSet(viewsets.ReadOnlyModelViewSet):
+class LeagueViewSet(
+        ConditionalGetMixin, CachedResponseMixin,
+        viewsets.ReadOnlyModelViewSet):
     queryset = League.objects.all().order_by('name', 'id')
     filterset_class = LeagueFilter
     serializer_class = LeagueSerializer
 
-class SeasonViewSet(viewsets.ReadOnlyModelViewSet):
+class SeasonViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Season.objects.all().order_by('name', 'id')
     filterset_class = SeasonFilter
     serializer_class = SeasonSerializer
 
-class CircuitViewSet(viewsets.ReadOnlyModelViewSet):
+class CircuitViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Circuit.objects.select_related('season')
     queryset = queryset.prefetch_related(
-        Prefetch('teams', queryset=Team.objects.annotate(
-            wins=Count('won_match_results', distinct=True)).annotate(losses=Count('lost_match_results', distinct=True))),
+        Prefetch('teams', queryset=Team.objects.with_standings()),
         Prefetch('teams__members')            
     ).order_by('id')
     
     filterset_class = CircuitFilter
     serializer_class = CircuitSerializer
 
-class GroupViewSet(viewsets.ReadOnlyModelViewSet):
+class GroupViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Group.objects.select_related('circuit')
     queryset = queryset.prefetch_related(
-        Prefetch('teams', queryset=Team.objects.annotate(
-            wins=Count('won_match_results', distinct=True)).annotate(losses=Count('lost_match_results', distinct=True))),
+        Prefetch('teams', queryset=Team.objects.with_standings()),
         Prefetch('teams__members')            
     ).order_by('id')
     
     filterset_class = GroupFilter
     serializer_class = GroupSerializer
 
-class RoundViewSet(viewsets.ReadOnlyModelViewSet):
+class RoundViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Round.objects.all().order_by('name', 'id')
+    queryset = queryset.select_related('current_round_season')
+    queryset = queryset.prefetch_related('matches')
     serializer_class = RoundSerializer
 
-class MatchViewSet(viewsets.ModelViewSet):
+class MatchViewSet(
+        ConditionalGetMixin, CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Match.objects.all().order_by('round__round_number', 'start_time', 'id')
-    queryset = queryset.select_related('circuit')
-    queryset = queryset.select_related('round')
-
 
-    queryset = queryset.prefetch_related(
-        Prefetch('home', Team.objects.annotate(
-            wins=Count('won_match_results', distinct=True)).annotate(
-                losses=Count('lost_match_results', distinct=True))
-        ),
-        Prefetch('home__members')
-    )
-    queryset = queryset.prefetch_related(
-        Prefetch('away', Team.objects.annotate(
-            wins=Count('won_match_results', distinct=True)).annotate(
-                losses=Count('lost_match_results', distinct=True))
-        ),
-        Prefetch('away__members')
-    )
-
-    queryset = queryset.select_related('primary_caster__player')
-    queryset = queryset.prefetch_related('secondary_casters__player')
-    queryset = queryset.prefetch_related('circuit__season')
-
-    queryset = queryset.prefetch_related(
-        Prefetch('result', Result.objects.annotate(
-            sets_total=Coalesce(Count('sets'), 0)
-        ).annotate(sets_home=Count(
-                Case(
-                    When(
-                        sets__winner=F('match__home'), then=1),
-                        output_field=IntegerField(),
-                    )
+    result_queryset = Result.objects.annotate(
+        sets_total=Coalesce(Count('sets'), 0)
+    ).annotate(sets_home=Count(
+            Case(
+                When(
+                    sets__winner=F('match__home'), then=1),
+                    output_field=IntegerField(),
                 )
-        ).annotate(sets_away=Count(
-                Case(
-                    When(
-                        sets__winner=F('match__away'), then=1),
-                        output_field=IntegerField(),
-                    )
+            )
+    ).annotate(sets_away=Count(
+            Case(
+                When(
+                    sets__winner=F('match__away'), then=1),
+                    output_field=IntegerField(),
                 )
             )
-        ),
-        Prefetch('result__sets'),
-        Prefetch('result__winner'),
-        Prefetch('result__loser'),
-    )
-    
-    
+        )
+
     serializer_class = MatchSerializer
     filterset_class = MatchFilter
+    modified_fields = [
+        'modified', 'result__modified', 'home__modified', 'away__modified',
+        'home__standing__modified', 'away__standing__modified'
+    ]
     permission_classes = [
         permissions.CanReadMatch|permissions.CanUpdateMatch|permissions.CanCreateMatch
     ]
     http_method_names = ['get', 'patch', 'post']
 
+    def get_queryset(self):
+        """
+        Only join and prefetch the relations the response will include, as
+        requested with `?fields=`, `?omit=` and `?expand=`.
+        """
+        queryset = super().get_queryset()
+        options = FieldOptions.from_request(self.request)
+
+        if options.expands('circuit'):
+            queryset = queryset.select_related('circuit__season')
+        elif options.wants('circuit_display'):
+            queryset = queryset.select_related('circuit')
+
+        for side in ['home', 'away']:
+            if options.expands(side) or (
+                side == 'home' and options.wants('circuit_display')
+            ):
+                queryset = queryset.prefetch_related(Prefetch(
+                    side, Team.objects.with_standings().select_related('group')
+                ))
+
+            if options.expands(f'{side}.members'):
+                queryset = queryset.prefetch_related(f'{side}__members')
+
+        if options.expands('round'):
+            queryset = queryset.select_related('round__current_round_season')
+
+        if options.expands('group'):
+            queryset = queryset.select_related('group')
+
+        if options.expands('primary_caster'):
+            queryset = queryset.select_related('primary_caster__player')
+
+        if options.expands('secondary_casters'):
+            queryset = queryset.prefetch_related('secondary_casters__player')
+        elif options.wants('secondary_casters'):
+            queryset = queryset.prefetch_related('secondary_casters')
+
+        if options.expands('result'):
+            queryset = queryset.prefetch_related(
+                Prefetch('result', self.result_queryset),
+                Prefetch('result__winner'),
+                Prefetch('result__loser'),
+            )
+        elif options.wants('result'):
+            queryset = queryset.select_related('result')
+
+        return queryset
+
     def get_serializer_class(self):
         if self.request.method == 'POST':
             return CreateMatchSerializer
@@ -201,7 +244,7 @@ class MatchViewSet(viewsets.ModelViewSet):
         raise PermissionDenied(
             'Permission Error: Either you are not a team captain associated with this match, or it has already occurred.')
     
-class ResultViewSet(viewsets.ModelViewSet):
+class ResultViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
 
     queryset = Result.objects.all().order_by('id')
     queryset = queryset.prefetch_related('loser__circuit__season')
@@ -210,6 +253,8 @@ class ResultViewSet(viewsets.ModelViewSet):
     queryset = queryset.prefetch_related('sets__loser__circuit__season')
     
     serializer_class = ResultSerializer
+    modified_fields = [
+        'modified', 'match__modified', 'winner__modified', 'loser__modified']
 
     permission_classes = [
         permissions.CanReadResult|permissions.CanCreateResult
@@ -228,6 +273,91 @@ class ResultViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         player, created = Player.objects.get_or_create(user=self.request.user)
         result = serializer.save(created_by=player)
+
+    @action(
+        methods=['post'], detail=False,
+        permission_classes=[IsAuthenticated]
+    )
+    def submit(self, request):
+        """
+        Queue a result for the worker to ingest instead of creating it now.
+
+        Takes the same data as creating a result and answers 202 with a
+        status URL to poll. Posting the same data again returns the original
+        submission, re-queued if it had failed. The same data already posted
+        by someone else is refused.
+        """
+        submission = None
+        match_id = str(request.data.get('match', ''))
+
+        if match_id.isdigit():
+            submission = ResultSubmission.objects.filter(
+                match_id=match_id, checksum=get_payload_checksum(request.data)
+            ).select_related('created_by').first()
+
+        if submission and (
+            not submission.created_by or
+            submission.created_by.user_id != request.user.id
+        ):
+            return Response(
+                {'error': 'This result was already submitted by another player.'},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        if not submission:
+            serializer = ResultSerializer(
+                data=request.data, context={'request': request})
+            serializer.is_valid(raise_exception=True)
+            match_id = serializer.validated_data['match'].id
+
+        with transaction.atomic():
+            # Lock the match so two submissions can't both find it free
+            match = Match.objects.select_for_update().get(id=match_id)
+
+            pending = match.result_submissions.filter(status__in=[
+                ResultSubmission.QUEUED, ResultSubmission.RUNNING])
+            if submission:
+                pending = pending.exclude(id=submission.id)
+
+            if pending.exists():
+                return Response(
+                    {'error': 'A result for this match is already being processed.'},
+                    status=status.HTTP_409_CONFLICT
+                )
+
+            if submission:
+                requeue_result_submission(submission)
+            else:
+                player, created = Player.objects.get_or_create(
+                    user=request.user)
+                submission, created = queue_result_submission(
+                    match, request.data, player)
+
+        data = ResultSubmissionSerializer(
+            submission, context={'request': request}).data
+
+        return Response(
+            data, status=status.HTTP_202_ACCEPTED,
+            headers={'Location': data['status_url']}
+        )
+
+    @action(
+        methods=['get'], detail=False,
+        permission_classes=[IsAuthenticated],
+        url_path=r'submissions/(?P<submission_id>[0-9]+)',
+        url_name='submission'
+    )
+    def submission(self, request, submission_id=None):
+        """Status of a queued result, visible to its submitter and staff."""
+        submissions = ResultSubmission.objects.all()
+
+        if not request.user.is_staff:
+            submissions = submissions.filter(created_by__user=request.user)
+
+        submission = get_object_or_404(submissions, pk=submission_id)
+        serializer = ResultSubmissionSerializer(
+            submission, context={'request': request})
+        return Response(serializer.data)
         
     def retrieve(self, request, pk=None):
         queryset = self.get_queryset()       
@@ -255,34 +385,86 @@ class SetViewSet(viewsets.ReadOnlyModelViewSet):
         set = queryset.filter(id=pk).first()
         serializer = SetDetailSerializer(set, context={'request': request})
         return Response(serializer.data)
+
+    @action(methods=['get'], detail=True)
+    def log(self, request, pk=None):
+        """
+        Stream a set's raw log as JSON.
+
+        Honours a single `Range: bytes=` header so large logs can be fetched
+        in pieces, decompressing only as much as the range needs.
+        """
+        log = get_object_or_404(
+            SetLog.objects.only('id', 'set_id', 'filename', 'size', 'legacy_body'),
+            set_id=pk
+        )
+        data, size = get_stored_log(log)
+
+        try:
+            byte_range = parse_byte_range(request.META.get('HTTP_RANGE'), size)
+        except ValueError:
+            response = HttpResponse(
+                status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        if byte_range:
+            first, last = byte_range
+            response = StreamingHttpResponse(
+                iter_log_bytes(data, first, last),
+                status=status.HTTP_206_PARTIAL_CONTENT,
+                content_type='application/json'
+            )
+            response['Content-Range'] = f'bytes {first}-{last}/{size}'
+            response['Content-Length'] = last - first + 1
+        else:
+            response = StreamingHttpResponse(
+                iter_log_bytes(data), content_type='application/json')
+            response['Content-Length'] = size
+
+        response['Accept-Ranges'] = 'bytes'
+        if log.filename:
+            response['Content-Disposition'] = f'inline; filename="{log.filename}"'
+
+        return response
         
 class GameViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Game.objects.all().order_by('id')
     serializer_class = GameSerializer
 
-class TeamViewSet(viewsets.ModelViewSet):
+class TeamViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Team.objects.all().order_by('name', 'id')
     queryset = queryset.select_related('captain')
     queryset = queryset.select_related('circuit')
     queryset = queryset.select_related('dynasty')
+    queryset = queryset.select_related('group')
     queryset = queryset.prefetch_related('members')
     queryset = queryset.select_related('circuit__season')
-    queryset = queryset.annotate(wins=Count('won_match_results', distinct=True))
-    queryset = queryset.annotate(losses=Count('lost_match_results', distinct=True))
+    queryset = queryset.with_standings()
+    queryset = queryset.with_roster_flags()
 
     permission_classes = [permissions.CanUpdateTeam]
 
     serializer_class = TeamSerializer
     filterset_class = TeamFilter
+    modified_fields = ['modified', 'standing__modified']
 
     def retrieve(self, request, pk=None):
         queryset = self.get_queryset()
-        queryset = queryset.prefetch_related('home_matches__primary_caster')
-        queryset = queryset.prefetch_related('away_matches__primary_caster')
-        queryset = queryset.prefetch_related('home_matches__secondary_casters')
-        queryset = queryset.prefetch_related('away_matches__secondary_casters')
-        queryset = queryset.prefetch_related('home_matches__round')
-        queryset = queryset.prefetch_related('away_matches__round')
+        queryset = queryset.prefetch_related('home_matches__home')
+        queryset = queryset.prefetch_related('home_matches__away')
+        queryset = queryset.prefetch_related('away_matches__home')
+        queryset = queryset.prefetch_related('away_matches__away')
+        queryset = queryset.prefetch_related('home_matches__primary_caster__player')
+        queryset = queryset.prefetch_related('home_matches__primary_caster__alias')
+        queryset = queryset.prefetch_related('away_matches__primary_caster__player')
+        queryset = queryset.prefetch_related('away_matches__primary_caster__alias')
+        queryset = queryset.prefetch_related('home_matches__secondary_casters__player')
+        queryset = queryset.prefetch_related('home_matches__secondary_casters__alias')
+        queryset = queryset.prefetch_related('away_matches__secondary_casters__player')
+        queryset = queryset.prefetch_related('away_matches__secondary_casters__alias')
+        queryset = queryset.prefetch_related('home_matches__round__current_round_season')
+        queryset = queryset.prefetch_related('away_matches__round__current_round_season')
 
         queryset = queryset.prefetch_related(
             Prefetch('home_matches__result', Result.objects.annotate(
@@ -303,8 +485,8 @@ class TeamViewSet(viewsets.ModelViewSet):
                     )
                 )
             ),
-            Prefetch('home_matches__result__match__home__members'),
-            Prefetch('home_matches__result__match__away__members'),
+            Prefetch('home_matches__result__winner'),
+            Prefetch('home_matches__result__loser'),
         )
  
         queryset = queryset.prefetch_related(
@@ -326,8 +508,8 @@ class TeamViewSet(viewsets.ModelViewSet):
                     )
                 )
             ),
-            Prefetch('away_matches__result__match__home__members'),
-            Prefetch('away_matches__result__match__away__members'),
+            Prefetch('away_matches__result__winner'),
+            Prefetch('away_matches__result__loser'),
         )            
 
         team = queryset.filter(id=pk).first()
@@ -389,14 +571,16 @@ class TeamViewSet(viewsets.ModelViewSet):
 
 class DynastyViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Dynasty.objects.all().order_by('name', 'id').distinct()
+    queryset = queryset.prefetch_related(Prefetch(
+        'teams', Team.objects.select_related('circuit', 'standing').with_roster_flags()
+    ))
     serializer_class = DynastySerializer
     filterset_class = DynastyFilter
 
-class PlayerViewSet(viewsets.ModelViewSet):
+class PlayerViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Player.objects.all().order_by('id')
     queryset = queryset.prefetch_related(
-        Prefetch('teams', queryset=Team.objects.annotate(
-            wins=Count('won_match_results', distinct=True)).annotate(losses=Count('lost_match_results', distinct=True))),
+        Prefetch('teams', queryset=Team.objects.with_standings()),
     )
     queryset = queryset.prefetch_related('teams__circuit__season')
     queryset = queryset.prefetch_related('aliases')
@@ -421,7 +605,7 @@ class StreamViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = StreamSerializer
     filterset_class = StreamFilter
 
-class EventViewSet(viewsets.ReadOnlyModelViewSet):
+class EventViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Event.objects.all().order_by('start_time', 'id')
     serializer_class = EventSerializer
     filterset_class = EventFilter
@@ -430,10 +614,121 @@ class PlayingViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Playing.objects.all().order_by('-updated', 'id')
     serializer_class = PlayingSerializer
 
+    SERIES_BUCKETS = {
+        'hour': (PlayingRollup.HOUR, timedelta(days=7)),
+        'day': (PlayingRollup.DAY, timedelta(days=365)),
+    }
+
+    @action(methods=['get'], detail=False)
+    def series(self, request):
+        """
+        Hourly or daily player count rollups for charting.
+
+        Takes `bucket` (hour or day), optional ISO 8601 `from` and `to`
+        bounds, and an optional `platform` code. Without `from`, the last
+        week of hours or year of days is returned.
+        """
+        params = request.query_params
+        bucket = params.get('bucket', 'hour')
+
+        if bucket not in self.SERIES_BUCKETS:
+            return Response(
+                {'error': 'bucket must be hour or day'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        bounds = {}
+        for name in ('from', 'to'):
+            value = params.get(name)
+            if not value:
+                continue
+
+            try:
+                parsed = parse_datetime(value)
+                if parsed is None and parse_date(value):
+                    parsed = datetime.combine(parse_date(value), time.min)
+            except ValueError:
+                parsed = None
+
+            if parsed is None:
+                return Response(
+                    {'error': f'{name} must be an ISO 8601 date or datetime'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            if timezone.is_naive(parsed):
+                parsed = timezone.make_aware(parsed, timezone.utc)
+
+            bounds[name] = parsed
+
+        code, default_span = self.SERIES_BUCKETS[bucket]
+        end = bounds.get('to', timezone.now())
+        start = bounds.get('from', end - default_span)
+
+        rollups = PlayingRollup.objects.filter(
+            bucket=code, start__gte=start, start__lte=end).order_by(
+                'start', 'platform')
+
+        if params.get('platform'):
+            rollups = rollups.filter(platform=params['platform'])
+
+        serializer = PlayingRollupSerializer(rollups, many=True)
+        return Response({
+            'bucket': bucket,
+            'from': start,
+            'to': end,
+            'results': serializer.data
+        })
+
 class ReleaseViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Release.objects.all().order_by('-released_on', 'id')
     serializer_class = ReleaseSerializer
 
+class SearchViewSet(viewsets.ViewSet):
+    """
+    Players, teams, dynasties and casters ranked by how well their names
+    match `q`. Players also match on their aliases.
+
+    Pass `kind` to search only some of them (e.g. `kind=player,team`) and
+    `limit` for up to 100 results.
+    """
+    MAX_LIMIT = 100
+
+    def list(self, request):
+        params = request.query_params
+        query = params.get('q', '').strip()
+
+        if not query:
+            return Response(
+                {'error': 'q is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        kinds = set()
+        for value in params.getlist('kind'):
+            kinds.update(item.strip() for item in value.split(',') if item.strip())
+
+        unknown = kinds - set(KIND_NAMES)
+        if unknown:
+            return Response(
+                {'error': f'kind must be one of {", ".join(KIND_NAMES)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            limit = min(max(int(params.get('limit', 20)), 1), self.MAX_LIMIT)
+        except ValueError:
+            return Response(
+                {'error': 'limit must be a number'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        results = search_names(
+            query, [KIND_NAMES[kind] for kind in sorted(kinds)], limit)
+
+        serializer = SearchResultSerializer(results, many=True)
+        return Response({'query': query, 'results': serializer.data})
+
 class MeViewSet(viewsets.ViewSet):
     
     permission_classes = [IsAuthenticated]
@@ -1,6 +1,6 @@
 from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
-from buzz.services import get_sheet_csv
+from buzz.services import iter_sheet_csv
 from awards.services import parse_awards_csv, bulk_import_awards
 from leagues.models import League, Season, Circuit
 
@@ -14,9 +14,9 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         league = League.objects.filter(name__icontains=options['league']).first()
         season = league.seasons.filter(name__icontains=options['season']).first()
-        csv_data = get_sheet_csv(season.awards_csv_url)
+        csv_data = iter_sheet_csv(season.awards_csv_url)
         awards = parse_awards_csv(csv_data)
-        result_count = bulk_import_awards(awards, season)
+        result_count = bulk_import_awards(awards, season=season)
 
         
         self.stdout.write(self.style.SUCCESS(
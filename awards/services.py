@@ -1,20 +1,23 @@
-import csv
-from django.db import IntegrityError
-from buzz.services import get_sheet_csv
+from decimal import Decimal
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+from buzz.services import bulk_create_with_ids, get_sheet_csv, read_csv_rows
 from players.models import Player
+from search.models import SearchEntry
+from search.services import index_objects
 from leagues.models import League, Season, Circuit, Round
 from .models import Award, AwardCategory, Stat, StatCategory
 
 
 def parse_awards_csv(csv_data):
     """
-    Parse through CSV data of awards, convert to a list of award data dicts.
+    Parse through CSV data of awards, yielding an award data dict per award.
 
     Arguments:
-    csv_data -- Raw CSV data containing awards information. (str)
+    csv_data -- Raw CSV data containing awards information, or an iterable
+                of its lines. (str|iterable)
     """
-    rows = csv.reader(csv_data.splitlines(), delimiter=',')
-    awards = []
+    rows = read_csv_rows(csv_data)
 
     for idx, row in enumerate(rows):
         # Skip header rows
@@ -56,7 +59,7 @@ def parse_awards_csv(csv_data):
         # Queen of the Hive
         if row[3] and row[4]:
             try:
-                awards.append({
+                yield {
                 'week': week,
                 'week_name': week_name,
                 'season': season,
@@ -67,14 +70,14 @@ def parse_awards_csv(csv_data):
                     {'category': 'KDR', 'total': float(row[3])},
                 ],
                 'player': row[4]
-                })
+                }
             except ValueError:
                 pass
         
         # Eternal Warrior
         if row[5] and row[6]:
             try:
-                awards.append({
+                yield {
                 'week': week,
                 'week_name': week_name,
                 'season': season,
@@ -85,14 +88,14 @@ def parse_awards_csv(csv_data):
                     {'category': 'Kills/Set', 'total': float(row[5])},
                 ],
                 'player': row[6]
-                })
+                }
             except ValueError:
                 pass
 
         # Purple Heart
         if row[7] and row[8]:
             try:
-                awards.append({
+                yield {
                 'week': week,
                 'week_name': week_name,
                 'season': season,
@@ -103,14 +106,14 @@ def parse_awards_csv(csv_data):
                     {'category': 'Deaths/Set & Win', 'total': float(row[7])},
                 ],
                 'player': row[8]
-                })
+                }
             except ValueError:
                 pass
 
         # Berry Bonanza	
         if row[9] and row[10]:
             try:
-                awards.append({
+                yield {
                 'week': week,
                 'week_name': week_name,
                 'season': season,
@@ -121,14 +124,14 @@ def parse_awards_csv(csv_data):
                     {'category': 'Berries/Set', 'total': float(row[9])},
                 ],
                 'player': row[10]
-                })
+                }
             except ValueError:
                 pass
 
         # Snail Whisperer
         if row[11] and row[12]:
             try:
-                awards.append({
+                yield {
                 'week': week,
                 'week_name': week_name,
                 'season': season,
@@ -139,14 +142,14 @@ def parse_awards_csv(csv_data):
                     {'category': 'Snail/Set', 'total': float(row[11])},
                 ],
                 'player': row[12]
-                })
+                }
             except ValueError:
                 pass
 
         # Triple Threat
         if all([row[13], row[14], row[15], row[16], row[17]]):
             try:
-                awards.append({
+                yield {
                 'week': week,
                 'week_name': week_name,
                 'season': season,
@@ -160,80 +163,246 @@ def parse_awards_csv(csv_data):
                     {'category': 'Snail', 'total': float(row[17])},
                 ],
                 'player': row[14]
-                }) 
+                }
             except ValueError:
                 pass
-    
-    return awards
 
 
-def bulk_import_awards(awards, delete_before_import=True):
+def _get_or_create_categories(model, names):
     """
-    Given a list of caster data, bulk import into database.
+    Return a {name: category} dict of AwardCategory or StatCategory rows,
+    creating any that are missing in one insert.
+    """
+    categories = {}
+    for category in model.objects.filter(name__in=names).order_by('pk'):
+        categories.setdefault(category.name, category)
+
+    missing = [model(name=name) for name in sorted(set(names) - set(categories))]
+    bulk_create_with_ids(model, missing, ['name'])
+
+    categories.update((category.name, category) for category in missing)
+    return categories
+
+
+def bulk_import_awards(
+    awards, season=None, delete_before_import=False, batch_size=500):
+    """
+    Given a list of award data, import it into the database.
 
-    Needs optimization in the future, but steps for now:
+    Awards are identified by category, circuit, round and player, so running
+    the same import twice changes nothing:
 
-    1. Delete all existing awards (if specified).
-    2. Loop through a dicictionary of awards.
-    3. Create Award and Stat objects based on data provided in the award
-       list entry.
-    4. Look for existing Player object to link to Award
-        - Create Player object and link to Award if does not exist
+    1. Resolve seasons, circuits, rounds, award and stat categories and
+       players for every row from maps loaded once up front, creating
+       missing categories and players in bulk
+    2. Create awards that don't exist yet along with their stats
+    3. Update the totals of existing stats where they differ from the row,
+       and add stats an existing award is missing
+
+    Rows whose season, circuit or round can't be found are skipped.
 
     Arguments:
-    awards -- List of awards data derived from team CSV sheet. (list)
-    delete_before_import -- Delete all existing Awards then initiate
+    awards -- Award dicts derived from the awards CSV sheet, e.g. as yielded
+              by parse_awards_csv. (iterable)
+    season -- Only import rows for this Season, and only delete its awards.
+              Defaults to looking up each row's season by name in the
+              Indy Gaming League. (obj) (optional)
+    delete_before_import -- Delete existing Awards then initiate
                             import process. A way to start clean with
                             new data. (bool) (optional)
+    batch_size -- Rows per INSERT or UPDATE statement. (int) (optional)
     """
-    award_count = {'created': 0, 'updated': 0, 'deleted': 0}
+    from api.cache import invalidate_api_cache
+
+    award_count = {
+        'created': 0, 'updated': 0, 'unchanged': 0, 'deleted': 0, 'skipped': 0}
     player_count = {'created': 0, 'updated': 0, 'deleted': 0}
-    
-    # Clear out all old data
-    if delete_before_import:
-        existing_awards = Award.objects.all()
-        award_count['deleted'] = existing_awards.count()
-        existing_awards.delete()
-    
-    for entry in awards:
-        
-        category, category_created = AwardCategory.objects.get_or_create(
-            name=entry['category'])
+    stat_count = {'created': 0, 'updated': 0}
 
-        player, player_created = Player.objects.get_or_create(
-            name=entry['player'])
-        
-        league = League.objects.get(name='Indy Gaming League')
-        season = Season.objects.get(name=entry['season'], league=league)
+    awards = list(awards)
+
+    with transaction.atomic():
+
+        if season:
+            seasons = {season.name: season}
+        else:
+            league = League.objects.get(name='Indy Gaming League')
+            seasons = {}
+            for league_season in league.seasons.order_by('pk'):
+                seasons.setdefault(league_season.name, league_season)
+
+        # Clear out all old data
+        if delete_before_import:
+            existing_awards = Award.objects.all()
+            if season:
+                existing_awards = existing_awards.filter(circuit__season=season)
+
+            award_count['deleted'] = existing_awards.count()
+            Stat.objects.filter(award__in=existing_awards).delete()
+            existing_awards.delete()
+
+        season_ids = [league_season.id for league_season in seasons.values()]
+
+        circuits = {}
+        for circuit in Circuit.objects.filter(
+                season_id__in=season_ids).order_by('pk'):
+            circuits.setdefault(
+                (circuit.season_id, circuit.tier, circuit.region), circuit)
+
+        rounds_by_number = {}
+        rounds_by_name = {}
+        for game_round in Round.objects.filter(season_id__in=season_ids):
+            rounds_by_number.setdefault(
+                (game_round.season_id, game_round.round_number), game_round)
+            rounds_by_name.setdefault(
+                (game_round.season_id, game_round.name), game_round)
+
+        # Resolve rows
+        rows = []
+        for entry in awards:
+            entry_season = seasons.get(entry['season'])
+            if not entry_season:
+                award_count['skipped'] += 1
+                continue
+
+            circuit = circuits.get(
+                (entry_season.id, entry['tier'], entry['region']))
+
+            # Try getting round by number first, then by name
+            game_round = rounds_by_number.get((entry_season.id, entry['week']))
+            if not game_round:
+                game_round = rounds_by_name.get(
+                    (entry_season.id, entry['week_name']))
+
+            if not circuit or not game_round:
+                award_count['skipped'] += 1
+                continue
 
-        circuit = Circuit.objects.filter(
-            season=season, tier=entry['tier'], region=entry['region']).first()
+            rows.append((entry, circuit, game_round))
 
-        # Try getting round by number first, then by name
+        categories = _get_or_create_categories(
+            AwardCategory, {entry['category'] for entry, _, _ in rows})
+        stat_categories = _get_or_create_categories(
+            StatCategory, {
+                record['category']
+                for entry, _, _ in rows for record in entry['stats']
+            }
+        )
 
-        round = season.rounds.filter(round_number=entry['week']).first()
-        if not round:
-            round = season.rounds.filter(name=entry['week_name']).first()
+        names = {entry['player'].lower() for entry, _, _ in rows}
+        players = {}
+        matching_players = Player.objects.annotate(
+            lower_name=Lower('name')).filter(lower_name__in=names).order_by('pk')
 
-        award, award_created = Award.objects.get_or_create(
-            award_category=category, circuit=circuit, round=round, player=player
-        )  
+        for player in matching_players.only('id', 'name'):
+            players.setdefault(player.lower_name, player)
 
-        for record in entry['stats']:
-            stat_category, stat_cat_created = StatCategory.objects.get_or_create(
-                name=record['category']
+        new_players = {}
+        for entry, _, _ in rows:
+            name = entry['player']
+            if name.lower() not in players:
+                players[name.lower()] = new_players[name.lower()] = Player(
+                    name=name)
+
+        bulk_create_with_ids(
+            Player, new_players.values(), ['name'], batch_size)
+        player_count['created'] = len(new_players)
+
+        # Existing awards and their stats
+        existing = {}
+        season_awards = Award.objects.filter(
+            circuit__season_id__in=season_ids).order_by('pk')
+
+        for award in season_awards:
+            key = (
+                award.award_category_id, award.circuit_id, award.round_id,
+                award.player_id
             )
-            stat = award.stats.filter(stat_category=stat_category).first()
-            if not stat:
-                stat = Stat(stat_category=stat_category)
-            stat.total = record['total']
-            stat.save()
-            award.stats.add(stat)
-        
-        if award_created:
-            award_count['created'] += 1
+            existing.setdefault(key, award)
+
+        through = Award.stats.through
+        existing_stats = {}
+        award_stats = through.objects.filter(
+            award__circuit__season_id__in=season_ids).select_related(
+                'stat').order_by('pk')
+
+        for link in award_stats:
+            existing_stats.setdefault(
+                (link.award_id, link.stat.stat_category_id), link.stat)
+
+        new_awards = {}
+        new_stats = {}
+        changed_stats = {}
+        seen_keys = set()
+        updated_keys = set()
+
+        for entry, circuit, game_round in rows:
+            player = players[entry['player'].lower()]
+            key = (
+                categories[entry['category']].id, circuit.id, game_round.id,
+                player.id
+            )
+            seen_keys.add(key)
+
+            award = existing.get(key)
+            if not award and key not in new_awards:
+                new_awards[key] = Award(
+                    award_category_id=key[0], circuit=circuit,
+                    round=game_round, player=player
+                )
+
+            for record in entry['stats']:
+                stat_category = stat_categories[record['category']]
+                total = Decimal(str(record['total'])).quantize(Decimal('0.01'))
+
+                stat = new_stats.get((key, stat_category.id))
+                if not stat and award:
+                    stat = existing_stats.get((award.id, stat_category.id))
+
+                if not stat:
+                    new_stats[(key, stat_category.id)] = Stat(
+                        stat_category=stat_category, total=total)
+                elif stat.total != total:
+                    stat.total = total
+                    if stat.pk:
+                        changed_stats[stat.pk] = stat
+                else:
+                    continue
+
+                if award:
+                    updated_keys.add(key)
+
+        bulk_create_with_ids(
+            Award, new_awards.values(),
+            ['award_category_id', 'circuit_id', 'round_id', 'player_id'],
+            batch_size
+        )
+        bulk_create_with_ids(
+            Stat, new_stats.values(), ['stat_category_id', 'total'], batch_size)
+
+        awards_by_key = dict(existing)
+        awards_by_key.update(new_awards)
+
+        through.objects.bulk_create([
+            through(award_id=awards_by_key[key].id, stat_id=stat.id)
+            for (key, _), stat in new_stats.items()
+        ], batch_size=batch_size)
+
+        Stat.objects.bulk_update(
+            changed_stats.values(), ['total'], batch_size=batch_size)
+
+        award_count['created'] = len(new_awards)
+        award_count['updated'] = len(updated_keys)
+        award_count['unchanged'] = len(
+            seen_keys - updated_keys - set(new_awards))
+        stat_count['created'] = len(new_stats)
+        stat_count['updated'] = len(changed_stats)
+
+        # Bulk writes skip the signals that keep these up to date
+        index_objects(
+            SearchEntry.PLAYER, [player.id for player in new_players.values()])
+
+        if new_players or new_awards or new_stats or changed_stats:
+            invalidate_api_cache()
 
-        if player_created:
-            player_count['created'] += 1
-            
-    return {'awards': award_count, 'players': player_count}
+    return {'awards': award_count, 'players': player_count, 'stats': stat_count}
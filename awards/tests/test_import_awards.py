@@ -0,0 +1,153 @@
+from decimal import Decimal
+from pytest import mark
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from awards.models import Award, Stat
+from awards.services import bulk_import_awards
+from leagues.tests.factories import CircuitFactory, LeagueFactory, SeasonFactory
+from players.tests.factories import PlayerFactory
+from search.models import SearchEntry
+
+
+def _row(player, category='Queen of the Hive', week=1.0, total=1.5, **kwargs):
+    row = {
+        'week': week,
+        'week_name': '',
+        'season': 'Fall 2020',
+        'tier': '1',
+        'region': 'W',
+        'category': category,
+        'stats': [{'category': 'KDR', 'total': total}],
+        'player': player,
+    }
+    row.update(kwargs)
+    return row
+
+
+def _circuit():
+    league = LeagueFactory(name='Indy Gaming League')
+    season = SeasonFactory(name='Fall 2020', league=league)
+    return CircuitFactory(season=season, tier='1', region='W')
+
+
+def _stats(award):
+    return {
+        (stat.stat_category.name, stat.total) for stat in award.stats.all()}
+
+
+@mark.django_db
+def test_bulk_import_awards():
+    """
+    Awards are matched on category, circuit, round and player, and stat
+    totals of existing awards are updated.
+    """
+    circuit = _circuit()
+    alice = PlayerFactory(name='Alice')
+
+    counts = bulk_import_awards([
+        _row('alice'),
+        _row('Bob', category='Eternal Warrior', week=None, week_name='Week 2'),
+        _row('Carol', region='E'),
+        _row('Dave', week=99.0),
+        _row('Erin', season='Spring 2019'),
+    ])
+
+    assert counts['awards'] == {
+        'created': 2, 'updated': 0, 'unchanged': 0, 'deleted': 0, 'skipped': 3}
+    assert counts['players']['created'] == 1
+    assert counts['stats'] == {'created': 2, 'updated': 0}
+
+    award = Award.objects.get(player=alice)
+    assert award.circuit == circuit
+    assert award.round.round_number == 1
+    assert _stats(award) == {('KDR', Decimal('1.5'))}
+
+    bob = Award.objects.get(award_category__name='Eternal Warrior').player
+    assert bob.name == 'Bob'
+    assert SearchEntry.objects.filter(
+        kind=SearchEntry.PLAYER, object_id=bob.id).exists()
+
+    counts = bulk_import_awards([
+        _row('Alice', total=2.25, stats=[
+            {'category': 'KDR', 'total': 2.25},
+            {'category': 'Kills/Set', 'total': 4},
+        ]),
+        _row('Bob', category='Eternal Warrior', week=None, week_name='Week 2'),
+    ])
+
+    assert counts['awards'] == {
+        'created': 0, 'updated': 1, 'unchanged': 1, 'deleted': 0, 'skipped': 0}
+    assert counts['stats'] == {'created': 1, 'updated': 1}
+    assert _stats(award) == {
+        ('KDR', Decimal('2.25')), ('Kills/Set', Decimal('4'))}
+    assert Stat.objects.count() == 3
+
+
+@mark.django_db
+def test_bulk_import_awards_for_season():
+    """
+    Passing a season only imports its rows and only deletes its awards.
+    """
+    circuit = _circuit()
+    other = CircuitFactory(
+        season=SeasonFactory(name='Winter 2021', league=circuit.season.league),
+        tier='1', region='W'
+    )
+    bulk_import_awards([_row('Alice'), _row('Bob', season='Winter 2021')])
+
+    counts = bulk_import_awards(
+        [_row('Carol'), _row('Dave', season='Winter 2021')],
+        season=circuit.season, delete_before_import=True
+    )
+
+    assert counts['awards']['deleted'] == 1
+    assert counts['awards']['skipped'] == 1
+    assert set(Award.objects.values_list('player__name', 'circuit')) == {
+        ('Carol', circuit.id), ('Bob', other.id)}
+    assert Stat.objects.count() == 2
+
+
+@mark.django_db
+def test_bulk_import_awards_is_idempotent():
+    _circuit()
+    rows = [_row(f'Player {n}', total=n) for n in range(5)]
+    bulk_import_awards(rows)
+
+    with CaptureQueriesContext(connection) as context:
+        counts = bulk_import_awards(rows)
+
+    assert counts['awards']['unchanged'] == 5
+    assert not [
+        query for query in context.captured_queries
+        if query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))
+    ]
+
+
+@mark.django_db
+def test_bulk_import_awards_query_count():
+    """
+    The number of reads doesn't grow with the number of awards imported.
+    """
+    def reads(context):
+        return [
+            query for query in context.captured_queries
+            if not query['sql'].startswith('INSERT')
+        ]
+
+    def rows(start, count):
+        return [
+            _row(f'Player {n}', week=float(n % 6 + 1), total=n)
+            for n in range(start, start + count)
+        ]
+
+    _circuit()
+
+    connection.queries_log.clear()
+    with CaptureQueriesContext(connection) as few:
+        bulk_import_awards(rows(0, 2))
+
+    with CaptureQueriesContext(connection) as many:
+        bulk_import_awards(rows(2, 60))
+
+    assert Award.objects.count() == 62
+    assert len(reads(many)) <= len(reads(few))
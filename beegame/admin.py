@@ -1,11 +1,24 @@
 from django.contrib import admin
-from .models import Playing, Release
+from .models import Playing, PlayingRollup, PlayingSourceStatus, Release
 
 class PlayingAdmin(admin.ModelAdmin):
     
     list_display = ('total', 'updated', 'platform')
     search_fields = ('total', 'updated')
     
+class PlayingRollupAdmin(admin.ModelAdmin):
+    
+    list_display = (
+        'start', 'bucket', 'platform', 'samples', 'minimum', 'maximum',
+        'average')
+    list_filter = ('bucket', 'platform')
+
+class PlayingSourceStatusAdmin(admin.ModelAdmin):
+    
+    list_display = (
+        'name', 'platform', 'last_run', 'last_success', 'last_latency',
+        'runs', 'failures')
+
 class ReleaseAdmin(admin.ModelAdmin):
     
     list_display = ('buildid', 'version', 'title', 'released_on')
@@ -13,4 +26,6 @@ class ReleaseAdmin(admin.ModelAdmin):
     
 
 admin.site.register(Playing, PlayingAdmin)
+admin.site.register(PlayingRollup, PlayingRollupAdmin)
+admin.site.register(PlayingSourceStatus, PlayingSourceStatusAdmin)
 admin.site.register(Release, ReleaseAdmin)
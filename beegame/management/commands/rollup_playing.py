@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from beegame.services import prune_playing, rollup_playing
+
+class Command(BaseCommand):
+    help = 'Summarize player counts into hourly and daily rollups and prune old samples.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-days', type=int, default=None, help='Days of raw samples to keep, defaults to PLAYING_RETENTION_DAYS')
+        parser.add_argument('--no-prune', action='store_true', help='Keep every raw sample')
+
+    def handle(self, *args, **options):
+        result_count = rollup_playing()
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {result_count["hours"]} hourly and {result_count["days"]} daily rollups'))
+
+        if not options['no_prune']:
+            deleted = prune_playing(options['retention_days'])
+            self.stdout.write(self.style.SUCCESS(f'Pruned {deleted} samples'))
@@ -1,9 +1,16 @@
 from django.core.management.base import BaseCommand, CommandError
-from beegame.services import update_steam_playing_count
+from beegame.services import collect_playing
 
 class Command(BaseCommand):
     help = 'Update count of people currently playing KQB.'
 
     def handle(self, *args, **options):
-        playing_count_obj = update_steam_playing_count()
-        self.stdout.write(self.style.SUCCESS(f'Created {playing_count_obj}'))
+        report = collect_playing()
+
+        for name, entry in report.items():
+            if entry['error']:
+                self.stdout.write(self.style.ERROR(
+                    f'{name} failed: {entry["error"]}'))
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f'{name}: {entry["samples"]} samples in {entry["latency"]:.2f}s'))
@@ -0,0 +1,35 @@
+# Generated by Django 3.1 on 2026-10-18 20:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('beegame', '0003_auto_20201223_1600'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='playing',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.CreateModel(
+            name='PlayingRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.CharField(choices=[('H', 'Hour'), ('D', 'Day')], max_length=1)),
+                ('platform', models.CharField(choices=[('ST', 'Steam'), ('SW', 'Nintendo Switch'), ('XB', 'Xbox')], default='ST', max_length=2)),
+                ('start', models.DateTimeField()),
+                ('samples', models.PositiveIntegerField()),
+                ('minimum', models.PositiveSmallIntegerField()),
+                ('maximum', models.PositiveSmallIntegerField()),
+                ('average', models.FloatField()),
+            ],
+            options={
+                'verbose_name_plural': 'Playing Rollups',
+                'unique_together': {('bucket', 'platform', 'start')},
+            },
+        ),
+    ]
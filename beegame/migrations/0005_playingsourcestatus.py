@@ -0,0 +1,30 @@
+# Generated by Django 3.1 on 2026-10-18 20:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('beegame', '0004_playingrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlayingSourceStatus',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('platform', models.CharField(blank=True, choices=[('ST', 'Steam'), ('SW', 'Nintendo Switch'), ('XB', 'Xbox')], max_length=2, null=True)),
+                ('last_run', models.DateTimeField(blank=True, null=True)),
+                ('last_success', models.DateTimeField(blank=True, null=True)),
+                ('last_latency', models.FloatField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('runs', models.PositiveIntegerField(default=0)),
+                ('failures', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Playing Source Statuses',
+            },
+        ),
+    ]
@@ -9,7 +9,7 @@ PLATFORM_CHOICES = (
 )
 
 class Playing(models.Model):
-    updated = models.DateTimeField(auto_now=True)
+    updated = models.DateTimeField(auto_now=True, db_index=True)
     total = models.PositiveSmallIntegerField()
 
     platform = models.CharField(
@@ -34,6 +34,55 @@ class Playing(models.Model):
     def __str__(self):
         return f'{self.updated}: {self.total} Playing'
 
+class PlayingRollup(models.Model):
+    """Player counts from Playing samples summarized over an hour or a day."""
+    HOUR = 'H'
+    DAY = 'D'
+
+    BUCKET_CHOICES = (
+        (HOUR, 'Hour'),
+        (DAY, 'Day'),
+    )
+
+    bucket = models.CharField(max_length=1, choices=BUCKET_CHOICES)
+    platform = models.CharField(
+        max_length=2, choices=PLATFORM_CHOICES, default='ST')
+
+    start = models.DateTimeField()
+    samples = models.PositiveIntegerField()
+    minimum = models.PositiveSmallIntegerField()
+    maximum = models.PositiveSmallIntegerField()
+    average = models.FloatField()
+
+    class Meta:
+        verbose_name_plural = 'Playing Rollups'
+        unique_together = ['bucket', 'platform', 'start']
+
+    def __str__(self):
+        return f'{self.get_bucket_display()} of {self.start}: {self.average:.0f} Playing'
+
+class PlayingSourceStatus(models.Model):
+    """How the latest player count collection went for one source."""
+    name = models.CharField(max_length=255, unique=True)
+    platform = models.CharField(
+        max_length=2, choices=PLATFORM_CHOICES, blank=True, null=True)
+
+    last_run = models.DateTimeField(blank=True, null=True)
+    last_success = models.DateTimeField(blank=True, null=True)
+
+    # Seconds the source took to answer on its latest run
+    last_latency = models.FloatField(blank=True, null=True)
+    last_error = models.TextField(blank=True, null=True)
+
+    runs = models.PositiveIntegerField(default=0)
+    failures = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'Playing Source Statuses'
+
+    def __str__(self):
+        return f'{self.name}: {self.failures} failures in {self.runs} runs'
+
 class Release(models.Model):
     version = models.DecimalField(max_digits=5, decimal_places=2, blank=True, null=True)
     buildid = models.PositiveSmallIntegerField()
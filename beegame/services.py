@@ -1,21 +1,65 @@
-import requests
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import timedelta
 from django.conf import settings
-from .models import Playing
+from django.db import transaction
+from django.db.models import Avg, Count, F, FloatField, Max, Min, Sum
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+from django.utils.module_loading import import_string
+import requests
+from requests.adapters import HTTPAdapter
+from buzz.services import get_http_session
+from .models import Playing, PlayingRollup, PlayingSourceStatus
 
-class Steam:
-    
-    def __init__(self):
-        
+class PlayingSource:
+    """
+    A place to read how many people are playing on one platform.
+
+    Subclasses set `platform` and implement `fetch`. Sources are listed in
+    the PLAYING_SOURCES setting and run side by side by `collect_playing`.
+
+    Arguments:
+    name -- Name to record latency and failures under. (str) (optional)
+    deadline -- Seconds the source has to answer, defaults to
+                PLAYING_SOURCE_DEADLINE. (float) (optional)
+    """
+    platform = None
+
+    def __init__(self, name=None, deadline=None):
+        self.name = name or self.__class__.__name__
+
+        if deadline is None:
+            deadline = getattr(settings, 'PLAYING_SOURCE_DEADLINE', 10)
+        self.deadline = deadline
+
+    def fetch(self, session):
+        """
+        Return unsaved Playing samples for this platform.
+
+        Arguments:
+        session -- HTTP session to make requests with. (Session)
+        """
+        raise NotImplementedError
+
+
+class Steam(PlayingSource):
+
+    platform = 'ST'
+
+    def __init__(self, api_base='http://api.steampowered.com', **kwargs):
+        super().__init__(**kwargs)
 
         self.GAME_ID = settings.STEAM_GAME_ID
-        self.API_BASE = 'http://api.steampowered.com'
+        self.API_BASE = api_base
     
-    def get_playing_count(self, simulate=False, timeout=120):
+    def get_playing_count(self, simulate=False, timeout=120, session=None):
         """Get a count all people playing KQB on Steam currently."""
         
+        session = session or get_http_session()
         params = {'appid': self.GAME_ID}
         api_path = f'ISteamUserStats/GetNumberOfCurrentPlayers/v0001/?appid={self.GAME_ID}'
-        resp = requests.get(
+        resp = session.get(
             f'{self.API_BASE}/{api_path}', params=params, timeout=timeout)
         
         if resp.status_code == 200:
@@ -23,16 +67,302 @@ class Steam:
         
         return None
 
+    def fetch(self, session):
+        total = self.get_playing_count(timeout=self.deadline, session=session)
+
+        if total is None:
+            raise ValueError('Steam did not return a player count')
+
+        return [Playing(platform=self.platform, total=total)]
+
+
+class JSONPlayingSource(PlayingSource):
+    """
+    A platform whose counts are served as JSON by an HTTP endpoint.
+
+    The response should be an object with `total` and optionally
+    `ranked_total`, `quickplay_total`, `custom_total` and
+    `operating_system`, or a list of such objects.
+
+    Arguments:
+    platform -- Platform code the counts are for, e.g. SW. (str)
+    url -- Endpoint to read counts from. (str)
+    """
+    FIELDS = (
+        'total', 'ranked_total', 'quickplay_total', 'custom_total',
+        'operating_system'
+    )
+
+    def __init__(self, platform, url, **kwargs):
+        kwargs.setdefault('name', f'{platform} JSON')
+        super().__init__(**kwargs)
+        self.platform = platform
+        self.url = url
+
+    def fetch(self, session):
+        resp = session.get(self.url, timeout=self.deadline)
+        resp.raise_for_status()
+
+        entries = resp.json()
+        if isinstance(entries, dict):
+            entries = [entries]
+
+        return [
+            Playing(platform=self.platform, **{
+                field: entry[field] for field in self.FIELDS if field in entry
+            })
+            for entry in entries
+        ]
+
+
+def get_playing_sources():
+    """
+    Build the sources listed in the PLAYING_SOURCES setting.
+
+    Each entry is a dict with the dotted path of a PlayingSource subclass as
+    `class` and any other keys passed to it as keyword arguments.
+    """
+    sources = []
+
+    for entry in getattr(settings, 'PLAYING_SOURCES', [
+        {'class': 'beegame.services.Steam'}]):
+        options = dict(entry)
+        source_class = import_string(options.pop('class'))
+        sources.append(source_class(**options))
+
+    return sources
+
+
+def get_playing_session():
+    """
+    Return a new requests Session for collecting player counts.
+
+    Unlike the shared session it never retries, so a request can't outlast
+    its source's deadline by retrying and backing off.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(max_retries=0)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+    return session
+
+
+def _timed_fetch(source, session):
+    start = time.monotonic()
+    samples = source.fetch(session)
+    return samples, time.monotonic() - start
+
+
+def collect_playing(sources=None, session=None):
+    """
+    Read every source's player counts at once and save them together.
+
+    Sources run in a thread pool. Any source that errors or misses its
+    deadline is recorded as a failure and the rest are still saved, in a
+    single bulk insert. Returns a dict per source name with its `latency`
+    in seconds, number of `samples` and `error`, if any.
 
-def update_steam_playing_count(timeout=120):
+    Arguments:
+    sources -- Sources to read, defaults to PLAYING_SOURCES. (list)
+               (optional)
+    session -- HTTP session to share between sources, defaults to one from
+               get_playing_session. (Session) (optional)
     """
-    Update database with number of people currently playing game in steam.
+    if sources is None:
+        sources = get_playing_sources()
+
+    session = session or get_playing_session()
+    report = {}
+    samples = []
+
+    if not sources:
+        return report
+
+    names = [source.name for source in sources]
+    if len(set(names)) != len(names):
+        raise ValueError(f'Playing sources need unique names: {names}')
+
+    executor = ThreadPoolExecutor(max_workers=len(sources))
+    start = time.monotonic()
+
+    futures = {
+        executor.submit(_timed_fetch, source, session): source
+        for source in sources
+    }
+    wait(futures, timeout=max(source.deadline for source in sources))
+
+    # Don't hold the tick up for sources that are still going
+    executor.shutdown(wait=False)
+
+    for future, source in futures.items():
+        entry = {'latency': None, 'samples': 0, 'error': None}
+        report[source.name] = entry
+
+        if not future.done():
+            entry['latency'] = time.monotonic() - start
+            entry['error'] = f'No answer within {source.deadline}s'
+            continue
+
+        try:
+            source_samples, entry['latency'] = future.result()
+        except Exception as error:
+            entry['error'] = repr(error)
+            continue
+
+        if entry['latency'] > source.deadline:
+            entry['error'] = f'No answer within {source.deadline}s'
+            continue
+
+        entry['samples'] = len(source_samples)
+        samples.extend(source_samples)
+
+    with transaction.atomic():
+        Playing.objects.bulk_create(samples)
+        record_playing_sources(sources, report)
+
+    return report
+
+
+def record_playing_sources(sources, report):
     """
-    steam = Steam()
-    playing_count = steam.get_playing_count(timeout=timeout)
-    obj = None
+    Save each source's latest latency and failure to PlayingSourceStatus.
+
+    Arguments:
+    sources -- Sources that ran. (list)
+    report -- Results from `collect_playing`, keyed by source name. (dict)
+    """
+    now = timezone.now()
+    statuses = {
+        status.name: status for status in PlayingSourceStatus.objects.filter(
+            name__in=report.keys())
+    }
+
+    new_statuses = []
+    for source in sources:
+        entry = report[source.name]
+        status = statuses.get(source.name)
+
+        if status is None:
+            status = PlayingSourceStatus(name=source.name)
+            new_statuses.append(status)
+
+        status.platform = source.platform
+        status.last_run = now
+        status.last_latency = entry['latency']
+        status.last_error = entry['error']
+        status.runs += 1
+
+        if entry['error']:
+            status.failures += 1
+        else:
+            status.last_success = now
+
+    PlayingSourceStatus.objects.bulk_create(new_statuses)
+    PlayingSourceStatus.objects.bulk_update(
+        list(statuses.values()), [
+            'platform', 'last_run', 'last_success', 'last_latency',
+            'last_error', 'runs', 'failures'
+        ]
+    )
+
+
+def rollup_playing():
+    """
+    Summarize Playing samples into hourly and daily PlayingRollups.
+
+    Only buckets from the latest hourly rollup onwards are rebuilt, since
+    that hour may have been partial last time. Daily rollups are built from
+    the hourly ones so they stay correct after raw samples are pruned.
+    Returns the number of hourly and daily rollups written.
+    """
+    counts = {'hours': 0, 'days': 0}
+
+    since = PlayingRollup.objects.filter(
+        bucket=PlayingRollup.HOUR).aggregate(start=Max('start'))['start']
+
+    if since is None:
+        since = Playing.objects.aggregate(start=Min('updated'))['start']
+
+        if since is None:
+            return counts
+
+    since = since.replace(minute=0, second=0, microsecond=0)
+    day = since.replace(hour=0)
+
+    hours = Playing.objects.filter(updated__gte=since).annotate(
+        bucket_start=TruncHour('updated')).values(
+            'platform', 'bucket_start').annotate(
+                samples=Count('id'), minimum=Min('total'),
+                maximum=Max('total'), average=Avg('total')
+            ).order_by()
+
+    with transaction.atomic():
+        PlayingRollup.objects.filter(
+            bucket=PlayingRollup.HOUR, start__gte=since).delete()
+
+        PlayingRollup.objects.bulk_create([
+            PlayingRollup(
+                bucket=PlayingRollup.HOUR, platform=row['platform'],
+                start=row['bucket_start'], samples=row['samples'],
+                minimum=row['minimum'], maximum=row['maximum'],
+                average=row['average']
+            )
+            for row in hours
+        ])
+
+        days = PlayingRollup.objects.filter(
+            bucket=PlayingRollup.HOUR, start__gte=day).annotate(
+                bucket_start=TruncDay('start')).values(
+                    'platform', 'bucket_start').annotate(
+                        total_samples=Sum('samples'),
+                        lowest=Min('minimum'), highest=Max('maximum'),
+                        weighted=Sum(
+                            F('average') * F('samples'),
+                            output_field=FloatField())
+                    ).order_by()
+
+        daily = [
+            PlayingRollup(
+                bucket=PlayingRollup.DAY, platform=row['platform'],
+                start=row['bucket_start'], samples=row['total_samples'],
+                minimum=row['lowest'], maximum=row['highest'],
+                average=row['weighted'] / row['total_samples']
+            )
+            for row in days
+        ]
+
+        PlayingRollup.objects.filter(
+            bucket=PlayingRollup.DAY, start__gte=day).delete()
+        PlayingRollup.objects.bulk_create(daily)
+
+    counts['hours'] = len(hours)
+    counts['days'] = len(daily)
+
+    return counts
+
+
+def prune_playing(retention_days=None):
+    """
+    Delete raw Playing samples older than the retention period.
+
+    Samples newer than the latest hourly rollup are always kept, so nothing
+    is deleted before it has been summarized. Returns the number deleted.
+
+    Arguments:
+    retention_days -- Days of raw samples to keep, defaults to
+                      PLAYING_RETENTION_DAYS. (int) (optional)
+    """
+    if retention_days is None:
+        retention_days = getattr(settings, 'PLAYING_RETENTION_DAYS', 30)
+
+    rolled_up = PlayingRollup.objects.filter(
+        bucket=PlayingRollup.HOUR).aggregate(start=Max('start'))['start']
+
+    if rolled_up is None:
+        return 0
 
-    if playing_count:
-        obj = Playing.objects.create(total=playing_count)
+    cutoff = min(timezone.now() - timedelta(days=retention_days), rolled_up)
+    deleted, _ = Playing.objects.filter(updated__lt=cutoff).delete()
 
-    return obj
\ No newline at end of file
+    return deleted
@@ -0,0 +1,120 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+from pytest import fixture, mark
+from beegame.models import Playing, PlayingSourceStatus
+from beegame.services import (
+    JSONPlayingSource, Steam, collect_playing, get_playing_session)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers like the platform APIs, with paths for slow and broken ones."""
+    unavailable_hits = 0
+
+    def do_GET(self):
+        if self.path.startswith('/slow'):
+            time.sleep(1)
+
+        if self.path.startswith('/unavailable'):
+            StubHandler.unavailable_hits += 1
+            self.send_response(503)
+            self.end_headers()
+            return
+
+        if self.path.startswith('/broken'):
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        if self.path.startswith('/ISteamUserStats'):
+            body = {'response': {'player_count': 120}}
+        else:
+            body = [
+                {'total': 40, 'ranked_total': 10},
+                {'total': 5, 'custom_total': 5},
+            ]
+
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@fixture
+def stub_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+
+    server.shutdown()
+    server.server_close()
+
+
+@mark.django_db
+def test_collect_playing(stub_server):
+    """
+    Sources run side by side; answers are saved together and slow or broken
+    sources are recorded as failures without holding the rest up.
+    """
+    sources = [
+        Steam(api_base=stub_server, deadline=2),
+        JSONPlayingSource('SW', f'{stub_server}/switch', deadline=2),
+        JSONPlayingSource(
+            'XB', f'{stub_server}/slow', name='Slow', deadline=0.2),
+        JSONPlayingSource(
+            'XB', f'{stub_server}/broken', name='Broken', deadline=2),
+    ]
+
+    start = time.monotonic()
+    report = collect_playing(sources, session=requests.Session())
+
+    assert time.monotonic() - start < 1
+    assert report['Steam']['samples'] == 1
+    assert report['Steam']['error'] is None
+    assert report['SW JSON']['samples'] == 2
+    assert report['Slow']['error']
+    assert '404' in report['Broken']['error']
+
+    assert sorted(Playing.objects.values_list('platform', 'total')) == [
+        ('ST', 120), ('SW', 5), ('SW', 40)]
+    assert Playing.objects.get(platform='SW', total=40).ranked_total == 10
+
+    steam = PlayingSourceStatus.objects.get(name='Steam')
+    assert steam.last_latency < 1
+    assert steam.last_success
+
+    broken = PlayingSourceStatus.objects.get(name='Broken')
+    assert (broken.runs, broken.failures) == (1, 1)
+    assert broken.last_success is None
+
+    collect_playing(sources[:1], session=requests.Session())
+    steam.refresh_from_db()
+    assert (steam.runs, steam.failures) == (2, 0)
+
+
+@mark.django_db
+def test_collect_playing_does_not_retry(stub_server):
+    """
+    Failing sources are asked once, so retries can't run past the deadline.
+    """
+    StubHandler.unavailable_hits = 0
+    source = JSONPlayingSource(
+        'XB', f'{stub_server}/unavailable', name='Unavailable', deadline=2)
+
+    session = get_playing_session()
+    assert session.get_adapter(stub_server).max_retries.total == 0
+
+    report = collect_playing([source], session=session)
+
+    assert '503' in report['Unavailable']['error']
+    assert StubHandler.unavailable_hits == 1
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+from pytest import mark
+from django.utils import timezone
+from beegame.models import Playing, PlayingRollup
+from beegame.services import prune_playing, rollup_playing
+
+
+def _sample(when, total, platform='ST'):
+    sample = Playing.objects.create(total=total, platform=platform)
+
+    # `updated` is auto_now, so backdate it with an update
+    Playing.objects.filter(pk=sample.pk).update(updated=when)
+    return sample
+
+
+@mark.django_db
+def test_rollup_playing():
+    """
+    Samples are summarized per platform by hour, and hours by day weighted
+    by how many samples each had.
+    """
+    day = datetime(2021, 3, 1, tzinfo=timezone.utc)
+
+    for minute, total in ((0, 10), (20, 20), (40, 30)):
+        _sample(day + timedelta(hours=1, minutes=minute), total)
+    _sample(day + timedelta(hours=2), 70)
+    _sample(day + timedelta(hours=2, minutes=5), 5, platform='SW')
+    _sample(day + timedelta(days=1, hours=3), 40)
+
+    assert rollup_playing() == {'hours': 4, 'days': 3}
+
+    hour = PlayingRollup.objects.get(
+        bucket=PlayingRollup.HOUR, platform='ST', start=day + timedelta(hours=1))
+    assert (hour.samples, hour.minimum, hour.maximum, hour.average) == (
+        3, 10, 30, 20)
+
+    daily = PlayingRollup.objects.get(
+        bucket=PlayingRollup.DAY, platform='ST', start=day)
+    assert (daily.samples, daily.minimum, daily.maximum, daily.average) == (
+        4, 10, 70, 32.5)
+
+    # Running again only rebuilds from the latest hour onwards
+    _sample(day + timedelta(days=1, hours=3, minutes=30), 60)
+    assert rollup_playing() == {'hours': 1, 'days': 1}
+
+    latest = PlayingRollup.objects.get(
+        bucket=PlayingRollup.DAY, start=day + timedelta(days=1))
+    assert (latest.samples, latest.average) == (2, 50)
+    assert PlayingRollup.objects.count() == 7
+
+
+@mark.django_db
+def test_prune_playing():
+    """
+    Old samples are deleted, but never before they've been rolled up.
+    """
+    now = timezone.now()
+    old = _sample(now - timedelta(days=40), 10)
+    recent = _sample(now - timedelta(days=2), 20)
+
+    assert prune_playing(retention_days=30) == 0
+
+    rollup_playing()
+    assert prune_playing(retention_days=30) == 1
+    assert not Playing.objects.filter(pk=old.pk).exists()
+    assert Playing.objects.filter(pk=recent.pk).exists()
+
+    # The daily rollup survives its samples being pruned
+    assert PlayingRollup.objects.filter(
+        bucket=PlayingRollup.DAY, samples=1, minimum=10).exists()
@@ -1,8 +1,17 @@
+import csv
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from itertools import islice
 import pytz
 import re
+import threading
 import requests
 from django.urls import reverse
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+_http_session = None
+_http_session_lock = threading.Lock()
 
 
 def convert_et_to_utc(date_obj):
@@ -20,6 +29,34 @@ def convert_et_to_utc(date_obj):
     utc_date = utc_date.replace(tzinfo=pytz.UTC)
     return utc_date
 
+def get_http_session():
+    """
+    Return a requests Session shared by everything calling external APIs.
+
+    Connections are kept alive and pooled per host, so repeat calls skip the
+    TCP and TLS handshakes. Failed connections and 429/5xx responses to
+    idempotent requests are retried with exponential backoff.
+    """
+    global _http_session
+
+    with _http_session_lock:
+        if _http_session is None:
+            retry = Retry(
+                total=3, backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                respect_retry_after_header=True, raise_on_status=False
+            )
+            adapter = HTTPAdapter(
+                pool_connections=10, pool_maxsize=10, max_retries=retry)
+
+            session = requests.Session()
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _http_session = session
+
+    return _http_session
+
+
 def get_sheet_csv(sheets_url, output_filename=None, write_to_file=False):
     """
     Access a publicly available googlesheet tab of match data and save as CSV.
@@ -42,6 +79,202 @@ def get_sheet_csv(sheets_url, output_filename=None, write_to_file=False):
         return resp.text
 
 
+def iter_sheet_csv(sheets_url, chunk_size=8192, session=None, timeout=30):
+    """
+    Stream a publicly available googlesheet tab as CSV, one line at a time.
+
+    Lines are yielded as they arrive rather than after the whole sheet has
+    downloaded, and keep their line endings so quoted values spanning
+    several lines survive csv.reader. Error responses raise before any line
+    is yielded.
+
+    Arguments:
+    sheets_url -- A specially crafted URL that provides a CSV export of a google sheet
+           tab.
+    chunk_size -- Bytes to read from the response at a time. (int) (optional)
+    session -- HTTP session to download with, defaults to the shared
+               session. (Session) (optional)
+    timeout -- Seconds to wait on the sheet to respond. (int) (optional)
+    """
+    session = session or get_http_session()
+
+    with session.get(sheets_url, stream=True, timeout=timeout) as resp:
+        resp.raise_for_status()
+        resp.encoding = resp.encoding or 'utf-8'
+        yield from iter_text_lines(
+            resp.iter_content(chunk_size=chunk_size, decode_unicode=True))
+
+
+def fetch_sheet_csvs(sheet_urls, session=None, timeout=30):
+    """
+    Download several googlesheet tabs as CSV at the same time.
+
+    Returns a dict of each key in `sheet_urls` to the CSV text of its tab.
+    Raises the first error hit, including error responses, once every
+    download has finished.
+
+    Arguments:
+    sheet_urls -- Keys to CSV export URLs of google sheet tabs. (dict)
+    session -- HTTP session to download with, defaults to the shared
+               session. (Session) (optional)
+    timeout -- Seconds to wait on each sheet to respond. (int) (optional)
+    """
+    session = session or get_http_session()
+
+    def fetch(sheets_url):
+        resp = session.get(sheets_url, timeout=timeout)
+        resp.raise_for_status()
+        resp.encoding = resp.encoding or 'utf-8'
+        return resp.text
+
+    if not sheet_urls:
+        return {}
+
+    with ThreadPoolExecutor(max_workers=len(sheet_urls)) as executor:
+        futures = {
+            key: executor.submit(fetch, sheets_url)
+            for key, sheets_url in sheet_urls.items()
+        }
+
+    return {key: future.result() for key, future in futures.items()}
+
+
+def iter_text_lines(chunks):
+    """
+    Re-split chunks of text into lines, keeping line endings.
+
+    Arguments:
+    chunks -- Pieces of text in order, split at arbitrary points. (iterable)
+    """
+    pending = ''
+
+    for chunk in chunks:
+        lines = (pending + chunk).split('\n')
+
+        # The last piece hasn't seen its line ending yet
+        pending = lines.pop()
+        for line in lines:
+            yield line + '\n'
+
+    if pending:
+        yield pending
+
+
+def read_csv_rows(csv_data):
+    """
+    Return a csv.reader over CSV text or an iterable of CSV lines.
+
+    Arguments:
+    csv_data -- Raw CSV data, or lines of it such as from iter_sheet_csv.
+                (str|iterable)
+    """
+    if isinstance(csv_data, str):
+        csv_data = csv_data.splitlines()
+
+    return csv.reader(csv_data, delimiter=',')
+
+
+def chunked(iterable, size):
+    """
+    Yield successive lists of at most `size` items from any iterable.
+
+    Arguments:
+    iterable -- Items to split up, may be a generator. (iterable)
+    size -- Maximum number of items per chunk. (int)
+    """
+    iterator = iter(iterable)
+
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def bulk_create_with_ids(model, objs, key_fields, batch_size=None):
+    """
+    Bulk create objects and make sure each one ends up with its primary key.
+
+    MySQL and SQLite don't hand back ids from a bulk insert, so new rows are
+    read back by id and matched to `objs` on `key_fields`. Rows sharing a key
+    are matched in insert order. Call inside a transaction.
+
+    Arguments:
+    model -- Model class to create rows for. (Model)
+    objs -- Unsaved model instances. (list)
+    key_fields -- Attribute names that together identify a new row, e.g.
+                  ['match_id']. (list)
+    batch_size -- Rows per INSERT statement. (int) (optional)
+    """
+    objs = list(objs)
+    if not objs:
+        return objs
+
+    manager = model._base_manager
+    last_id = manager.order_by('-pk').values_list('pk', flat=True).first() or 0
+
+    manager.bulk_create(objs, batch_size=batch_size)
+
+    if all(obj.pk is not None for obj in objs):
+        return objs
+
+    pending = {}
+    for obj in objs:
+        key = tuple(getattr(obj, field) for field in key_fields)
+        pending.setdefault(key, []).append(obj)
+
+    rows = manager.filter(pk__gt=last_id).order_by('pk').values_list(
+        'pk', *key_fields)
+
+    for pk, *key in rows.iterator():
+        waiting = pending.get(tuple(key))
+        if waiting:
+            waiting.pop(0).pk = pk
+
+    return objs
+
+
+def parse_byte_range(header, size):
+    """
+    Return the (first, last) byte positions asked for by an HTTP Range header.
+
+    Returns None when the whole resource should be sent: no header, a unit
+    other than bytes, or several ranges at once. Raises ValueError when the
+    range can't be satisfied.
+
+    Arguments:
+    header -- Value of the Range header, e.g. 'bytes=0-499'. (str)
+    size -- Length of the resource in bytes. (int)
+    """
+    if not header:
+        return None
+
+    unit, _, ranges = header.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in ranges:
+        return None
+
+    first, _, last = ranges.strip().partition('-')
+
+    try:
+        if first:
+            first = int(first)
+            last = int(last) if last else size - 1
+        else:
+            # A suffix range: the final `last` bytes
+            first = size - int(last)
+            last = size - 1
+
+    except ValueError:
+        return None
+
+    first = max(first, 0)
+
+    if first >= size or last < first:
+        raise ValueError(f'Range {header} not satisfiable for {size} bytes')
+
+    return first, min(last, size - 1)
+
+
 def get_object_admin_link(obj, link_text):
     url = reverse(
         f'admin:{obj._meta.app_label}_{obj._meta.model_name}_change',
@@ -71,6 +71,7 @@ INSTALLED_APPS = [
     'streams',
     'beegame',
     'staff',
+    'search',
     'api'
 
 ]
@@ -169,15 +170,42 @@ REST_FRAMEWORK = {
     'DEFAULT_VERSION': 1.0
 }   
 
+# Seconds to keep cached API responses; writes invalidate them sooner
+API_CACHE_TIMEOUT = 300
+
+# Name filters look names up through the search index rather than scanning
+# with LIKE, and /search/ leaves out names sharing fewer trigrams than this
+SEARCH_INDEX_FILTERS = True
+SEARCH_SIMILARITY_THRESHOLD = 0.3
+
+# Queued result uploads: attempts before giving up, seconds before the first
+# retry (doubling each time), and seconds before a stuck job is picked up again
+RESULT_SUBMISSION_MAX_ATTEMPTS = 3
+RESULT_SUBMISSION_RETRY_DELAY = 30
+RESULT_SUBMISSION_LOCK_TIMEOUT = 600
+
 
 # Steam Settings
 STEAM_GAME_ID = '663670'
 
+# Days of raw player count samples to keep once they've been rolled up
+PLAYING_RETENTION_DAYS = 30
+
+# Where player counts are collected from, and seconds each source has to answer
+PLAYING_SOURCES = [
+    {'class': 'beegame.services.Steam'},
+]
+PLAYING_SOURCE_DEADLINE = 10
+
 # Streams/Twitch Settings
 TWITCH_CLIENT_ID = get_secret('TWITCH_CLIENT_ID')
 TWITCH_CLIENT_SECRET = get_secret('TWITCH_CLIENT_SECRET')
 TWITCH_GAME_ID = '506455'
 
+# Caps on one poll of live streams; polls cut short don't mark streams offline
+TWITCH_MAX_PAGES = 20
+TWITCH_MAX_POLL_SECONDS = 60
+
 # BGL
 BGL_AUTH_HANDOFF_URL = 'https://league.beegame.gg'
 
@@ -0,0 +1,134 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+from pytest import fixture, raises
+from buzz.services import (
+    fetch_sheet_csvs, get_http_session, iter_sheet_csv, iter_text_lines,
+    parse_byte_range, read_csv_rows)
+
+
+class SheetHandler(BaseHTTPRequestHandler):
+    """Serves a slow CSV tab per path, or a 404 for /missing."""
+
+    def do_GET(self):
+        if self.path == '/missing':
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        time.sleep(0.3)
+        data = f'Sheet\r\n{self.path[1:]}\r\n'.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/csv; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@fixture
+def sheet_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SheetHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+
+    server.shutdown()
+    server.server_close()
+
+
+def test_iter_text_lines_rejoins_split_lines():
+    """
+    Lines split across chunks come out whole, with their line endings.
+    """
+    chunks = ['Team,Ti', 'er\r', '\nBees,1\r\nWa', 'sps', ',2']
+
+    assert list(iter_text_lines(chunks)) == [
+        'Team,Tier\r\n', 'Bees,1\r\n', 'Wasps,2']
+
+
+def test_read_csv_rows_from_lines():
+    """
+    Quoted values spanning several lines survive streaming.
+    """
+    lines = iter_text_lines(['Team,Bio\r\n', 'Bees,"Line one\r\n', 'Line two"\r\n'])
+
+    assert list(read_csv_rows(lines)) == [
+        ['Team', 'Bio'], ['Bees', 'Line one\r\nLine two']]
+    assert list(read_csv_rows('Team,Tier\nBees,1')) == [
+        ['Team', 'Tier'], ['Bees', '1']]
+
+
+def test_parse_byte_range():
+    """
+    Single byte ranges are clamped to the resource; anything else means the
+    whole resource, or an error if it can't be satisfied.
+    """
+    assert parse_byte_range('bytes=0-9', 100) == (0, 9)
+    assert parse_byte_range('bytes=90-', 100) == (90, 99)
+    assert parse_byte_range('bytes=90-500', 100) == (90, 99)
+    assert parse_byte_range('bytes=-10', 100) == (90, 99)
+    assert parse_byte_range('bytes=-500', 100) == (0, 99)
+
+    assert parse_byte_range(None, 100) is None
+    assert parse_byte_range('lines=0-9', 100) is None
+    assert parse_byte_range('bytes=0-9,20-29', 100) is None
+    assert parse_byte_range('bytes=a-b', 100) is None
+
+    with raises(ValueError):
+        parse_byte_range('bytes=100-', 100)
+
+    with raises(ValueError):
+        parse_byte_range('bytes=9-0', 100)
+
+
+def test_http_session_is_shared_and_retries():
+    """
+    One pooled session is reused, with retries on throttling and 5xx.
+    """
+    session = get_http_session()
+    assert get_http_session() is session
+
+    retry = session.get_adapter('https://api.twitch.tv').max_retries
+    assert retry.total == 3
+    assert 503 in retry.status_forcelist
+
+
+def test_fetch_sheet_csvs(sheet_server):
+    """
+    Sheets download side by side, and error responses raise.
+    """
+    sheet_urls = {
+        stage: f'{sheet_server}/{stage}'
+        for stage in ('teams', 'matches', 'awards')
+    }
+
+    start = time.monotonic()
+    sheets = fetch_sheet_csvs(sheet_urls, session=requests.Session())
+
+    assert time.monotonic() - start < 0.8
+    assert sheets == {
+        stage: f'Sheet\r\n{stage}\r\n' for stage in sheet_urls}
+    assert fetch_sheet_csvs({}) == {}
+
+    with raises(requests.HTTPError):
+        fetch_sheet_csvs(
+            {'teams': f'{sheet_server}/missing'}, session=requests.Session())
+
+
+def test_iter_sheet_csv(sheet_server):
+    """
+    A sheet streams line by line, and error responses raise.
+    """
+    session = requests.Session()
+
+    lines = iter_sheet_csv(f'{sheet_server}/teams', session=session)
+    assert list(lines) == ['Sheet\r\n', 'teams\r\n']
+
+    with raises(requests.HTTPError):
+        list(iter_sheet_csv(f'{sheet_server}/missing', session=session))
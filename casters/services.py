@@ -1,19 +1,24 @@
-import csv
-from django.db import IntegrityError
-from buzz.services import get_sheet_csv
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+from buzz.services import bulk_create_with_ids, get_sheet_csv, read_csv_rows
 from players.models import Player
+from search.models import SearchEntry
+from search.services import index_objects
 from .models import Caster, NameMapping, Settings
 
-def parse_casters_csv(csv_data):
+def parse_casters_csv(csv_data, ignore_names=None):
     """
-    Parse through CSV data of caster, convert to a list of caster data dicts.
+    Parse through CSV data of caster, yielding a caster data dict per row.
 
     Arguments:
-    csv_data -- Raw CSV data containing caster information. (str)
+    csv_data -- Raw CSV data containing caster information, or an iterable
+                of its lines. (str|iterable)
+    ignore_names -- Caster names to leave out, e.g. the comma separated
+                    `ignore_names` of caster Settings split into a list.
+                    Matched ignoring case. (iterable) (optional)
     """
-    rows = csv.reader(csv_data.splitlines(), delimiter=',')
-    ignore_names = Settings.objects.first().ignore_names.lower().split(',')
-    casters = []
+    rows = read_csv_rows(csv_data)
+    ignore_names = {name.strip().lower() for name in ignore_names or []}
     headers = {
         'Community Caster': None,
         'Stream Link': None,
@@ -42,68 +47,141 @@ def parse_casters_csv(csv_data):
                 for key, val in headers.items():
                     caster[key.lower().replace(' ', '_')] = row[val]
 
-                casters.append(caster)
-    
-    return casters
+                yield caster
 
 
-def bulk_import_casters(caster_list, delete_before_import=True):
+def bulk_import_casters(caster_list, delete_before_import=False, batch_size=500):
     """
-    Given a list of caster data, bulk import into database.
+    Given a list of caster data, import it into the database.
 
-    Needs optimization in the future, but steps for now:
+    Players, casters and name mappings are loaded into dicts once, the sheet
+    is diffed against them and only the differences are written:
 
-    1. Delete all existing casters (if specified).
-    2. Loop through a dicictionary of casters.
-    3. Create Caster object based on data provided in Caster list entries:        
-    4. Look for existing Player object to link to Caster
-        - Create Player object and link to caster if does not exist
+    1. Find the player for each caster by name, ignoring case, falling back
+       to the player name of a NameMapping for the caster name
+        - Create Player object if neither exists
+    2. Create a Caster for players that don't have one
+    3. Update caster bio links and player Twitch usernames that changed
+
+    Existing casters are kept rather than deleted and re-created, so matches
+    keep their casters across imports.
 
     Arguments:
-    Caster_list -- List of caster data derived from team CSV sheet. (list)
+    caster_list -- Caster dicts derived from the casters CSV sheet, e.g. as
+                   yielded by parse_casters_csv. (iterable)
     delete_before_import -- Delete all existing Caster then initiate
-                            import process. A way to start clean with
-                            new data. (bool) (optional)
+                            import process. Also clears the casters of
+                            every match. (bool) (optional)
+    batch_size -- Rows per INSERT or UPDATE statement. (int) (optional)
     """
-    caster_count = {'created': 0, 'updated': 0, 'deleted': 0}
+    from api.cache import invalidate_api_cache
+
+    caster_count = {'created': 0, 'updated': 0, 'unchanged': 0, 'deleted': 0}
     player_count = {'created': 0, 'updated': 0, 'deleted': 0}
 
-    # Clear out all old data
-    if delete_before_import:
-        existing_casters = Caster.objects.all()
-        caster_count['deleted'] = existing_casters.count()
-        existing_casters.delete()
-    
-    for entry in caster_list:
-        # Search for existing player and caster object
-        player = Player.objects.filter(name=entry['community_caster']).first()
-        player_created = False
-
-        if not player:
-            name_mapping = NameMapping.objects.filter(
-                caster_name=entry['community_caster']).first()
-            
-            if name_mapping:
-                player, player_created = Player.objects.get_or_create(
-                    name=name_mapping.player_name)
-            else:
-                player, player_created = Player.objects.get_or_create(
-                    name=entry['community_caster'])
-
-        caster, caster_created = Caster.objects.get_or_create(player=player)
-        caster.bio_link = entry['bio']
-        caster.does_solo_casts = True
-        caster.save()
-        
-        # Update Player Twitch Link
-        twitch_username = entry['stream_link'].replace('twitch.tv/', '')
-        player.twitch_username = twitch_username
-        player.save()
+    caster_list = list(caster_list)
+
+    with transaction.atomic():
+
+        # Clear out all old data
+        if delete_before_import:
+            existing_casters = Caster.objects.all()
+            caster_count['deleted'] = existing_casters.count()
+            existing_casters.delete()
+
+        name_mappings = {}
+        for mapping in NameMapping.objects.order_by('pk'):
+            name_mappings.setdefault(
+                mapping.caster_name.lower(), mapping.player_name)
+
+        names = set()
+        for entry in caster_list:
+            caster_name = entry['community_caster'].lower()
+            names.add(caster_name)
+            if caster_name in name_mappings:
+                names.add(name_mappings[caster_name].lower())
+
+        players = {}
+        matching_players = Player.objects.annotate(
+            lower_name=Lower('name')).filter(lower_name__in=names).order_by('pk')
+
+        for player in matching_players:
+            players.setdefault(player.lower_name, player)
+
+        casters = {
+            caster.player_id: caster for caster in
+            Caster.objects.filter(player__in=players.values())
+        }
+
+        # Diff the sheet against what exists
+        new_players = {}
+        new_casters = {}
+        changed_players = {}
+        changed_casters = {}
+        seen_casters = set()
+
+        for entry in caster_list:
+            name = entry['community_caster']
+            player = players.get(name.lower())
+
+            if not player:
+                name = name_mappings.get(name.lower(), name)
+                player = players.get(name.lower())
+
+            if not player:
+                player = players[name.lower()] = new_players[name.lower()] = (
+                    Player(name=name))
+
+            twitch_username = entry['stream_link'].replace('twitch.tv/', '')
+            if player.twitch_username != twitch_username:
+                player.twitch_username = twitch_username
+                if player.pk:
+                    changed_players[player.pk] = player
+
+            caster = casters.get(player.pk) or new_casters.get(player.name.lower())
+            if caster and caster.pk:
+                seen_casters.add(caster.pk)
+
+            if not caster:
+                caster = Caster(bio_link=entry['bio'], does_solo_casts=True)
+                caster.player = player
+                new_casters[player.name.lower()] = caster
+
+            elif (caster.bio_link, caster.does_solo_casts) != (entry['bio'], True):
+                caster.bio_link = entry['bio']
+                caster.does_solo_casts = True
+                if caster.pk:
+                    changed_casters[caster.pk] = caster
+
+        # Apply the differences
+        bulk_create_with_ids(Player, new_players.values(), ['name'], batch_size)
+
+        for caster in new_casters.values():
+            caster.player_id = caster.player.id
+
+        bulk_create_with_ids(
+            Caster, new_casters.values(), ['player_id'], batch_size)
+
+        Player.objects.bulk_update(
+            changed_players.values(), ['twitch_username'], batch_size=batch_size)
+        Caster.objects.bulk_update(
+            changed_casters.values(), ['bio_link', 'does_solo_casts'],
+            batch_size=batch_size
+        )
+
+        player_count['created'] = len(new_players)
+        player_count['updated'] = len(changed_players)
+        caster_count['created'] = len(new_casters)
+        caster_count['updated'] = len(changed_casters)
+        caster_count['unchanged'] = len(seen_casters - set(changed_casters))
+
+        # Bulk writes skip the signals that keep these up to date
+        index_objects(
+            SearchEntry.PLAYER, [player.id for player in new_players.values()])
+        index_objects(
+            SearchEntry.CASTER, [caster.id for caster in new_casters.values()])
+
+        if new_players or new_casters or changed_players or changed_casters:
+            invalidate_api_cache()
 
-        if player_created:
-            player_count['created'] += 1
-        
-        if caster_created:
-            caster_count['created'] += 1
-    
     return {'casters': caster_count, 'players': player_count}
@@ -0,0 +1,111 @@
+from pytest import mark
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from casters.models import Caster, NameMapping
+from casters.services import bulk_import_casters, parse_casters_csv
+from casters.tests.factories import CasterFactory
+from matches.tests.factories import MatchFactory
+from players.models import Player
+from players.tests.factories import PlayerFactory
+from search.models import SearchEntry
+
+
+def _row(name, stream_link='', bio=''):
+    return {'community_caster': name, 'stream_link': stream_link, 'bio': bio}
+
+
+def test_parse_casters_csv():
+    csv_data = '\n'.join([
+        ',,,',
+        ',Community Caster,Stream Link,Bio',
+        ',Alice,twitch.tv/alice,https://example.com/alice',
+        ',TBD,,',
+        ',,,',
+    ])
+
+    assert list(parse_casters_csv(csv_data, ignore_names=[' tbd'])) == [{
+        'community_caster': 'Alice', 'stream_link': 'twitch.tv/alice',
+        'bio': 'https://example.com/alice'
+    }]
+
+
+@mark.django_db
+def test_bulk_import_casters():
+    """
+    Casters are matched to players by name or name mapping, and existing
+    casters are updated in place rather than re-created.
+    """
+    caster = CasterFactory(player=PlayerFactory(name='Alice'))
+    match = MatchFactory(primary_caster=caster)
+    bob = PlayerFactory(name='Bob')
+    NameMapping.objects.create(caster_name='Bobcast', player_name='bob')
+
+    counts = bulk_import_casters([
+        _row('alice', 'twitch.tv/alice', 'https://example.com/alice'),
+        _row('Bobcast', 'twitch.tv/bobcast'),
+        _row('Carol'),
+    ])
+
+    assert counts['casters'] == {
+        'created': 2, 'updated': 1, 'unchanged': 0, 'deleted': 0}
+    assert counts['players'] == {'created': 1, 'updated': 2, 'deleted': 0}
+
+    match.refresh_from_db()
+    assert match.primary_caster == caster
+
+    caster.refresh_from_db()
+    assert caster.bio_link == 'https://example.com/alice'
+    assert caster.player.twitch_username == 'alice'
+
+    bob.refresh_from_db()
+    assert bob.caster_profile.player.twitch_username == 'bobcast'
+
+    carol = Caster.objects.get(player__name='Carol')
+    assert SearchEntry.objects.filter(
+        kind=SearchEntry.CASTER, object_id=carol.id, name='Carol').exists()
+
+
+@mark.django_db
+def test_bulk_import_casters_is_idempotent():
+    rows = [_row(f'Caster {n}', f'twitch.tv/caster{n}') for n in range(5)]
+    bulk_import_casters(rows)
+
+    with CaptureQueriesContext(connection) as context:
+        counts = bulk_import_casters(rows)
+
+    assert counts['casters']['unchanged'] == 5
+    assert not [
+        query for query in context.captured_queries
+        if query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))
+    ]
+
+
+@mark.django_db
+def test_bulk_import_casters_query_count():
+    """
+    The number of reads doesn't grow with the number of casters imported.
+    """
+    def reads(context):
+        return [
+            query for query in context.captured_queries
+            if not query['sql'].startswith('INSERT')
+        ]
+
+    def rows(start, count, bio):
+        return [
+            _row(f'Caster {n}', f'twitch.tv/caster{n}', bio)
+            for n in range(start, start + count)
+        ]
+
+    connection.queries_log.clear()
+    with CaptureQueriesContext(connection) as few:
+        bulk_import_casters(rows(0, 2, 'https://example.com/a'))
+
+    with CaptureQueriesContext(connection) as many:
+        bulk_import_casters(
+            rows(0, 2, 'https://example.com/b') +
+            rows(2, 40, 'https://example.com/b')
+        )
+
+    assert Caster.objects.count() == 42
+    assert len(reads(many)) <= len(reads(few)) + 2
@@ -0,0 +1,10 @@
+from pytest import fixture
+from django.core.cache import cache
+
+
+@fixture(autouse=True)
+def clear_cache():
+    """Start every test with an empty cache so API responses aren't shared."""
+    cache.clear()
+    yield
+    cache.clear()
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+from requests import RequestException
+from leagues.models import League
+from leagues.services import IMPORT_STAGES, import_season
+
+class Command(BaseCommand):
+    help = 'Import players, teams, casters, matches and awards of a season, fetching every sheet at once'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--league', type=str, help='Name of the league importing data for')
+        parser.add_argument('--season', type=str, help='Name of the season importing data for')
+        parser.add_argument('--stages', type=str, default=None, help=f'Comma separated stages to run, out of {",".join(IMPORT_STAGES)}. Defaults to every stage with a sheet configured.')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be created, updated and deleted without saving any of it')
+
+    def handle(self, *args, **options):
+        league = League.objects.filter(name__icontains=options['league']).first()
+        season = league.seasons.filter(name__icontains=options['season']).first()
+
+        stages = None
+        if options['stages']:
+            stages = [stage.strip() for stage in options['stages'].split(',')]
+            unknown = set(stages) - set(IMPORT_STAGES)
+            if unknown:
+                raise CommandError(f'Unknown stages: {", ".join(sorted(unknown))}')
+
+        try:
+            report = import_season(season, stages=stages, dry_run=options['dry_run'])
+        except RequestException as error:
+            raise CommandError(f'Could not fetch sheets, nothing imported: {error}')
+
+        for stage, entry in report.items():
+            self.stdout.write(self.style.SUCCESS(
+                f'{stage.capitalize()} took {entry["seconds"]:.2f}s.')
+            )
+
+            for name, counts in entry['counts'].items():
+                if isinstance(counts, dict):
+                    summary = ', '.join(
+                        f'{total} {action}' for action, total in counts.items())
+                    self.stdout.write(f'  {name.capitalize()}: {summary}')
+                elif counts:
+                    self.stdout.write(self.style.WARNING(
+                        f'  {len(counts)} {name}')
+                    )
+
+        if options['dry_run']:
+            self.stdout.write(self.style.NOTICE(
+                'Dry run, nothing was saved.')
+            )
@@ -0,0 +1,128 @@
+import time
+from contextlib import contextmanager, nullcontext
+from django.db import transaction
+from awards.services import bulk_import_awards, parse_awards_csv
+from buzz.services import fetch_sheet_csvs
+from casters.models import Settings as CasterSettings
+from casters.services import bulk_import_casters, parse_casters_csv
+from matches.services import bulk_import_matches, parse_matches_csv
+from players.models import PlayerSettings
+from players.services import bulk_import_players, parse_players_csv
+from search.services import suppress_search_indexing
+from teams.services import bulk_import_teams, parse_teams_csv
+
+# Later stages look up what earlier ones created, e.g. matches need teams
+IMPORT_STAGES = ['players', 'teams', 'casters', 'matches', 'awards']
+
+
+def get_import_sheet_urls(season):
+    """
+    Return a dict of import stage to the CSV URL of its sheet for a Season.
+
+    Stages without a sheet configured are left out.
+
+    Arguments:
+    season -- Season to import teams, matches and awards for. (obj)
+    """
+    player_settings = PlayerSettings.objects.first()
+    caster_settings = CasterSettings.objects.first()
+
+    sheet_urls = {
+        'players': player_settings and player_settings.players_csv_url,
+        'teams': season.teams_csv_url,
+        'casters': caster_settings and caster_settings.casters_csv_url,
+        'matches': season.matches_csv_url,
+        'awards': season.awards_csv_url,
+    }
+
+    return {stage: url for stage, url in sheet_urls.items() if url}
+
+
+def import_season_sheets(season, sheets, dry_run=False):
+    """
+    Import the CSV text of each sheet into the database, in IMPORT_STAGES
+    order.
+
+    Returns a dict of stage to {'seconds': time taken, 'counts': what the
+    stage's importer returned}, in the order the stages ran.
+
+    Arguments:
+    season -- Season to import teams, matches and awards for. (obj)
+    sheets -- Import stage to the CSV text of its sheet, e.g. as returned
+              by fetch_sheet_csvs. Stages left out are skipped. (dict)
+    dry_run -- Run every stage in one transaction and roll it back, so the
+               counts show what would change without changing it. Cached
+               API responses and the search index are left alone.
+               (bool) (optional)
+    """
+    importers = {
+        'players': lambda data: bulk_import_players(parse_players_csv(data)),
+        'teams': lambda data: bulk_import_teams(parse_teams_csv(data), season),
+        'casters': lambda data: bulk_import_casters(parse_casters_csv(
+            data, ignore_names=_get_ignored_caster_names())),
+        'matches': lambda data: bulk_import_matches(
+            parse_matches_csv(data), season),
+        'awards': lambda data: bulk_import_awards(
+            parse_awards_csv(data), season=season),
+    }
+    report = {}
+
+    with _rolled_back() if dry_run else nullcontext():
+        for stage in IMPORT_STAGES:
+            if stage not in sheets:
+                continue
+
+            start = time.monotonic()
+            counts = importers[stage](sheets[stage])
+            report[stage] = {
+                'seconds': time.monotonic() - start, 'counts': counts}
+
+    return report
+
+
+def import_season(season, stages=None, dry_run=False, session=None):
+    """
+    Fetch every import sheet of a Season at once, then import them in
+    dependency order.
+
+    Returns the report of import_season_sheets, with a 'fetch' entry first
+    holding the seconds spent downloading the sheets.
+
+    Arguments:
+    season -- Season to import teams, matches and awards for. (obj)
+    stages -- Names of the stages to run, defaults to all of IMPORT_STAGES
+              that have a sheet configured. (list) (optional)
+    dry_run -- Report what would change without writing it. (bool)
+               (optional)
+    session -- HTTP session to download with. (Session) (optional)
+    """
+    sheet_urls = get_import_sheet_urls(season)
+    if stages is not None:
+        sheet_urls = {
+            stage: url for stage, url in sheet_urls.items() if stage in stages}
+
+    start = time.monotonic()
+    sheets = fetch_sheet_csvs(sheet_urls, session=session)
+    report = {'fetch': {'seconds': time.monotonic() - start, 'counts': {}}}
+
+    report.update(import_season_sheets(season, sheets, dry_run=dry_run))
+    return report
+
+
+@contextmanager
+def _rolled_back():
+    """
+    Run a block in a transaction that is rolled back at the end, without
+    invalidating cached API responses or reindexing names for its writes.
+    """
+    from api.cache import suppress_api_cache_invalidation
+
+    with transaction.atomic(), suppress_api_cache_invalidation(), \
+            suppress_search_indexing():
+        yield
+        transaction.set_rollback(True)
+
+
+def _get_ignored_caster_names():
+    caster_settings = CasterSettings.objects.first()
+    return (caster_settings and caster_settings.ignore_names or '').split(',')
@@ -3,7 +3,7 @@ from django.utils import timezone
 import random
 import factory
 from factory.django import DjangoModelFactory
-from leagues.models import League, Season, Circuit, Round
+from leagues.models import League, Season, Circuit, Group, Round
 
 league_names = [
     'Second Job Gaming', 'Bowling', 'Bee', 'Bear', 'Inconvenient Gaming',
@@ -114,4 +114,15 @@ class RoundFactory(DjangoModelFactory):
 
     season = factory.SubFactory(SeasonFactory)
     round_number = 1
-    name = 'Week 1'
\ No newline at end of file
+    name = 'Week 1'
+
+
+class GroupFactory(DjangoModelFactory):
+    """A group of teams within a Circuit."""
+
+    class Meta:
+        model = Group
+
+    circuit = factory.SubFactory(CircuitFactory)
+    name = factory.Sequence(lambda n: f'Group {n + 1}')
+    number = 1
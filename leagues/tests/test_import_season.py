@@ -0,0 +1,96 @@
+from pytest import mark
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from api.cache import get_generation
+from awards.models import Award
+from casters.models import Caster
+from leagues.services import import_season_sheets
+from leagues.tests.factories import CircuitFactory, SeasonFactory
+from matches.models import Match
+from players.models import Alias, Player
+from teams.models import Team
+
+SHEETS = {
+    'players': (
+        'Players,,,,,,\r\n'
+        'Player Name,Phoentic,Pronouns,Primary In-game Name,Secondary Alts,'
+        'Discord ID,Twitch ID\r\n'
+        'Alice,,she/her,AliceQ,,alice#0001,\r\n'
+    ),
+    'teams': (
+        'Tier,Circuit,Team,Match Wins,Matches Played,Set Wins,Captain,'
+        'all players,Playoff Seed,,,,P1,P2,P3,P4,P5,P6,P7\r\n'
+        '1,W,Bees,3,5,10,Alice,,1,,,,Alice,Bob,,,,,\r\n'
+        '1,W,Wasps,0,4,2,Carol,,2,,,,Carol,Dan,,,,,\r\n'
+    ),
+    'casters': (
+        ',,,\r\n'
+        ',Community Caster,Stream Link,Bio\r\n'
+        ',Eve,twitch.tv/eve,https://example.com/eve\r\n'
+    ),
+    'matches': (
+        'Tier,Circ,Away Team,Home Team,Time (Eastern),Date,Caster,'
+        'Co-casters,Stream Link,VOD Link,Away Sets Won,Home Sets Won,'
+        'Winner,Week\r\n'
+        '1,W,Wasps,Bees,TBD,2021-03-01,Eve,,,,,,,Week 1\r\n'
+    ),
+    'awards': (
+        'Awards,,,,,,,,,,,,,,,,,\r\n'
+        'Season,Week,Circuit,,,,,,,,,,,,,,,\r\n'
+        'Fall 2020,1,1W,1.5,Alice,2,Bob,3,Carol,4,Dan,5,Alice,,,,,\r\n'
+    ),
+}
+
+
+@mark.django_db
+def test_import_season_sheets():
+    """
+    Stages run in dependency order, so matches find the teams and casters
+    imported before them; a dry run reports the same counts and saves,
+    invalidates and reindexes nothing.
+    """
+    season = SeasonFactory(name='Fall 2020')
+    CircuitFactory(season=season, tier='1', region='W')
+
+    generation = get_generation()
+
+    with CaptureQueriesContext(connection) as queries:
+        report = import_season_sheets(season, SHEETS, dry_run=True)
+
+    assert list(report) == ['players', 'teams', 'casters', 'matches', 'awards']
+    assert report['teams']['counts']['teams']['created'] == 2
+    assert report['matches']['counts']['matches']['created'] == 1
+    assert report['awards']['counts']['awards']['created'] == 5
+    assert all(entry['seconds'] >= 0 for entry in report.values())
+
+    assert not Player.objects.exists()
+    assert not Team.objects.exists()
+    assert not Match.objects.exists()
+
+    # Nothing to invalidate or reindex for writes that were rolled back
+    assert get_generation() == generation
+    assert not [
+        query for query in queries.captured_queries
+        if 'search_searchentry' in query['sql']
+    ]
+
+    saved = import_season_sheets(season, SHEETS)
+
+    assert {stage: entry['counts'] for stage, entry in saved.items()} == {
+        stage: entry['counts'] for stage, entry in report.items()}
+
+    match = Match.objects.get()
+    assert (match.home.name, match.away.name) == ('Bees', 'Wasps')
+    assert match.primary_caster == Caster.objects.get(player__name='Eve')
+    assert Alias.objects.get(name='AliceQ').player.name == 'Alice'
+    assert Award.objects.count() == 5
+
+
+@mark.django_db
+def test_import_season_sheets_skips_missing_sheets():
+    season = SeasonFactory(name='Fall 2020')
+
+    report = import_season_sheets(season, {'casters': SHEETS['casters']})
+
+    assert list(report) == ['casters']
+    assert Caster.objects.get().player.twitch_username == 'eve'
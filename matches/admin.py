@@ -2,7 +2,9 @@ from django import forms
 from django.contrib import admin
 from django.utils.safestring import mark_safe
 from buzz.services import get_object_admin_link
-from .models import Match, Result, Set, SetLog, Game, PlayerMapping, TeamMapping
+from .models import (
+    Match, Result, ResultSubmission, Set, SetLog, Game,
+    PlayerMapping, TeamMapping)
 
 class MatchAdmin(admin.ModelAdmin):
     
@@ -142,9 +144,23 @@ class SetAdmin(admin.ModelAdmin):
     ]
     autocomplete_fields = ['result', 'winner', 'loser']
 
+class ResultSubmissionAdmin(admin.ModelAdmin):
+
+    list_display = [
+        'id', 'match', 'created_by', 'status', 'attempts', 'result',
+        'available_at', 'created'
+    ]
+    list_filter = ['status']
+    search_fields = ['match__home__name', 'match__away__name']
+    readonly_fields = ['checksum', 'created', 'modified']
+    raw_id_fields = ['match', 'result']
+    autocomplete_fields = ['created_by']
+
 class SetLogAdmin(admin.ModelAdmin):
-    list_display = ['id', 'set', 'filename']
+    list_display = ['id', 'set', 'filename', 'size']
     autocomplete_fields = ['set']
+    exclude = ['legacy_body']
+    readonly_fields = ['size']
 
 class GameAdmin(admin.ModelAdmin):
     
@@ -189,6 +205,7 @@ class TeamMappingAdmin(admin.ModelAdmin):
 admin.site.register(Match, MatchAdmin)
 admin.site.register(Result, ResultAdmin)
 admin.site.register(Set, SetAdmin)
+admin.site.register(ResultSubmission, ResultSubmissionAdmin)
 admin.site.register(SetLog, SetLogAdmin)
 admin.site.register(Game, GameAdmin)
 admin.site.register(PlayerMapping, PlayerMappingAdmin)
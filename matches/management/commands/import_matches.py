@@ -1,6 +1,6 @@
 from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
-from buzz.services import get_sheet_csv
+from buzz.services import iter_sheet_csv
 from teams.services import parse_teams_csv, bulk_import_teams
 from leagues.models import League, Season, Circuit
 from matches.services import (
@@ -25,20 +25,26 @@ class Command(BaseCommand):
             matches = parse_matches_json(options['json'], options['region'])
         
         else:               
-            csv_data = get_sheet_csv(season.matches_csv_url)
+            csv_data = iter_sheet_csv(season.matches_csv_url)
             matches = parse_matches_csv(csv_data)
 
         result_count = bulk_import_matches(
-            matches, season, delete_before_import=True)
+            matches, season, delete_before_import=options['delete'])
 
         self.stdout.write(self.style.SUCCESS(
             f'Successfully imported {result_count["matches"]["created"]} Matches.')
         )
 
         self.stdout.write(self.style.SUCCESS(
-            f'Deleted {result_count["matches"]["deleted"]} Matches before importing.')
+            f'Updated {result_count["matches"]["updated"]} Matches, '
+            f'{result_count["matches"]["unchanged"]} unchanged.')
         )
 
+        if options['delete']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Deleted {result_count["matches"]["deleted"]} Matches before importing.')
+            )
+
         if result_count['matches']['skipped']:
             self.stdout.write(self.style.NOTICE(
                     f'Skipped {result_count["matches"]["skipped"]} rows.')
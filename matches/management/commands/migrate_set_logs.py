@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from matches.services import migrate_set_logs
+
+class Command(BaseCommand):
+    help = 'Move set log bodies stored on the SetLog row into compressed storage'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Number of logs to move per transaction')
+
+    def handle(self, *args, **options):
+        result_count = migrate_set_logs(batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Moved {result_count["logs"]} Set Logs, {result_count["bytes"]} bytes compressed to {result_count["compressed_bytes"]}.')
+        )
@@ -0,0 +1,34 @@
+import time
+from django.core.management.base import BaseCommand
+from matches.services import run_result_submissions
+
+class Command(BaseCommand):
+    help = 'Ingest results queued through the results submit endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty instead of polling for more')
+        parser.add_argument('--poll-interval', type=float, default=5, help='Seconds to wait between checks of an empty queue')
+        parser.add_argument('--max-jobs', type=int, default=None, help='Number of submissions to process before exiting')
+
+    def handle(self, *args, **options):
+        max_jobs = options['max_jobs']
+
+        while True:
+            result_count = run_result_submissions(max_jobs=max_jobs)
+            processed = sum(result_count.values())
+
+            if processed:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Processed {processed} Result Submissions: {result_count["succeeded"]} succeeded, {result_count["retried"]} to retry, {result_count["failed"]} failed.')
+                )
+
+            if max_jobs is not None:
+                max_jobs -= processed
+                if max_jobs <= 0:
+                    break
+
+            if options['once'] and not processed:
+                break
+
+            if not processed:
+                time.sleep(options['poll_interval'])
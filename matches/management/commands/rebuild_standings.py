@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.cache import invalidate_api_cache
+from matches.services import rebuild_team_standings
+
+class Command(BaseCommand):
+    help = 'Rebuild the win/loss standings table for every team from scratch'
+
+    def handle(self, *args, **options):
+        total = rebuild_team_standings()
+        invalidate_api_cache()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt standings for {total} Teams.')
+        )
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from leagues.models import League
+from matches.services import regenerate_season_games
+
+class Command(BaseCommand):
+    help = 'Recreate Game objects from set logs for every Set in a season'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--league', type=str, help='Name of the league regenerating games for')
+        parser.add_argument('--season', type=str, help='Name of the season regenerating games for')
+        parser.add_argument('--batch-size', type=int, default=500, help='Number of Sets to handle at a time')
+
+    def handle(self, *args, **options):
+        league = League.objects.filter(name__icontains=options['league']).first()
+        season = league.seasons.filter(name__icontains=options['season']).first()
+
+        result_count = regenerate_season_games(
+            season, batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {result_count["games"]} Games for {result_count["sets"]} Sets.')
+        )
+
+        if result_count['skipped']:
+            self.stdout.write(self.style.NOTICE(
+                f'Skipped {result_count["skipped"]} Sets with missing team mappings or malformed logs.')
+            )
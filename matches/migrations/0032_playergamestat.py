@@ -0,0 +1,37 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('players', '0014_auto_20210318_1829'),
+        ('teams', '0012_teamstanding'),
+        ('matches', '0031_match_group'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlayerGameStat',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nickname', models.CharField(max_length=255)),
+                ('role', models.CharField(blank=True, choices=[('Q', 'Queen'), ('W', 'Warrior'), ('D', 'Drone')], max_length=1, null=True)),
+                ('won', models.BooleanField(default=False)),
+                ('kills', models.PositiveIntegerField(default=0)),
+                ('deaths', models.PositiveIntegerField(default=0)),
+                ('berries', models.PositiveIntegerField(default=0)),
+                ('snail_distance', models.PositiveIntegerField(default=0)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='player_stats', to='matches.game')),
+                ('player', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='game_stats', to='players.player')),
+                ('team', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='player_game_stats', to='teams.team')),
+            ],
+            options={
+                'unique_together': {('game', 'nickname')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='playergamestat',
+            index=models.Index(fields=['player', 'role'], name='matches_pla_player__ce4700_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matches', '0032_playergamestat'),
+    ]
+
+    operations = [
+        # Keep the existing column; only the field name changes
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.AlterField(
+                    model_name='setlog',
+                    name='body',
+                    field=models.JSONField(blank=True, null=True),
+                ),
+            ],
+            state_operations=[
+                migrations.RenameField(
+                    model_name='setlog',
+                    old_name='body',
+                    new_name='legacy_body',
+                ),
+                migrations.AlterField(
+                    model_name='setlog',
+                    name='legacy_body',
+                    field=models.JSONField(blank=True, db_column='body', null=True),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='setlog',
+            name='size',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='SetLogBlob',
+            fields=[
+                ('log', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='blob', serialize=False, to='matches.setlog')),
+                ('data', models.BinaryField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 3.1 on 2026-10-18 20:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('players', '0014_auto_20210318_1829'),
+        ('matches', '0033_setlogblob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResultSubmission',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payload', models.JSONField()),
+                ('checksum', models.CharField(max_length=64)),
+                ('status', models.CharField(choices=[('Q', 'Queued'), ('R', 'Running'), ('S', 'Succeeded'), ('F', 'Failed')], default='Q', max_length=1)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('modified', models.DateTimeField(auto_now=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='result_submissions', to='players.player')),
+                ('match', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='result_submissions', to='matches.match')),
+                ('result', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='submission', to='matches.result')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='resultsubmission',
+            index=models.Index(fields=['status', 'available_at'], name='matches_res_status_55b519_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='resultsubmission',
+            unique_together={('match', 'checksum')},
+        ),
+    ]
@@ -0,0 +1,16 @@
+# Generated by Django 3.1 on 2026-10-18 21:46
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matches', '0034_resultsubmission'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='PlayerGameStat',
+        ),
+    ]
@@ -1,7 +1,7 @@
 import arrow
-import datetime
 from django.db import models
 from django.urls import reverse
+from django.utils import timezone
 from buzz.services import trim_humanize
 from casters.models import Caster
 from leagues.models import Circuit, Group, Round
@@ -182,57 +182,82 @@ class Set(models.Model):
 
     def generate_games(self):
         """Create Game objects via JSON objects associated with this set."""
-        if hasattr(self, 'log'):
-            
-            try:
-                # Delete any old games, no dupes!
-                if self.games.exists():
-                    self.games.all().delete()
-            
-                WINCON_LOOKUP = {1: 'M', 2: 'E', 3: 'S'}
-                MAP_LOOKUP = {
-                    2: 'PD', 4: 'BQ', 7: 'HT', 11:'TF', 14: 'SP', 15: 'SJ',
-                    17: 'NF', 18: 'TR'
-                }
-
-                blue_team = self.result.team_mappings.filter(
-                    color=2).first().team
-                
-                gold_team = self.result.team_mappings.filter(
-                    color=1).first().team
-
-                TEAM_LOOKUP = {1: gold_team, 2: blue_team}
-
-                log = self.log.body
-                log_games = log['games']
-
-                for idx, entry in enumerate(log_games):
-                    game = Game()
-                    game.number = idx + 1
-                    game.win_condition = WINCON_LOOKUP[entry['winCondition']]
-                    game.winner = TEAM_LOOKUP[log['gameWinners'][idx]]
-                    game.loser = blue_team if game.winner == gold_team else gold_team
-                    game.duration = datetime.timedelta(seconds=entry['duration'])
-                    game.map = MAP_LOOKUP[log['mapPool'][idx]]
-                    game.save()
-                    self.games.add(game)
-            
-            # Malformed JSON File
-            except AttributeError:
-                pass
+        from matches.services import generate_games
+
+        generate_games([self])
 
 class SetLog(models.Model):
-    """Log data for a set, should be a single JSONField."""
+    """
+    Log data for a set.
+
+    Only metadata lives on this row. The body is kept zlib compressed in
+    SetLogBlob and loaded the first time `body` is read, so sets and results
+    can be read without pulling multi-kilobyte logs along with them.
+    """
     set = models.OneToOneField(
         Set, related_name='log', on_delete=models.CASCADE
     )
 
     filename = models.CharField(max_length=255, blank=True, null=True)
-    body = models.JSONField()
+
+    # Bytes of JSON once decompressed
+    size = models.PositiveIntegerField(default=0)
+
+    # Logs stored before SetLogBlob existed, moved over by migrate_set_logs
+    legacy_body = models.JSONField(blank=True, null=True, db_column='body')
 
     def __str__(self):
         return f'Log Data for {self.set}'
 
+    @property
+    def body(self):
+        """The parsed log, read from storage on first access."""
+        if not hasattr(self, '_body'):
+            from matches.services import decode_log_body
+
+            data = None
+            if self.pk:
+                data = SetLogBlob.objects.filter(log_id=self.pk).values_list(
+                    'data', flat=True).first()
+
+            self._body = (
+                self.legacy_body if data is None else decode_log_body(data))
+            self._body_changed = False
+
+        return self._body
+
+    @body.setter
+    def body(self, value):
+        self._body = value
+        self._body_changed = True
+
+    def save(self, *args, **kwargs):
+        body_changed = getattr(self, '_body_changed', False)
+
+        if body_changed:
+            from matches.services import encode_log_body
+
+            data, self.size = encode_log_body(self._body)
+            self.legacy_body = None
+
+        super().save(*args, **kwargs)
+
+        if body_changed:
+            SetLogBlob.objects.update_or_create(log=self, defaults={'data': data})
+            self._body_changed = False
+
+class SetLogBlob(models.Model):
+    """A SetLog's body as zlib compressed JSON."""
+    log = models.OneToOneField(
+        SetLog, related_name='blob', on_delete=models.CASCADE,
+        primary_key=True
+    )
+
+    data = models.BinaryField()
+
+    def __str__(self):
+        return f'Compressed {self.log}'
+
 class Game(models.Model):
     """A single map played in a Set."""
     number = models.PositiveSmallIntegerField(default=1)
@@ -318,4 +343,61 @@ class TeamMapping(models.Model):
         verbose_name_plural = 'Team Mappings'
 
     def __str__(self):
-        return f'{self.color} --> {self.team.name}'
\ No newline at end of file
+        return f'{self.color} --> {self.team.name}'
+
+class ResultSubmission(models.Model):
+    """
+    A queued upload of a match result, ingested later by a worker.
+
+    The payload is stored as it was posted to the results endpoint. Resending
+    the same payload for a match finds the same submission, so uploaders can
+    safely retry.
+    """
+    match = models.ForeignKey(
+        Match, related_name='result_submissions', on_delete=models.CASCADE)
+
+    created_by = models.ForeignKey(
+        Player, blank=True, null=True, on_delete=models.deletion.SET_NULL,
+        related_name='result_submissions'
+    )
+
+    payload = models.JSONField()
+
+    # sha256 of the payload with sorted keys
+    checksum = models.CharField(max_length=64)
+
+    QUEUED = 'Q'
+    RUNNING = 'R'
+    SUCCEEDED = 'S'
+    FAILED = 'F'
+
+    STATUS_CHOICES = (
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    )
+
+    status = models.CharField(
+        max_length=1, choices=STATUS_CHOICES, default=QUEUED)
+
+    result = models.OneToOneField(
+        Result, related_name='submission', on_delete=models.SET_NULL,
+        blank=True, null=True
+    )
+
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True, null=True)
+
+    available_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(blank=True, null=True)
+
+    modified = models.DateTimeField(auto_now=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['match', 'checksum']
+        indexes = [models.Index(fields=['status', 'available_at'])]
+
+    def __str__(self):
+        return f'Submission {self.id} for {self.match}: {self.get_status_display()}'
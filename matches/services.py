@@ -1,26 +1,36 @@
-import csv
+import hashlib
 import json
 import re
 import time
+import zlib
+from collections import Counter, defaultdict, deque
 from datetime import datetime, timedelta
-from django.db import IntegrityError
-from buzz.services import convert_et_to_utc
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from buzz.services import (
+    bulk_create_with_ids, chunked, convert_et_to_utc, read_csv_rows)
 from casters.models import Caster
 from leagues.models import League, Season, Circuit, Round, ROUND_LOOKUP
 from players.models import Player
-from teams.models import Team
-from .models import Match, Result, Set
+from teams.models import Team, TeamStanding
+from .models import (
+    Game, Match, Result, ResultSubmission, Set, SetLog, SetLogBlob,
+    TeamMapping)
+
+STANDING_GROUPS = ('matches', 'sets', 'games')
 
 def parse_matches_csv(csv_data):
     """
-    Parse through CSV data of matches, convert to a list of match data dicts.
+    Parse through CSV data of matches, yielding a match data dict per row.
 
     Arguments:
-    csv_data -- Raw CSV data containing match information. (str)
+    csv_data -- Raw CSV data containing match information, or an iterable
+                of its lines. (str|iterable)
     """
-    rows = csv.reader(csv_data.splitlines(), delimiter=',')
-    
-    matches = []
+    rows = read_csv_rows(csv_data)
+
     headers = {
         'Tier': None,
         'Circ': None,
@@ -56,9 +66,7 @@ def parse_matches_csv(csv_data):
             if 'tbd' in  match['time_(eastern)'].lower(): 
                 match['time_(eastern)'] = ''
 
-            matches.append(match)
-
-    return matches
+            yield match
 
 
 def parse_matches_json(json_file_path, region):
@@ -127,202 +135,1096 @@ def parse_matches_json(json_file_path, region):
     return matches
 
 
-def bulk_import_matches(matches, season, delete_before_import=True):
+class MatchImportIndex:
+    """
+    In-memory lookups for importing a season's matches.
+
+    Circuits, teams, rounds, casters and players are loaded once up front so
+    each row can be resolved without touching the database. Missing rounds,
+    co-casters and their players are created on demand, which only happens a
+    handful of times per season.
+
+    Arguments:
+    season -- The Season being imported. (obj)
+    """
+    def __init__(self, season):
+        self.season = season
+
+        self.circuits = {}
+        for circuit in season.circuits.order_by('pk'):
+            self.circuits.setdefault((circuit.region, circuit.tier), circuit)
+
+        self.teams = {}
+        self.teams_by_name = {}
+        teams = Team.objects.filter(circuit__season=season).select_related(
+            'circuit').order_by('pk')
+
+        for team in teams:
+            self.teams.setdefault((team.circuit_id, team.name), team)
+            self.teams_by_name.setdefault(team.name, []).append(team)
+
+        self.rounds = {
+            (game_round.round_number, game_round.name): game_round
+            for game_round in Round.objects.filter(season=season).order_by('-pk')
+        }
+
+        self.casters = list(
+            Caster.objects.select_related('player').order_by('pk'))
+        self.players = list(Player.objects.order_by('pk').only('id', 'name'))
+
+        self._caster_matches = {}
+        self._player_matches = {}
+
+    def get_circuit(self, region, tier):
+        return self.circuits.get((region, tier))
+
+    def get_team(self, circuit, name):
+        return self.teams.get((circuit.id, name)) if circuit else None
+
+    def get_tournament_team(self, circuit, name):
+        """
+        Find a team by name in any circuit of the same region.
+
+        Special tournament-only circuits don't have teams of their own.
+        """
+        region = circuit.region.lower()
+
+        for team in self.teams_by_name.get(name, []):
+            if region in team.circuit.region.lower():
+                return team
+
+        return None
+
+    def get_round(self, name):
+        round_number = ROUND_LOOKUP[name]
+        game_round = self.rounds.get((round_number, name))
+
+        if not game_round:
+            game_round = Round.objects.create(
+                season=self.season, round_number=round_number, name=name)
+            self.rounds[(round_number, name)] = game_round
+
+        return game_round
+
+    def _contains(self, cache, items, get_name, name):
+        """Return the first of `items` whose name contains `name`."""
+        if name not in cache:
+            needle = name.lower()
+            cache[name] = next(
+                (item for item in items if needle in get_name(item).lower()),
+                None
+            )
+
+        return cache[name]
+
+    def get_caster(self, name):
+        return self._contains(
+            self._caster_matches, self.casters,
+            lambda caster: caster.player.name, name)
+
+    def get_or_create_co_caster(self, name):
+        """
+        Co-casters often don't have casting profiles, so create one for them,
+        and a player too if need be.
+        """
+        co_caster = self.get_caster(name)
+        if co_caster:
+            return co_caster
+
+        player = self._contains(
+            self._player_matches, self.players, lambda player: player.name,
+            name)
+
+        if not player:
+            player = Player.objects.create(name=name)
+            self.players.append(player)
+
+        co_caster = Caster.objects.create(player=player, does_solo_casts=False)
+        self.casters.append(co_caster)
+        self._caster_matches.clear()
+        self._player_matches.clear()
+
+        return co_caster
+
+
+def parse_match_start_time(entry):
+    """
+    Convert the date and Eastern time columns of a match row to UTC.
+
+    Invalid times are treated as midnight. Returns None when the time is
+    missing, e.g. for pre-almanac matches.
+
+    Arguments:
+    entry -- A match dict from parse_matches_csv or parse_matches_json. (dict)
+    """
+    match_time = entry['time_(eastern)']
+
+    if not match_time or match_time == 'UNAVAILABLE':
+        return None
+
+    # We don't need seconds
+    match_time = match_time.replace(':00:00', ':00')
+    match_time = match_time.replace(':30:00', ':30')
+
+    try:
+        match_time = datetime.strptime(match_time, '%I:%M %p').strftime('%H:%M')
+
+    # Set invalid match times to midnight
+    except ValueError:
+        match_time = '00:00'
+
+    et_match_start = datetime.strptime(
+        f'{entry["date"]} {match_time}', '%Y-%m-%d %H:%M')
+
+    return convert_et_to_utc(et_match_start)
+
+
+def parse_match_result(entry, home, away):
+    """
+    Work out the result of a match row.
+
+    Returns a (status, winner, loser, home sets won, away sets won) tuple, or
+    None if the row has no recognisable winner.
+
+    Arguments:
+    entry -- A match dict from parse_matches_csv or parse_matches_json. (dict)
+    home -- Home Team. (obj)
+    away -- Away Team, if any. (obj)
+    """
+    winner = entry['winner'].lower()
+
+    if not winner:
+        return None
+
+    if winner == home.name.lower():
+        winner, loser = home, away
+
+    elif away and winner == away.name.lower():
+        winner, loser = away, home
+
+    elif 'double forfeit' in winner:
+        return (Result.DOUBLE_FORFEIT, None, None, 0, 0)
+
+    else:
+        return None
+
+    return (
+        Result.COMPLETED, winner, loser,
+        int(entry['home_sets_won']), int(entry['away_sets_won'])
+    )
+
+
+def match_import_key(match):
+    """
+    Return the natural key a Match is identified by when importing.
+
+    Arguments:
+    match -- A saved or unsaved Match. (obj)
+    """
+    return (match.circuit_id, match.round_id, match.home_id, match.away_id)
+
+
+def resolve_match_row(index, entry):
+    """
+    Turn a row of match data into an unsaved Match.
+
+    Returns a (match, co-casters, result) tuple, where result is as returned
+    by parse_match_result, or None if the row can't be matched to a circuit
+    and home team.
+
+    Arguments:
+    index -- MatchImportIndex for the season being imported. (obj)
+    entry -- A match dict from parse_matches_csv or parse_matches_json. (dict)
+    """
+    circuit = index.get_circuit(entry['circ'], entry['tier'])
+    home_team = index.get_team(circuit, entry['home_team'])
+    away_team = index.get_team(circuit, entry['away_team'])
+
+    # Sometimes there are special tournament-only circuits that won't be
+    # associated with any team name.
+    if circuit and not home_team and not away_team:
+        home_team = index.get_tournament_team(circuit, entry['home_team'])
+        away_team = index.get_tournament_team(circuit, entry['away_team'])
+
+    # Encountered a weird match, like Puppy Bowl etc.
+    if not circuit or not home_team:
+        return None
+
+    caster = None
+    if entry['caster']:
+        caster = index.get_caster(entry['caster'])
+
+    co_casters = {}
+    if entry['co-casters']:
+        for name in entry['co-casters'].split(','):
+            co_caster = index.get_or_create_co_caster(name.strip())
+            co_casters[co_caster.id] = co_caster
+
+    match = Match(
+        home=home_team, away=away_team, circuit=circuit,
+        round=index.get_round(entry['week']),
+        start_time=parse_match_start_time(entry),
+        primary_caster=caster, vod_link=entry['vod_link']
+    )
+
+    return (
+        match, list(co_casters.values()),
+        parse_match_result(entry, home_team, away_team)
+    )
+
+
+def _is_sheet_result(result):
+    """Return True if a Result came from the sheet rather than an upload."""
+    return (
+        result.created_by_id is None and
+        result.source in (None, Result.SHEETS)
+    )
+
+
+def _build_sets(result, home_sets_won, away_sets_won):
+    """Return unsaved Sets for a Result given how many each team won."""
+    match = result.match
+    if not match.away:
+        return []
+
+    sets = [
+        Set(result=result, number=number, winner=match.home, loser=match.away)
+        for number in range(1, home_sets_won + 1)
+    ]
+    sets += [
+        Set(result=result, number=number, winner=match.away, loser=match.home)
+        for number in range(1, away_sets_won + 1)
+    ]
+
+    return sets
+
+
+def bulk_import_matches(
+    matches, season, delete_before_import=False, batch_size=500):
     """
-    Given a list of match data, bulk import into database.
+    Given a list of match data, import it into the database.
 
-    Needs optimization in the future, but steps for now:
+    Matches are identified by circuit, round, home and away team (see
+    match_import_key), so running the same import twice changes nothing:
 
-    1. Delete all existing matches
-    2. Loop through a dict list of all matches
-    3. Create match objects for each entry
-        - Take 'tier' and 'circ' fields to match to existing Circuit object
-        - Match team names in `home_team` and `away_team` to existing team
-          objects in database.
-        - Convert match time from ET to UTC
-        - TODO: Match 'caster' to existing caster entry in database (text for 
-                now)            
-    4. Create Result object if Match has declared winner.
+    1. Resolve each row's circuit, teams, round and casters against a
+       MatchImportIndex of the season, converting start times from ET to UTC
+    2. Create matches that don't exist yet, along with their results, sets
+       and co-casters
+    3. Update the start time, casters, VOD link and result of existing
+       matches where they differ from the row
+    4. Leave everything else alone, including matches missing from the
+       import and results that were uploaded rather than imported
+
+    Rows are consumed and written in batches, all inside one transaction.
+    Rows that can't be matched to a circuit and home team are skipped.
 
     Arguments:
-    matches -- List of match dicts derived from matches CSV sheet. (list)
+    matches -- Match dicts derived from matches CSV sheet, e.g. as yielded
+               by parse_matches_csv. (iterable)
     season -- A Season model instance to associate these teams with. (obj)
     delete_before_import -- Delete all existing Matches then initiate
                             import process. A way to start clean with
                             new data. (bool) (optional)
+    batch_size -- Rows to resolve and write at a time. (int) (optional)
     """
-    # Clear out all old data
+    from api.cache import invalidate_api_cache
+    from .signals import defer_standings_updates
+
     match_count = {
         'created': 0,
+        'updated': 0,
+        'unchanged': 0,
         'deleted': 0,
         'skipped': 0
     }
-    skipped_entries =[]
 
-    # Currently deleting before import as we don't have a unique way to
-    # identify matches, so no way to update them in place. This functionality
-    # is here for future use. 
-    if delete_before_import:
-        existing_matches = Match.objects.filter(circuit__season=season)
-        match_count['deleted'] = existing_matches.count()
-        existing_matches.delete()
+    with transaction.atomic(), defer_standings_updates():
 
-    
-    for entry in matches:
-            
-        # Skip any matches that don't have a date
-        match_date = entry['date']
-        # Determine circuit, home team, and away team fields to existing
-        # objects in database.
-
-        circuit = season.circuits.filter(region=entry['circ'], tier=entry['tier']).first()
-        
-        home_team = Team.objects.filter(circuit=circuit, name=entry['home_team']).first()
-        away_team = Team.objects.filter(circuit=circuit, name=entry['away_team']).first()
-
-        # Sometimes there are special tournament-only circuits that won't be associated
-        # with any team name. Handle this case.
-        if not home_team and not away_team:
-            if circuit:
-                home_team = Team.objects.filter(circuit__season=season, circuit__region__icontains=circuit.region, name=entry['home_team']).first()
-                away_team = Team.objects.filter(circuit__season=season, circuit__region__icontains=circuit.region, name=entry['away_team']).first()
-            
-            # Encountered a weird match, like Puppy Bowl etc.
-            else:
-                match_count['skipped'] += 1
-                skipped_entries.append(entry)
-                continue
+        if delete_before_import:
+            existing_matches = Match.objects.filter(circuit__season=season)
+            match_count['deleted'] = existing_matches.count()
+            existing_matches.delete()
 
-        # Determine Round and create if does not exist
-        round_name = entry['week']
-        round_number = ROUND_LOOKUP[round_name]
-        
-        round, created  = Round.objects.get_or_create(
-            season=season,
-            round_number=round_number,
-            name=round_name,
-        )
+        index = MatchImportIndex(season)
 
-        # Set all invalid/TDB times to midnight
-        match_time = entry['time_(eastern)']
-        utc_match_start = None
+        existing = defaultdict(deque)
+        season_matches = Match.objects.filter(
+            circuit__season=season).select_related('result').order_by('pk')
 
-        if (match_time and match_time != 'UNAVAILABLE'):
-            # We don't need seconds                            
-            match_time = match_time.replace(':00:00', ':00')
-            match_time = match_time.replace(':30:00', ':30')
+        for match in season_matches:
+            existing[match_import_key(match)].append(match)
 
-            try:
-                match_time = datetime.strptime(match_time, '%I:%M %p').strftime('%H:%M') 
-            
-            # Set invalid match times to midnight
-            except ValueError:
-                match_time = '00:00'
-
-            # Convert match time from ET to UTC, handle case where match occured
-            # but we don't know when it was shceduled (pre-almanac matches)        
-            et_match_start = datetime.strptime(f'{match_date} {match_time}', '%Y-%m-%d %H:%M')
-            utc_match_start = convert_et_to_utc(et_match_start)
-
-        # Get Casters and Co-Casters
-        caster = None
-        
-        if entry['caster']:            
-            caster = Caster.objects.filter(player__name__icontains=entry['caster']).first()
-
-        # Co-casters often don't have casting profiles, so auto-generate
-        # one for them.
-        co_casters = []
-        if entry['co-casters']:
-            co_caster_names =  entry['co-casters'].split(',')
-
-            for co_caster_name in co_caster_names:
-                co_caster_name = co_caster_name.strip()
-                co_caster = Caster.objects.filter(
-                    player__name__icontains=co_caster_name).first()
-
-                if not co_caster:
-                    player = Player.objects.filter(
-                        name__icontains=co_caster_name).first()
-                    if player:
-                        co_caster, created = Caster.objects.get_or_create(
-                            player=player, does_solo_casts=False)
-                    else:
-                        player, created = Player.objects.get_or_create(
-                            name=co_caster_name
-                        )
-                        co_caster, created = Caster.objects.get_or_create(
-                            player=player, does_solo_casts=False)
-            
-                co_casters.append(co_caster)
+        co_caster_ids = defaultdict(set)
+        through = Match.secondary_casters.through
+        rows = through.objects.filter(
+            match__circuit__season=season).values_list('match_id', 'caster_id')
 
+        for match_id, caster_id in rows:
+            co_caster_ids[match_id].add(caster_id)
 
-        try:                    
-            match = Match.objects.create(
-                home=home_team, away=away_team, circuit=circuit,
-                round=round, start_time=utc_match_start,
-                primary_caster=caster,vod_link=entry['vod_link']
-            )            
-            for secondary_caster in co_casters:
-                match.secondary_casters.add(secondary_caster)
+        season_sets = Set.objects.filter(result__match__circuit__season=season)
+        sets_won = {
+            (result_id, winner_id): total
+            for result_id, winner_id, total in season_sets.values_list(
+                'result_id', 'winner_id').annotate(total=Count('pk')).order_by()
+        }
 
-            match_count['created'] += 1
+        touched_team_ids = set()
+        now = timezone.now()
 
-            # Create Result and Set Objects if Winner defined
-            if entry['winner'] or 'loser' in entry.keys():
-                
-                # Home team won
-                if entry['winner'].lower() == match.home.name.lower():
-                    match_winner = match.home
-                    match_loser = match.away
-                    status = Result.COMPLETED
-
-                elif entry['winner'].lower() == match.away.name.lower():
-                    match_winner = match.away
-                    match_loser = match.home
-                    status = Result.COMPLETED                
-
-                # Double forfeit
-                elif 'double forfeit' in entry['winner'].lower():
-                    status = Result.DOUBLE_FORFEIT
-                    match_winner = None
-                    match_loser = None
-
-                result = Result.objects.create(
-                    match=match, status=status, winner=match_winner,
-                    loser=match_loser
-                )
+        for batch in chunked(matches, batch_size):
+            new_matches = []
+            changed_matches = []
+            new_results = []
+            changed_results = []
+            deleted_result_ids = []
+            caster_links_added = []
+            caster_links_removed = Q(pk__in=[])
+
+            for entry in batch:
+                resolved = resolve_match_row(index, entry)
+
+                if not resolved:
+                    match_count['skipped'] += 1
+                    continue
+
+                row_match, co_casters, outcome = resolved
+                candidates = existing.get(match_import_key(row_match))
+
+                if not candidates:
+                    new_matches.append(row_match)
+                    caster_links_added += [
+                        (row_match, co_caster.id)
+                        for co_caster in co_casters
+                    ]
+
+                    if outcome:
+                        new_results.append((row_match, outcome))
+                    continue
+
+                match = candidates.popleft()
+                changed = False
+
+                for field in ('start_time', 'primary_caster_id', 'vod_link'):
+                    old_value = getattr(match, field)
+                    new_value = getattr(row_match, field)
+
+                    if field == 'vod_link':
+                        old_value = old_value or ''
+                        new_value = new_value or ''
+
+                    if old_value != new_value:
+                        setattr(match, field, getattr(row_match, field))
+                        changed = True
+
+                if changed:
+                    match.modified = now
+                    changed_matches.append(match)
+
+                wanted = {co_caster.id for co_caster in co_casters}
+                current = co_caster_ids.get(match.id, set())
+
+                if wanted != current:
+                    changed = True
+                    caster_links_added += [
+                        (match, caster_id) for caster_id in wanted - current]
+                    caster_links_removed |= Q(
+                        match_id=match.id, caster_id__in=current - wanted)
+
+                result = getattr(match, 'result', None)
+
+                # Results uploaded by captains are never overwritten
+                if result and not _is_sheet_result(result):
+                    pass
+
+                elif not outcome:
+                    if result and _is_sheet_result(result):
+                        deleted_result_ids.append(result.id)
+                        touched_team_ids.update(
+                            (match.home_id, match.away_id))
+                        changed = True
+
+                elif not result:
+                    new_results.append((match, outcome))
+                    changed = True
 
-                # Create Set objects for game and assign winner and loser
-                if not status == Result.DOUBLE_FORFEIT:
-                    home_sets_won = int(entry['home_sets_won'])
-                    away_sets_won = int(entry['away_sets_won'])
                 else:
-                    home_sets_won = 0
-                    away_sets_won = 0
-
-                # Sets for home team
-                for number in range(1, home_sets_won + 1):
-                    Set.objects.create(
-                        result=result,
-                        number = number,
-                        winner = match.home,
-                        loser = match.away
+                    (status, winner, loser,
+                     home_sets_won, away_sets_won) = outcome
+                    current_outcome = (
+                        result.status, result.winner_id, result.loser_id,
+                        sets_won.get((result.id, match.home_id), 0),
+                        sets_won.get((result.id, match.away_id), 0)
                     )
-                
-                # Sets for away team
-                for number in range(1, away_sets_won + 1):
-                    Set.objects.create(
-                        result=result,
-                        number = number,
-                        winner = match.away,
-                        loser = match.home
+                    wanted_outcome = (
+                        status, winner and winner.id, loser and loser.id,
+                        home_sets_won if match.away else 0,
+                        away_sets_won if match.away else 0
                     )
-        
-        # Encountered some error/missing field
-        except IntegrityError:
-            match_count['skipped'] += 1
-            skipped_entries.append(entry)
-
-    return {'matches': match_count }
-        
\ No newline at end of file
+
+                    if current_outcome != wanted_outcome:
+                        result.status = status
+                        result.winner = winner
+                        result.loser = loser
+                        result.source = Result.SHEETS
+                        result.modified = now
+                        changed_results.append((result, outcome))
+                        changed = True
+
+                if changed:
+                    match_count['updated'] += 1
+                else:
+                    match_count['unchanged'] += 1
+
+            # Inserts
+            bulk_create_with_ids(
+                Match, new_matches,
+                ['circuit_id', 'round_id', 'home_id', 'away_id'], batch_size)
+            match_count['created'] += len(new_matches)
+
+            results = []
+            for match, outcome in new_results:
+                status, winner, loser, _, _ = outcome
+                result = Result(
+                    match=match, status=status, winner=winner, loser=loser,
+                    source=Result.SHEETS
+                )
+                results.append((result, outcome))
+                touched_team_ids.update((match.home_id, match.away_id))
+
+            bulk_create_with_ids(
+                Result, [result for result, _ in results], ['match_id'],
+                batch_size)
+
+            # Updates
+            Match.objects.bulk_update(
+                changed_matches,
+                ['start_time', 'primary_caster', 'vod_link', 'modified'],
+                batch_size=batch_size
+            )
+
+            Result._base_manager.bulk_update(
+                [result for result, _ in changed_results],
+                ['status', 'winner', 'loser', 'source', 'modified'],
+                batch_size=batch_size
+            )
+
+            changed_result_ids = []
+            for result, _ in changed_results:
+                changed_result_ids.append(result.id)
+                touched_team_ids.update(
+                    (result.match.home_id, result.match.away_id))
+
+            Set.objects.filter(result_id__in=changed_result_ids).delete()
+            Result.objects.filter(id__in=deleted_result_ids).delete()
+            through.objects.filter(caster_links_removed).delete()
+
+            through.objects.bulk_create([
+                through(match_id=match.id, caster_id=caster_id)
+                for match, caster_id in caster_links_added
+            ], batch_size=batch_size)
+
+            sets = []
+            for result, outcome in results + changed_results:
+                sets += _build_sets(result, *outcome[3:])
+
+            Set.objects.bulk_create(sets, batch_size=batch_size)
+
+        # Bulk writes skip the signals that keep these up to date
+        update_team_standings(touched_team_ids)
+
+        if match_count['created'] or match_count['updated']:
+            invalidate_api_cache()
+
+    return {'matches': match_count}
+
+
+def _tally(queryset, field, team_ids):
+    """Return a {team_id: count} dict of rows in queryset grouped by field."""
+    queryset = queryset.filter(**{f'{field}__in': team_ids}).order_by()
+    return dict(queryset.values_list(field).annotate(total=Count('pk')))
+
+
+def update_team_standings(
+    team_ids, groups=STANDING_GROUPS, create_missing=True):
+    """
+    Recalculate TeamStanding records for a handful of teams.
+
+    Runs a fixed number of grouped COUNT queries no matter how many teams are
+    passed in, then writes the results back with bulk_create / bulk_update.
+
+    Arguments:
+    team_ids -- IDs of the teams to recalculate, falsy values ignored. (iter)
+    groups -- Which parts of the standings to recalculate, any of 'matches'
+              (match wins, losses and forfeits), 'sets' and 'games'.
+              (iter) (optional)
+    create_missing -- Create standing rows for teams that don't have one
+                      yet. Pass False while teams may be mid-deletion.
+                      (bool) (optional)
+    """
+    team_ids = {team_id for team_id in team_ids if team_id}
+
+    if create_missing:
+        team_ids = set(
+            Team.objects.filter(id__in=team_ids).values_list('id', flat=True))
+
+    if not team_ids:
+        return 0
+
+    tallies = {}
+
+    if 'matches' in groups:
+        results = Result._base_manager.all()
+        tallies['match_wins'] = _tally(results, 'winner', team_ids)
+        tallies['match_losses'] = _tally(results, 'loser', team_ids)
+
+        # Single forfeits count against the loser, double forfeits
+        # against both teams in the match.
+        forfeits = Counter(_tally(
+            results.filter(status=Result.SINGLE_FORFEIT), 'loser', team_ids))
+
+        double_forfeits = results.filter(status=Result.DOUBLE_FORFEIT)
+        forfeits.update(_tally(double_forfeits, 'match__home', team_ids))
+        forfeits.update(_tally(double_forfeits, 'match__away', team_ids))
+        tallies['forfeits'] = forfeits
+
+    if 'sets' in groups:
+        tallies['set_wins'] = _tally(Set.objects.all(), 'winner', team_ids)
+        tallies['set_losses'] = _tally(Set.objects.all(), 'loser', team_ids)
+
+    if 'games' in groups:
+        tallies['game_wins'] = _tally(Game.objects.all(), 'winner', team_ids)
+        tallies['game_losses'] = _tally(Game.objects.all(), 'loser', team_ids)
+
+    with transaction.atomic():
+        existing = TeamStanding.objects.select_for_update().filter(
+            team_id__in=team_ids)
+        existing = {standing.team_id: standing for standing in existing}
+
+        to_create = []
+        to_update = []
+        now = timezone.now()
+
+        for team_id in team_ids:
+            standing = existing.get(team_id)
+
+            if standing:
+                to_update.append(standing)
+            elif create_missing:
+                standing = TeamStanding(team_id=team_id)
+                to_create.append(standing)
+            else:
+                continue
+
+            standing.modified = now
+            for field, tally in tallies.items():
+                setattr(standing, field, tally.get(team_id, 0))
+
+        TeamStanding.objects.bulk_create(to_create, ignore_conflicts=True)
+        TeamStanding.objects.bulk_update(
+            to_update, list(tallies.keys()) + ['modified'])
+
+    return len(to_create) + len(to_update)
+
+
+def rebuild_team_standings(batch_size=500):
+    """
+    Recalculate every TeamStanding record from scratch.
+
+    Arguments:
+    batch_size -- Number of teams to recalculate per round of queries. (int)
+                  (optional)
+    """
+    team_ids = Team.objects.order_by('id').values_list('id', flat=True)
+    total = 0
+
+    for chunk in chunked(team_ids.iterator(), batch_size):
+        total += update_team_standings(chunk)
+
+    return total
+
+
+GAME_WIN_CONDITIONS = {1: 'M', 2: 'E', 3: 'S'}
+GAME_MAPS = {
+    2: 'PD', 4: 'BQ', 7: 'HT', 11:'TF', 14: 'SP', 15: 'SJ', 17: 'NF', 18: 'TR'
+}
+
+
+def build_set_games(set_id, body, gold_team_id, blue_team_id):
+    """
+    Build unsaved Game objects for a Set from its log body.
+
+    Raises KeyError, IndexError or TypeError if the log is malformed.
+
+    Arguments:
+    set_id -- ID of the Set the games were played in. (int)
+    body -- Parsed SetLog body. (dict)
+    gold_team_id -- ID of the team that played gold. (int)
+    blue_team_id -- ID of the team that played blue. (int)
+    """
+    teams = {TeamMapping.GOLD: gold_team_id, TeamMapping.BLUE: blue_team_id}
+    games = []
+
+    for idx, entry in enumerate(body['games']):
+        winner_id = teams[body['gameWinners'][idx]]
+
+        games.append(Game(
+            set_id=set_id,
+            number=idx + 1,
+            win_condition=GAME_WIN_CONDITIONS[entry['winCondition']],
+            winner_id=winner_id,
+            loser_id=blue_team_id if winner_id == gold_team_id else gold_team_id,
+            duration=timedelta(seconds=entry['duration']),
+            map=GAME_MAPS[body['mapPool'][idx]]
+        ))
+
+    return games
+
+
+def generate_games(sets, batch_size=500):
+    """
+    Create Game objects for many Sets from their logs in one go.
+
+    Team colours are read once per Result and every Game is built in memory,
+    then old games are replaced with a single delete and bulk_create. Sets
+    without a log, without gold and blue team mappings, or with a malformed
+    log are skipped and keep whatever games they had.
+
+    Arguments:
+    sets -- Sets to generate games for. Only `id` and `result_id` are
+            read. (iterable)
+    batch_size -- Rows per INSERT statement. (int) (optional)
+    """
+    from api.cache import invalidate_api_cache
+    from .signals import defer_standings_updates
+
+    sets = list(sets)
+    counts = {'sets': 0, 'games': 0, 'skipped': 0}
+
+    logs = load_set_log_bodies(game_set.id for game_set in sets)
+
+    colors = defaultdict(dict)
+    mappings = TeamMapping.objects.filter(
+        result_id__in={game_set.result_id for game_set in sets}).order_by('pk')
+
+    for result_id, color, team_id in mappings.values_list(
+        'result_id', 'color', 'team_id'):
+        colors[result_id].setdefault(color, team_id)
+
+    games = []
+    set_ids = []
+
+    for game_set in sets:
+        body = logs.get(game_set.id)
+        teams = colors.get(game_set.result_id, {})
+        gold_team_id = teams.get(TeamMapping.GOLD)
+        blue_team_id = teams.get(TeamMapping.BLUE)
+
+        if body is None or not gold_team_id or not blue_team_id:
+            counts['skipped'] += 1
+            continue
+
+        # Malformed log file
+        try:
+            games += build_set_games(
+                game_set.id, body, gold_team_id, blue_team_id)
+        except (KeyError, IndexError, TypeError):
+            counts['skipped'] += 1
+            continue
+
+        set_ids.append(game_set.id)
+
+    if not set_ids:
+        return counts
+
+    with transaction.atomic(), defer_standings_updates():
+        Game.objects.filter(set_id__in=set_ids).delete()
+        Game.objects.bulk_create(games, batch_size=batch_size)
+
+        # Bulk inserts skip the signals that keep these up to date
+        update_team_standings(
+            {game.winner_id for game in games} |
+            {game.loser_id for game in games},
+            groups=['games']
+        )
+        invalidate_api_cache()
+
+    counts['sets'] = len(set_ids)
+    counts['games'] = len(games)
+
+    return counts
+
+
+def regenerate_season_games(season, batch_size=500):
+    """
+    Recreate the games of every Set with a log in a Season.
+
+    Arguments:
+    season -- Season to regenerate games for. (obj)
+    batch_size -- Number of Sets to handle per round of queries. (int)
+                  (optional)
+    """
+    sets = Set.objects.filter(
+        result__match__circuit__season=season, log__isnull=False).order_by(
+            'id').only('id', 'result')
+
+    counts = Counter()
+    for chunk in chunked(sets.iterator(), batch_size):
+        counts.update(generate_games(chunk, batch_size))
+
+    return {key: counts[key] for key in ('sets', 'games', 'skipped')}
+
+
+def encode_log_body(body):
+    """
+    Serialize and compress a SetLog body for storage.
+
+    Returns a tuple of (compressed bytes, uncompressed size in bytes).
+
+    Arguments:
+    body -- Parsed log data. (dict|list|str)
+    """
+    raw = json.dumps(body, separators=(',', ':')).encode('utf-8')
+    return zlib.compress(raw), len(raw)
+
+
+def decode_log_body(data):
+    """
+    Decompress and parse a SetLog body stored by `encode_log_body`.
+
+    Arguments:
+    data -- Compressed log. (bytes)
+    """
+    return json.loads(zlib.decompress(bytes(data)).decode('utf-8'))
+
+
+def iter_log_bytes(data, start=0, end=None, chunk_size=65536):
+    """
+    Decompress a stored log piece by piece, yielding the bytes in a range.
+
+    Only as much of the log as the range needs is ever decompressed.
+
+    Arguments:
+    data -- Compressed log. (bytes)
+    start -- First byte to yield. (int) (optional)
+    end -- Last byte to yield, inclusive; None for the rest of the log.
+           (int) (optional)
+    chunk_size -- Compressed bytes to feed the decompressor at a time. (int)
+                  (optional)
+    """
+    data = memoryview(bytes(data))
+    stop = None if end is None else end + 1
+    decompressor = zlib.decompressobj()
+
+    def pieces():
+        for offset in range(0, len(data), chunk_size):
+            yield decompressor.decompress(data[offset:offset + chunk_size])
+        yield decompressor.flush()
+
+    position = 0
+    for piece in pieces():
+        piece_start = position
+        position += len(piece)
+
+        if stop is not None and piece_start >= stop:
+            return
+
+        if position <= start:
+            continue
+
+        yield piece[
+            max(start - piece_start, 0):
+            None if stop is None else stop - piece_start
+        ]
+
+
+def get_stored_log(log):
+    """
+    Return a SetLog's compressed body and its uncompressed size.
+
+    Logs that haven't been moved by `migrate_set_logs` yet are compressed on
+    the fly.
+
+    Arguments:
+    log -- Log to read. (SetLog)
+    """
+    data = SetLogBlob.objects.filter(log_id=log.pk).values_list(
+        'data', flat=True).first()
+
+    if data is None:
+        return encode_log_body(log.legacy_body)
+
+    return bytes(data), log.size
+
+
+def load_set_log_bodies(set_ids):
+    """
+    Return a dict of Set id to parsed log body for the Sets that have one.
+
+    Arguments:
+    set_ids -- Sets to load logs for. (iterable)
+    """
+    set_ids = list(set_ids)
+
+    bodies = dict(SetLog.objects.filter(
+        set_id__in=set_ids, legacy_body__isnull=False).values_list(
+            'set_id', 'legacy_body'))
+
+    blobs = SetLogBlob.objects.filter(log__set_id__in=set_ids).values_list(
+        'log__set_id', 'data')
+
+    for set_id, data in blobs.iterator():
+        bodies[set_id] = decode_log_body(data)
+
+    return bodies
+
+
+def bulk_create_set_logs(logs, batch_size=500):
+    """
+    Save many new SetLogs and their compressed bodies at once.
+
+    Arguments:
+    logs -- Unsaved SetLogs with `body` set. (iterable)
+    batch_size -- Rows per INSERT statement. (int) (optional)
+    """
+    logs = list(logs)
+    blobs = []
+
+    for log in logs:
+        data, log.size = encode_log_body(log.body)
+        log.legacy_body = None
+        blobs.append(data)
+
+    with transaction.atomic():
+        bulk_create_with_ids(SetLog, logs, ['set_id'], batch_size)
+        SetLogBlob.objects.bulk_create([
+            SetLogBlob(log_id=log.pk, data=data)
+            for log, data in zip(logs, blobs)
+        ], batch_size=batch_size)
+
+    for log in logs:
+        log._body_changed = False
+
+    return logs
+
+
+def migrate_set_logs(batch_size=500):
+    """
+    Move SetLog bodies stored inline on the log row into SetLogBlob.
+
+    Safe to run again; logs that have already moved are left alone.
+
+    Arguments:
+    batch_size -- Number of logs to move per transaction. (int) (optional)
+    """
+    counts = {'logs': 0, 'bytes': 0, 'compressed_bytes': 0}
+    last_id = 0
+
+    while True:
+        with transaction.atomic():
+            batch = list(SetLog.objects.filter(
+                pk__gt=last_id, legacy_body__isnull=False).order_by(
+                    'pk').values_list('pk', 'legacy_body')[:batch_size])
+
+            if not batch:
+                return counts
+
+            logs = []
+            blobs = []
+
+            for log_id, body in batch:
+                data, size = encode_log_body(body)
+                logs.append(SetLog(pk=log_id, size=size, legacy_body=None))
+                blobs.append(SetLogBlob(log_id=log_id, data=data))
+
+                counts['bytes'] += size
+                counts['compressed_bytes'] += len(data)
+
+            log_ids = [log.pk for log in logs]
+            SetLogBlob.objects.filter(log_id__in=log_ids).delete()
+            SetLogBlob.objects.bulk_create(blobs)
+            SetLog.objects.bulk_update(logs, ['size', 'legacy_body'])
+
+        counts['logs'] += len(batch)
+        last_id = batch[-1][0]
+
+
+def get_payload_checksum(payload):
+    """
+    Return a sha256 hex digest identifying a result payload.
+
+    Arguments:
+    payload -- Data posted to the results endpoint. (dict)
+    """
+    raw = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def queue_result_submission(match, payload, player):
+    """
+    Store a validated result payload for a worker to ingest.
+
+    Returns a tuple of (submission, created). Submitting a payload that is
+    already queued for the match returns the earlier submission, re-queued
+    if it had failed and was sent by the same player.
+
+    Arguments:
+    match -- Match the result is for. (obj)
+    payload -- Data posted to the results endpoint. (dict)
+    player -- Player submitting the result. (obj)
+    """
+    submission, created = ResultSubmission.objects.get_or_create(
+        match=match, checksum=get_payload_checksum(payload),
+        defaults={'payload': payload, 'created_by': player}
+    )
+
+    if not created and submission.created_by_id == player.id:
+        requeue_result_submission(submission)
+
+    return submission, created
+
+
+def requeue_result_submission(submission):
+    """
+    Give a failed submission a fresh set of attempts.
+
+    Arguments:
+    submission -- Submission to retry. Left alone unless it failed. (obj)
+    """
+    if submission.status != ResultSubmission.FAILED:
+        return submission
+
+    submission.status = ResultSubmission.QUEUED
+    submission.attempts = 0
+    submission.error = None
+    submission.available_at = timezone.now()
+    submission.save()
+
+    return submission
+
+
+def claim_result_submission():
+    """
+    Lock the next submission that's due and mark it as running.
+
+    Submissions left running by a worker that died are picked up again once
+    RESULT_SUBMISSION_LOCK_TIMEOUT has passed. Returns None when there's
+    nothing to do.
+    """
+    now = timezone.now()
+    stale = now - timedelta(
+        seconds=getattr(settings, 'RESULT_SUBMISSION_LOCK_TIMEOUT', 600))
+
+    with transaction.atomic():
+        submission = ResultSubmission.objects.select_for_update(
+            skip_locked=connection.features.has_select_for_update_skip_locked
+        ).filter(
+            Q(status=ResultSubmission.QUEUED, available_at__lte=now) |
+            Q(status=ResultSubmission.RUNNING, locked_at__lt=stale)
+        ).order_by('available_at', 'id').first()
+
+        if submission is None:
+            return None
+
+        submission.status = ResultSubmission.RUNNING
+        submission.locked_at = now
+        submission.attempts += 1
+        submission.save()
+
+    return submission
+
+
+def _fail_result_submission(submission, error):
+    submission.status = ResultSubmission.FAILED
+    submission.error = error
+    submission.locked_at = None
+    submission.save()
+
+
+def process_result_submission(submission):
+    """
+    Create the Result, Sets, logs and Games for a claimed submission.
+
+    Everything is written in one transaction, so a failed attempt leaves
+    nothing behind. Unexpected errors are retried with a doubling delay up to
+    RESULT_SUBMISSION_MAX_ATTEMPTS; payloads that no longer validate fail
+    straight away. Returns the submission's new status.
+
+    Arguments:
+    submission -- Submission returned by `claim_result_submission`. (obj)
+    """
+    from api.serializers.matches import ResultSerializer
+
+    max_attempts = getattr(settings, 'RESULT_SUBMISSION_MAX_ATTEMPTS', 3)
+    player = submission.created_by
+
+    if submission.attempts > max_attempts:
+        _fail_result_submission(
+            submission, f'Gave up after {max_attempts} attempts.')
+        return submission.status
+
+    if player is None or player.user is None:
+        _fail_result_submission(submission, 'Submitting player no longer exists.')
+        return submission.status
+
+    try:
+        with transaction.atomic():
+            serializer = ResultSerializer(
+                data=submission.payload, context={'user': player.user})
+
+            if not serializer.is_valid():
+                _fail_result_submission(
+                    submission, json.dumps(serializer.errors))
+                return submission.status
+
+            submission.result = serializer.save(created_by=player)
+            submission.status = ResultSubmission.SUCCEEDED
+            submission.error = None
+            submission.locked_at = None
+            submission.save()
+
+    except Exception as error:
+        if submission.attempts >= max_attempts:
+            _fail_result_submission(submission, repr(error))
+            return submission.status
+
+        delay = getattr(settings, 'RESULT_SUBMISSION_RETRY_DELAY', 30)
+        submission.status = ResultSubmission.QUEUED
+        submission.result = None
+        submission.error = repr(error)
+        submission.locked_at = None
+        submission.available_at = timezone.now() + timedelta(
+            seconds=delay * 2 ** (submission.attempts - 1))
+        submission.save()
+
+    return submission.status
+
+
+def run_result_submissions(max_jobs=None):
+    """
+    Process due submissions until the queue is empty or `max_jobs` is hit.
+
+    Returns counts of submissions that succeeded, were queued to retry, and
+    failed.
+
+    Arguments:
+    max_jobs -- Most submissions to process. (int) (optional)
+    """
+    counts = {'succeeded': 0, 'retried': 0, 'failed': 0}
+    outcomes = {
+        ResultSubmission.SUCCEEDED: 'succeeded',
+        ResultSubmission.QUEUED: 'retried',
+        ResultSubmission.FAILED: 'failed',
+    }
+
+    processed = 0
+    while max_jobs is None or processed < max_jobs:
+        submission = claim_result_submission()
+        if submission is None:
+            break
+
+        counts[outcomes[process_result_submission(submission)]] += 1
+        processed += 1
+
+    return counts
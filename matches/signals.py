@@ -0,0 +1,127 @@
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .models import Game, Match, Result, Set
+from .services import update_team_standings
+
+_state = threading.local()
+
+
+@contextmanager
+def defer_standings_updates():
+    """
+    Collect standings changes and apply them once when the block exits.
+
+    Useful around bulk deletes and imports, where every cascaded Result, Set
+    and Game would otherwise recalculate standings on its own. Nested blocks
+    are folded into the outermost one.
+    """
+    if getattr(_state, 'pending', None) is not None:
+        yield
+        return
+
+    _state.pending = defaultdict(set)
+
+    try:
+        yield
+    except BaseException:
+        _state.pending = None
+        raise
+
+    pending, _state.pending = _state.pending, None
+
+    for group, team_ids in pending.items():
+        update_team_standings(team_ids, groups=[group])
+
+
+def _queue_standings_update(team_ids, group):
+    pending = getattr(_state, 'pending', None)
+
+    if pending is not None:
+        pending[group].update(team_ids)
+        return
+
+    if getattr(_state, 'on_commit', None) is None:
+        _state.on_commit = defaultdict(set)
+
+    _state.on_commit[group].update(team_ids)
+    transaction.on_commit(_apply_committed_standings)
+
+
+def _apply_committed_standings():
+    """
+    Recalculate the standings queued by the transaction that just committed.
+
+    Every write queues this callback, so the first one to run does the work
+    and the rest find nothing left. Teams deleted in the same transaction are
+    gone by now and are skipped by update_team_standings.
+    """
+    pending, _state.on_commit = getattr(_state, 'on_commit', None), None
+
+    for group, team_ids in (pending or {}).items():
+        update_team_standings(team_ids, groups=[group])
+
+
+def _result_team_ids(match_id, winner_id, loser_id, status):
+    team_ids = {winner_id, loser_id}
+
+    # Double forfeits have no winner or loser, but count against both teams
+    if status == Result.DOUBLE_FORFEIT and match_id:
+        team_ids.update(
+            Match.objects.filter(id=match_id).values_list(
+                'home_id', 'away_id').first() or [])
+
+    return team_ids
+
+
+def _remember_previous_teams(sender, instance, fields):
+    """Stash the teams a row pointed at before it was changed."""
+    instance._previous_standing_values = None
+
+    if instance.pk:
+        instance._previous_standing_values = sender._base_manager.filter(
+            pk=instance.pk).values(*fields).first()
+
+
+@receiver(pre_save, sender=Result)
+def remember_result_teams(sender, instance, **kwargs):
+    _remember_previous_teams(
+        sender, instance, ['match_id', 'winner_id', 'loser_id', 'status'])
+
+
+@receiver(pre_save, sender=Set)
+@receiver(pre_save, sender=Game)
+def remember_set_or_game_teams(sender, instance, **kwargs):
+    _remember_previous_teams(sender, instance, ['winner_id', 'loser_id'])
+
+
+@receiver(post_save, sender=Result)
+@receiver(post_delete, sender=Result)
+def update_result_standings(sender, instance, **kwargs):
+    team_ids = _result_team_ids(
+        instance.match_id, instance.winner_id, instance.loser_id,
+        instance.status)
+
+    previous = getattr(instance, '_previous_standing_values', None)
+    if previous:
+        team_ids.update(_result_team_ids(**previous))
+
+    _queue_standings_update(team_ids, 'matches')
+
+
+@receiver(post_save, sender=Set)
+@receiver(post_delete, sender=Set)
+@receiver(post_save, sender=Game)
+@receiver(post_delete, sender=Game)
+def update_set_or_game_standings(sender, instance, **kwargs):
+    team_ids = {instance.winner_id, instance.loser_id}
+
+    previous = getattr(instance, '_previous_standing_values', None)
+    if previous:
+        team_ids.update(previous.values())
+
+    group = 'sets' if sender is Set else 'games'
+    _queue_standings_update(team_ids, group)
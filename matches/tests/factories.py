@@ -4,7 +4,7 @@ from random import randrange
 import factory
 from factory.django import DjangoModelFactory
 from django.utils.timezone import make_aware
-from matches.models import Match, Result, Set, Game
+from matches.models import Match, Result, Set, SetLog, Game
 
 class MatchFactory(DjangoModelFactory):
     """A match between two teams."""
@@ -46,3 +46,60 @@ class ResultFactory(DjangoModelFactory):
     winner = factory.LazyAttribute(lambda obj: obj.match.home)
     loser = factory.LazyAttribute(lambda obj: obj.match.away)
     
+
+
+class SetFactory(DjangoModelFactory):
+    """A series of games played in a Match."""
+
+    class Meta:
+        model = Set
+
+    result = factory.SubFactory(ResultFactory)
+    number = 1
+
+    winner = factory.LazyAttribute(lambda obj: obj.result.match.home)
+    loser = factory.LazyAttribute(lambda obj: obj.result.match.away)
+
+
+class GameFactory(DjangoModelFactory):
+    """A single map played in a Set."""
+
+    class Meta:
+        model = Game
+
+    set = factory.SubFactory(SetFactory)
+    number = 1
+    map = factory.LazyAttribute(lambda obj: random.choice(Game.MAP_CHOICES)[0])
+    win_condition = factory.LazyAttribute(
+        lambda obj: random.choice(Game.WIN_CONDITION_CHOICES)[0])
+    duration = factory.LazyAttribute(
+        lambda obj: timedelta(seconds=randrange(60, 400)))
+
+    winner = factory.LazyAttribute(lambda obj: obj.set.winner)
+    loser = factory.LazyAttribute(lambda obj: obj.set.loser)
+
+
+def _fake_log_body(num_games=3):
+    """A set log in the shape `Set.generate_games` reads."""
+    return {
+        'games': [
+            {'winCondition': randrange(1, 4), 'duration': randrange(60, 400)}
+            for _ in range(num_games)
+        ],
+        'gameWinners': [randrange(1, 3) for _ in range(num_games)],
+        'mapPool': [
+            random.choice([2, 4, 7, 11, 14, 15, 17, 18])
+            for _ in range(num_games)
+        ],
+    }
+
+
+class SetLogFactory(DjangoModelFactory):
+    """Raw log data uploaded for a Set."""
+
+    class Meta:
+        model = SetLog
+
+    set = factory.SubFactory(SetFactory)
+    filename = factory.Sequence(lambda n: f'set-log-{n}.json')
+    body = factory.LazyFunction(_fake_log_body)
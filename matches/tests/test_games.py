@@ -0,0 +1,102 @@
+from pytest import mark
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from matches.models import Game, TeamMapping
+from matches.services import generate_games, regenerate_season_games
+from matches.tests.factories import ResultFactory, SetFactory, SetLogFactory
+from teams.models import TeamStanding
+
+
+def _logged_result(num_sets, **kwargs):
+    result = ResultFactory(**kwargs)
+    match = result.match
+    TeamMapping.objects.create(
+        result=result, color=TeamMapping.GOLD, team=match.home)
+    TeamMapping.objects.create(
+        result=result, color=TeamMapping.BLUE, team=match.away)
+
+    for number in range(1, num_sets + 1):
+        SetLogFactory(set=SetFactory(result=result, number=number))
+
+    return result
+
+
+@mark.django_db
+def test_generate_games():
+    """
+    Games are built from each set's log, with gold and blue resolved from
+    the result's team mappings.
+    """
+    result = _logged_result(2)
+    game_set = result.sets.order_by('number').first()
+    game_set.log.body = {
+        'games': [
+            {'winCondition': 1, 'duration': 100},
+            {'winCondition': 3, 'duration': 200},
+        ],
+        'gameWinners': [2, 1],
+        'mapPool': [18, 11],
+    }
+    game_set.log.save()
+
+    counts = generate_games(result.sets.all())
+
+    assert counts == {'sets': 2, 'games': 5, 'skipped': 0}
+    first, second = game_set.games.order_by('number')
+    assert first.winner == result.match.away
+    assert first.loser == result.match.home
+    assert first.win_condition == 'M'
+    assert first.map == 'TR'
+    assert first.duration.total_seconds() == 100
+    assert second.winner == result.match.home
+    assert second.win_condition == 'S'
+
+    home_wins = Game.objects.filter(winner=result.match.home).count()
+    assert TeamStanding.objects.get(team=result.match.home).game_wins == home_wins
+
+
+@mark.django_db
+def test_generate_games_skips_sets_it_cannot_read():
+    """
+    Sets without team mappings or with a malformed log keep their games.
+    """
+    result = _logged_result(1)
+    game_set = result.sets.first()
+    game_set.log.body = {'results': 'yadayada'}
+    game_set.log.save()
+
+    unmapped = SetLogFactory().set
+
+    counts = generate_games([game_set, unmapped])
+
+    assert counts == {'sets': 0, 'games': 0, 'skipped': 2}
+    assert not Game.objects.exists()
+
+
+@mark.django_db
+def test_regenerate_season_games():
+    """
+    Regenerating a season replaces games rather than duplicating them, with
+    a fixed number of queries per batch.
+    """
+    result = _logged_result(3)
+    season = result.match.circuit.season
+    _logged_result(3, match__circuit=result.match.circuit)
+
+    regenerate_season_games(season)
+    total = Game.objects.count()
+
+    connection.queries_log.clear()
+    with CaptureQueriesContext(connection) as context:
+        counts = regenerate_season_games(season)
+
+    assert counts['sets'] == 6
+    assert counts['games'] == total == 18
+    assert Game.objects.count() == total
+
+    # Every game is written with a single INSERT
+    inserts = [
+        query for query in context.captured_queries
+        if query['sql'].startswith('INSERT')
+    ]
+    assert len(inserts) == 1
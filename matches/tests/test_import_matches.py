@@ -0,0 +1,261 @@
+from pytest import mark
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from casters.tests.factories import CasterFactory
+from leagues.tests.factories import CircuitFactory, SeasonFactory
+from matches.models import Match, Result, Set
+from matches.services import bulk_import_matches, parse_matches_csv
+from matches.tests.factories import MatchFactory, ResultFactory
+from players.models import Player
+from players.tests.factories import PlayerFactory
+from teams.models import TeamStanding
+from teams.tests.factories import TeamFactory
+
+
+def _row(circuit, home, away, **kwargs):
+    row = {
+        'tier': circuit.tier,
+        'circ': circuit.region,
+        'week': 'Week 1',
+        'home_team': home.name,
+        'away_team': away.name,
+        'time_(eastern)': '8:00:00 PM',
+        'date': '2021-03-01',
+        'caster': '',
+        'co-casters': '',
+        'stream_link': '',
+        'vod_link': '',
+        'home_sets_won': '',
+        'away_sets_won': '',
+        'winner': '',
+    }
+    row.update(kwargs)
+    return row
+
+
+@mark.django_db
+def test_bulk_import_matches():
+    """
+    Rows are resolved to circuits, teams, rounds and casters, and matches,
+    results, sets and co-casters are created for them.
+    """
+    season = SeasonFactory()
+    circuit = CircuitFactory(season=season, region='W', tier='1')
+    home, away, other = [
+        TeamFactory(circuit=circuit, name=name)
+        for name in ('Home Team', 'Away Team', 'Other Team')
+    ]
+    caster = CasterFactory(player=PlayerFactory(name='Primary Caster'))
+    MatchFactory(circuit=circuit, home=home, away=away)
+
+    rows = [
+        _row(
+            circuit, home, away, caster='Primary', winner='home team',
+            home_sets_won='3', away_sets_won='1',
+            **{'co-casters': 'Primary Caster, New Cocaster'}
+        ),
+        _row(circuit, away, other, winner='Double Forfeit'),
+        _row(circuit, home, other, week='Week 2', **{'time_(eastern)': ''}),
+        _row(circuit, home, away, circ='Puppy Bowl'),
+    ]
+
+    counts = bulk_import_matches(rows, season, delete_before_import=True)
+
+    assert counts == {'matches': {
+        'created': 3, 'updated': 0, 'unchanged': 0, 'deleted': 1, 'skipped': 1}}
+    assert Match.objects.filter(circuit=circuit).count() == 3
+
+    match = Match.objects.get(home=home, away=away)
+    assert match.primary_caster == caster
+    assert match.start_time.hour == 1
+    assert {co_caster.player.name for co_caster in match.secondary_casters.all()} == {
+        'Primary Caster', 'New Cocaster'}
+    assert not Player.objects.get(name='New Cocaster').caster_profile.does_solo_casts
+
+    assert match.result.winner == home
+    assert Set.objects.filter(result=match.result, winner=home).count() == 3
+    assert Set.objects.filter(result=match.result, winner=away).count() == 1
+
+    forfeit = Result.objects.get(match__home=away)
+    assert forfeit.status == Result.DOUBLE_FORFEIT
+
+    unplayed = Match.objects.get(home=home, away=other)
+    assert unplayed.start_time is None
+    assert unplayed.round.name == 'Week 2'
+    assert not Result.objects.filter(match=unplayed).exists()
+
+    assert TeamStanding.objects.get(team=home).match_wins == 1
+    assert TeamStanding.objects.get(team=home).set_wins == 3
+    assert TeamStanding.objects.get(team=away).forfeits == 1
+
+
+@mark.django_db
+def test_bulk_import_matches_query_count():
+    """
+    The number of queries doesn't grow with the number of rows imported.
+    """
+    season = SeasonFactory()
+    circuit = CircuitFactory(season=season, region='W', tier='1')
+    teams = [TeamFactory(circuit=circuit, name=f'Team {n}') for n in range(8)]
+
+    def rows(count):
+        return [
+            _row(
+                circuit, teams[n % 8], teams[(n + 1) % 8],
+                winner=teams[n % 8].name, home_sets_won='3',
+                away_sets_won='2', week=f'Week {n % 5 + 1}'
+            )
+            for n in range(count)
+        ]
+
+    connection.queries_log.clear()
+    with CaptureQueriesContext(connection) as few:
+        bulk_import_matches(rows(4), season, delete_before_import=False)
+
+    with CaptureQueriesContext(connection) as many:
+        bulk_import_matches(rows(40), season, delete_before_import=False)
+
+    assert Match.objects.count() == 40
+    assert Set.objects.count() == 200
+    assert len(many.captured_queries) <= len(few.captured_queries) + 5
+
+
+@mark.django_db
+def test_bulk_import_matches_is_idempotent():
+    """
+    Re-importing the same rows writes nothing, and changed rows only update
+    the matches and results they describe.
+    """
+    season = SeasonFactory()
+    circuit = CircuitFactory(season=season, region='W', tier='1')
+    home, away, other = [
+        TeamFactory(circuit=circuit, name=name)
+        for name in ('Home Team', 'Away Team', 'Other Team')
+    ]
+    caster = CasterFactory(player=PlayerFactory(name='Primary Caster'))
+
+    uploaded = ResultFactory(
+        match=MatchFactory(
+            circuit=circuit, home=other, away=away,
+            round=season.rounds.get(name='Week 1'),
+            start_time=season.regular_start),
+        winner=other, loser=away, created_by=PlayerFactory()
+    )
+
+    rows = [
+        _row(
+            circuit, home, away, winner='Home Team', home_sets_won='3',
+            away_sets_won='1'
+        ),
+        _row(circuit, home, other),
+        _row(circuit, other, away, winner='Away Team', home_sets_won='0',
+             away_sets_won='3'),
+    ]
+
+    counts = bulk_import_matches(rows, season)
+    assert counts['matches']['created'] == 2
+    assert counts['matches']['updated'] == 1
+
+    match = Match.objects.get(home=home, away=away)
+    modified = match.modified
+
+    with CaptureQueriesContext(connection) as context:
+        counts = bulk_import_matches(rows, season)
+
+    assert counts['matches'] == {
+        'created': 0, 'updated': 0, 'unchanged': 3, 'deleted': 0, 'skipped': 0}
+    assert not [
+        query for query in context.captured_queries
+        if query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))
+    ]
+
+    rows[0].update(
+        winner='Away Team', home_sets_won='2', away_sets_won='3',
+        vod_link='https://example.com/vod', caster='Primary Caster'
+    )
+    rows[1].update(winner='Other Team', home_sets_won='1', away_sets_won='3')
+
+    counts = bulk_import_matches(rows, season)
+    assert counts['matches']['updated'] == 2
+    assert counts['matches']['unchanged'] == 1
+
+    match.refresh_from_db()
+    assert match.id == Match.objects.get(home=home, away=away).id
+    assert match.modified > modified
+    assert match.vod_link == 'https://example.com/vod'
+    assert match.primary_caster == caster
+    assert match.result.winner == away
+    assert match.result.sets.count() == 5
+    assert Result.objects.get(match__home=home, match__away=other).winner == other
+
+    # Results uploaded by captains are left alone
+    uploaded.refresh_from_db()
+    assert uploaded.winner == other
+
+    assert TeamStanding.objects.get(team=away).match_wins == 1
+    assert TeamStanding.objects.get(team=home).match_losses == 2
+    assert Match.objects.count() == 3
+
+
+@mark.django_db
+def test_bulk_import_matches_clears_legacy_results():
+    """
+    A blank winner clears results from before sources were recorded, but
+    not ones uploaded by captains.
+    """
+    season = SeasonFactory()
+    circuit = CircuitFactory(season=season, region='W', tier='1')
+    home, away, other = [
+        TeamFactory(circuit=circuit, name=name)
+        for name in ('Home Team', 'Away Team', 'Other Team')
+    ]
+    week = season.rounds.get(name='Week 1')
+
+    legacy = ResultFactory(
+        match=MatchFactory(
+            circuit=circuit, home=home, away=away, round=week,
+            start_time=season.regular_start),
+        source=None
+    )
+    uploaded = ResultFactory(
+        match=MatchFactory(
+            circuit=circuit, home=home, away=other, round=week,
+            start_time=season.regular_start),
+        source=None, created_by=PlayerFactory()
+    )
+
+    bulk_import_matches(
+        [_row(circuit, home, away), _row(circuit, home, other)], season)
+
+    assert not Result.objects.filter(id=legacy.id).exists()
+    assert Result.objects.filter(id=uploaded.id).exists()
+    assert TeamStanding.objects.get(team=away).match_losses == 0
+
+
+@mark.django_db
+def test_bulk_import_matches_from_csv_in_batches():
+    """
+    Rows can be streamed straight from the CSV parser and written in batches.
+    """
+    season = SeasonFactory()
+    circuit = CircuitFactory(season=season, region='W', tier='1')
+    teams = [TeamFactory(circuit=circuit, name=f'Team {n}') for n in range(6)]
+
+    header = (
+        'Tier,Circ,Away Team,Home Team,Time (Eastern),Date,Caster,'
+        'Co-casters,Stream Link,VOD Link,Away Sets Won,Home Sets Won,'
+        'Winner,Week\n'
+    )
+    lines = [header] + [
+        f'1,W,{teams[n + 1].name},{teams[n].name},TBD,2021-03-01,,,,,1,3,'
+        f'{teams[n].name},Week {n + 1}\n'
+        for n in range(5)
+    ]
+
+    counts = bulk_import_matches(
+        parse_matches_csv(iter(lines)), season, batch_size=2)
+
+    assert counts['matches']['created'] == 5
+    assert Match.objects.filter(start_time__isnull=True).count() == 5
+    assert Result.objects.count() == 5
+    assert Set.objects.count() == 20
@@ -0,0 +1,87 @@
+from datetime import timedelta
+from unittest import mock
+from pytest import mark
+from django.utils import timezone
+from matches.models import Result, ResultSubmission
+from matches.services import (
+    claim_result_submission, queue_result_submission, run_result_submissions)
+from matches.tests.factories import MatchFactory
+
+
+def _queue(match):
+    payload = {
+        'match': match.id,
+        'status': 'C',
+        'winner': match.home.id,
+        'loser': match.away.id,
+        'sets': [{'number': 1, 'winner': match.home.id, 'loser': match.away.id}]
+    }
+    submission, created = queue_result_submission(
+        match, payload, match.home.captain)
+    return submission
+
+
+@mark.django_db
+def test_result_submission_retries(settings):
+    """
+    Errors while ingesting roll back and are retried with a growing delay
+    until the submission runs out of attempts.
+    """
+    settings.RESULT_SUBMISSION_MAX_ATTEMPTS = 2
+    submission = _queue(MatchFactory())
+
+    with mock.patch(
+        'api.serializers.matches.generate_games', side_effect=RuntimeError('boom')):
+        assert run_result_submissions() == {
+            'succeeded': 0, 'retried': 1, 'failed': 0}
+
+        submission.refresh_from_db()
+        assert submission.status == ResultSubmission.QUEUED
+        assert submission.available_at > timezone.now()
+        assert not Result.objects.exists()
+
+        # Not due yet
+        assert claim_result_submission() is None
+
+        ResultSubmission.objects.update(available_at=timezone.now())
+        assert run_result_submissions()['failed'] == 1
+
+    submission.refresh_from_db()
+    assert submission.status == ResultSubmission.FAILED
+    assert 'boom' in submission.error
+
+    # Queueing the same payload again gives it another go
+    assert _queue(submission.match).id == submission.id
+    assert run_result_submissions()['succeeded'] == 1
+    assert Result.objects.get(match=submission.match).submission == submission
+
+
+@mark.django_db
+def test_result_submission_stale_lock_is_reclaimed():
+    """
+    Submissions left running by a worker that died are picked up again.
+    """
+    submission = _queue(MatchFactory())
+    assert claim_result_submission() == submission
+    assert claim_result_submission() is None
+
+    ResultSubmission.objects.update(
+        locked_at=timezone.now() - timedelta(hours=1))
+
+    claimed = claim_result_submission()
+    assert claimed == submission
+    assert claimed.attempts == 2
+
+
+@mark.django_db
+def test_result_submission_invalid_payload_fails():
+    """
+    Payloads that no longer validate fail without retrying.
+    """
+    submission = _queue(MatchFactory())
+    Result.objects.create(match=submission.match, status=Result.COMPLETED)
+
+    assert run_result_submissions()['failed'] == 1
+    submission.refresh_from_db()
+    assert submission.attempts == 1
+    assert 'match' in submission.error
@@ -0,0 +1,86 @@
+import zlib
+from pytest import mark
+from matches.models import SetLog, SetLogBlob
+from matches.services import (
+    bulk_create_set_logs, iter_log_bytes, load_set_log_bodies,
+    migrate_set_logs)
+from matches.tests.factories import SetFactory, SetLogFactory
+
+
+@mark.django_db
+def test_set_log_body_is_stored_compressed():
+    """
+    Bodies are written to SetLogBlob and read back lazily.
+    """
+    body = {'games': [{'winCondition': 1}] * 50, 'gameWinners': [1] * 50}
+    log = SetLogFactory(body=body)
+
+    assert log.legacy_body is None
+    assert log.size == len(b''.join(iter_log_bytes(log.blob.data)))
+    assert len(log.blob.data) < log.size
+
+    log = SetLog.objects.get(pk=log.pk)
+    assert log.body == body
+
+    log.body = {'games': []}
+    log.save()
+    assert SetLog.objects.get(pk=log.pk).body == {'games': []}
+    assert SetLogBlob.objects.count() == 1
+
+
+def test_iter_log_bytes_yields_a_range():
+    """
+    Any byte range of the log can be read without decompressing it all.
+    """
+    raw = bytes(range(256)) * 400
+    data = zlib.compress(raw)
+
+    assert b''.join(iter_log_bytes(data, chunk_size=64)) == raw
+    assert b''.join(iter_log_bytes(data, 1000, 50000, chunk_size=64)) == (
+        raw[1000:50001])
+    assert b''.join(iter_log_bytes(data, len(raw) - 5)) == raw[-5:]
+
+
+@mark.django_db
+def test_migrate_set_logs():
+    """
+    Inline bodies move into compressed storage and read back the same.
+    """
+    bodies = [{'games': [], 'number': number} for number in range(5)]
+    logs = [
+        SetLog.objects.create(
+            set=SetFactory(), filename=f'{number}.json', legacy_body=body)
+        for number, body in enumerate(bodies)
+    ]
+    moved = SetLogFactory()
+
+    counts = migrate_set_logs(batch_size=2)
+
+    assert counts['logs'] == 5
+    assert counts['compressed_bytes'] > 0
+    assert SetLogBlob.objects.count() == 6
+    assert not SetLog.objects.filter(legacy_body__isnull=False).exists()
+    assert load_set_log_bodies(log.set_id for log in logs) == {
+        log.set_id: body for log, body in zip(logs, bodies)}
+    assert SetLog.objects.get(pk=logs[0].pk).size == len(
+        b'{"games":[],"number":0}')
+
+    # Running again has nothing left to move
+    assert migrate_set_logs()['logs'] == 0
+    assert SetLog.objects.get(pk=moved.pk).body == moved.body
+
+
+@mark.django_db
+def test_bulk_create_set_logs():
+    """
+    Many logs and their blobs can be created at once.
+    """
+    sets = SetFactory.create_batch(3)
+    logs = bulk_create_set_logs([
+        SetLogFactory.build(set=game_set, body={'set': game_set.id})
+        for game_set in sets
+    ])
+
+    assert all(log.pk for log in logs)
+    assert load_set_log_bodies(game_set.id for game_set in sets) == {
+        game_set.id: {'set': game_set.id} for game_set in sets}
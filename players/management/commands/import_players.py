@@ -1,6 +1,6 @@
 from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
-from buzz.services import get_sheet_csv
+from buzz.services import iter_sheet_csv
 from players.services import bulk_import_players, parse_players_csv
 from players.models import PlayerSettings
 
@@ -11,7 +11,7 @@ class Command(BaseCommand):
         settings = PlayerSettings.objects.all().first()
 
         if settings:        
-            csv_data = get_sheet_csv(settings.players_csv_url)
+            csv_data = iter_sheet_csv(settings.players_csv_url)
             players = parse_players_csv(csv_data)
             result_count = bulk_import_players(players)
         
@@ -29,6 +29,13 @@ class Command(BaseCommand):
                 f'Skipped {result_count["aliases"]["skipped"]} Aliases.')
             )
 
+            for conflict in result_count['conflicts']:
+                self.stdout.write(self.style.WARNING(
+                    f'Row {conflict["row"]}, {conflict["player"]}: '
+                    f'{conflict["alias"] or conflict["player"]} skipped, '
+                    f'{conflict["reason"]} ({conflict["owner"]})')
+                )
+
         else:
 
             self.stdout.write(self.style.NOTICE(
@@ -1,7 +1,11 @@
-import csv
 import json
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from buzz.services import bulk_create_with_ids, read_csv_rows
+from casters.models import Caster
 from players.models import Player, Alias, IGLPlayerLookup
+from search.models import SearchEntry
+from search.services import index_objects
 
 def connect_user_to_player(user):
     """
@@ -117,14 +121,14 @@ def import_igl_discord_player_data(
 
 def parse_players_csv(csv_data):
     """
-    Parse through CSV data of players, convert to a list of player data dicts.
+    Parse through CSV data of players, yielding a player data dict per row.
 
     Arguments:
-    csv_data -- Raw CSV data containing player information. (str)
+    csv_data -- Raw CSV data containing player information, or an iterable
+                of its lines. (str|iterable)
     """
-    rows = csv.reader(csv_data.splitlines(), delimiter=',')
-    
-    players = []
+    rows = read_csv_rows(csv_data)
+
     headers = {
         'Player Name': None,
         'Phoentic': None,
@@ -151,106 +155,242 @@ def parse_players_csv(csv_data):
             for key, val in headers.items():
                 player[key.lower().replace(' ', '_')] = row[val]
 
-            players.append(player)
-    
-    return players
+            yield player
+
 
+PLAYER_IMPORT_FIELDS = {
+    'name_phonetic': 'phoentic',
+    'pronouns': 'pronouns',
+    'discord_username': 'discord_id',
+    'twitch_username': 'twitch_id',
+}
 
-def bulk_import_players(players):
+
+def bulk_import_players(players, batch_size=500):
     """
     Given a list of player data, bulk import into database.
 
     Since team import also brings in players, we are more cautious here as
     we don't want to disrupt those connections. Therefor, this import process
-    only creates and updates existing player objects. 
+    only creates and updates existing player objects.
+
+    Every Player and Alias is loaded once into dicts keyed by lowercased
+    name, and the whole import is worked out in memory before anything is
+    written:
+
+    1. Match each row to a player by name ignoring case, or create one
+    2. Copy over phonetic name, pronouns, Discord and Twitch usernames
+    3. Create or rename the player's primary alias to the primary in-game
+       name
+    4. Create any secondary alts the player doesn't have yet
+
+    Changes are then applied with bulk_create / bulk_update in one
+    transaction. Aliases whose name is already taken, and rows repeating a
+    player, are left out and listed under `conflicts` in the result, each a
+    dict of the CSV `row`, `player` and `alias` names, the `owner` of the
+    taken alias and a `reason`.
 
     Arguments:
-    players -- List of team data derived from team CSV sheet. (list)
+    players -- Player dicts derived from the players CSV sheet, e.g. as
+               yielded by parse_players_csv. (iterable)
+    batch_size -- Rows per INSERT or UPDATE statement. (int) (optional)
     """
-    pass
-    player_count = {'created': 0, 'updated': 0}
-    alias_count = {'created': 0, 'updated': 0, 'deleted': 0, 'skipped': 0}
+    from api.cache import invalidate_api_cache
+
+    player_count = {'created': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0}
+    alias_count = {
+        'created': 0, 'updated': 0, 'unchanged': 0, 'deleted': 0,
+        'skipped': 0
+    }
+    conflicts = []
+
+    players_by_id = {
+        player.id: player for player in Player.objects.order_by('pk').only(
+            'id', 'name', *PLAYER_IMPORT_FIELDS)
+    }
+
+    players_by_name = {}
+    for player in players_by_id.values():
+        players_by_name.setdefault(player.name.lower(), player)
+
+    aliases_by_name = {}
+    primary_aliases = {}
+
+    for alias in Alias.objects.order_by('pk'):
+        aliases_by_name.setdefault(alias.name.lower(), alias)
+        if alias.is_primary:
+            primary_aliases.setdefault(alias.player_id, alias)
+
+    new_players = []
+    changed_players = {}
+    new_aliases = []
+    changed_aliases = {}
+    seen_players = set()
+    now = timezone.now()
+
+    def owner(alias):
+        if alias.player_id is None:
+            return alias.player
+        return players_by_id[alias.player_id]
+
+    def conflict(row, player, name, owner_name, reason):
+        conflicts.append({
+            'row': row, 'player': player, 'alias': name, 'owner': owner_name,
+            'reason': reason
+        })
+
+    def claim_alias(row, player, name, is_primary):
+        """
+        Return the Alias called `name` if `player` can use it, creating one
+        if need be, or record a conflict and return None.
+        """
+        alias = aliases_by_name.get(name.lower())
+
+        if alias is None:
+            alias = Alias(name=name, is_primary=is_primary, player=player)
+            aliases_by_name[name.lower()] = alias
+            new_aliases.append(alias)
+            alias_count['created'] += 1
+            return alias
+
+        if owner(alias) is not player:
+            reason = 'alias belongs to another player'
+        elif alias.is_primary != is_primary:
+            reason = (
+                'alias is already a secondary alt' if is_primary
+                else 'alias is already the primary in-game name'
+            )
+        else:
+            return alias
+
+        conflict(row, player.name, name, owner(alias).name, reason)
+        alias_count['skipped'] += 1
+        return None
+
+    for row, entry in enumerate(players, start=1):
 
-    for entry in players:   
-        
         # Skip bogus data
         if not entry['primary_in-game_name']:
+            player_count['skipped'] += 1
             continue
 
-        # Locate existing player object, ignoring case.
-        player = Player.objects.filter(
-            name__iexact=entry['player_name']).first()
+        name = entry['player_name']
+        if name.lower() in seen_players:
+            conflict(row, name, None, name, 'player listed more than once')
+            player_count['skipped'] += 1
+            continue
 
-        if player:
-            player_count['updated'] += 1
+        seen_players.add(name.lower())
 
-        # Create (but don't commit) player object if not found 
-        else:
-            player = Player()
-            player.name = entry['player_name']
+        # Locate existing player object, ignoring case
+        player = players_by_name.get(name.lower())
+
+        if not player:
+            player = Player(name=name)
+            players_by_name[name.lower()] = player
+            new_players.append(player)
             player_count['created'] += 1
-                    
-        player.name_phonetic =  entry['phoentic']
-        player.pronouns = entry['pronouns']
-        player.discord_username = entry['discord_id']
-        player.twitch_username = entry['twitch_id']            
-        player.save()  
+
+        changed = False
+        for field, key in PLAYER_IMPORT_FIELDS.items():
+            if getattr(player, field) != entry[key]:
+                setattr(player, field, entry[key])
+                changed = True
+
+        if player.pk and changed:
+            player.modified = now
+            changed_players[player.id] = player
+            player_count['updated'] += 1
+        elif player.pk:
+            player_count['unchanged'] += 1
 
         # Set primary in-game name
-        primary_alias = player.aliases.filter(is_primary=True).first()
+        primary_name = entry['primary_in-game_name']
+        primary_alias = primary_aliases.get(player.id) if player.pk else None
 
-        if primary_alias:
-            if primary_alias.name != entry['primary_in-game_name']:
-                primary_alias.name = entry['primary_in-game_name']
-                primary_alias.save()
-                alias_count['updated'] += 1
+        if primary_alias is None:
+            primary_alias = claim_alias(row, player, primary_name, True)
+            if primary_alias and player.pk:
+                primary_aliases[player.id] = primary_alias
 
-        # If primary in game name field completed, set as main alias
-        elif entry['primary_in-game_name']:
-            try:
-                Alias.objects.create(
-                    player=player,
-                    name=entry['primary_in-game_name'],
-                    is_primary=True
-                )
-            
-            # Trying to set more than one user's primary alias to the same
-            # alias...possibly due to player rename
-            except IntegrityError:
-                pass
+        elif primary_alias.name == primary_name:
+            alias_count['unchanged'] += 1
 
-            alias_count['created'] += 1
-        
-        # If not, just use player name record as primary alias
         else:
-            Alias.objects.create(
-                player=player,
-                name=player.name,
-                is_primary=True
-            )
-            alias_count['created'] += 1
-        
+            taken = aliases_by_name.get(primary_name.lower())
+
+            if taken and taken is not primary_alias:
+                reason = (
+                    'alias belongs to another player'
+                    if owner(taken) is not player
+                    else 'alias is already a secondary alt'
+                )
+                conflict(
+                    row, player.name, primary_name, owner(taken).name, reason)
+                alias_count['skipped'] += 1
+
+            else:
+                if aliases_by_name.get(primary_alias.name.lower()) is primary_alias:
+                    del aliases_by_name[primary_alias.name.lower()]
+
+                primary_alias.name = primary_name
+                aliases_by_name[primary_name.lower()] = primary_alias
+                changed_aliases[primary_alias.id] = primary_alias
+                alias_count['updated'] += 1
+
         # Set secondary alts
-        secondary_aliases = entry['secondary_alts'].split(',')
-        secondary_aliases = [x for x in secondary_aliases if x] # Weed out empty
+        alts = [alt.strip() for alt in entry['secondary_alts'].split(',')]
 
-        for alt in secondary_aliases:
-            
-            # Skip garbage entries
-            if alt.lower() in ['none']:
-                continue 
-            
-            alias = Alias.objects.filter(name__iexact=alt, player=player, is_primary=False).first()
+        for alt in alts:
+
+            # Weed out empty and garbage entries
+            if not alt or alt.lower() in ['none']:
+                continue
+
+            alias = claim_alias(row, player, alt, False)
 
-            if alias:
+            # Only aliases already in the database can need a new case
+            if not alias or alias.pk is None:
+                continue
+
+            if alias.name != alt:
                 alias.name = alt
-                alias.save()
+                changed_aliases[alias.id] = alias
                 alias_count['updated'] += 1
             else:
-                try:
-                    Alias.objects.create(name=alt, player=player, is_primary=False)
-                    alias_count['updated'] += 1
-                except IntegrityError:
-                    alias_count['skipped'] += 1
+                alias_count['unchanged'] += 1
+
+    with transaction.atomic():
+        bulk_create_with_ids(Player, new_players, ['name'], batch_size)
+
+        # Players created above only now have ids to point at
+        for alias in new_aliases:
+            alias.player_id = alias.player.id
 
-    return {'players': player_count, 'aliases': alias_count}
+        Alias.objects.bulk_create(new_aliases, batch_size=batch_size)
+
+        Player.objects.bulk_update(
+            changed_players.values(),
+            list(PLAYER_IMPORT_FIELDS) + ['modified'], batch_size=batch_size
+        )
+        Alias.objects.bulk_update(
+            changed_aliases.values(), ['name'], batch_size=batch_size)
+
+        # Bulk writes skip the signals that keep these up to date
+        player_ids = {player.id for player in new_players}
+        player_ids.update(changed_players)
+        player_ids.update(alias.player_id for alias in new_aliases)
+        player_ids.update(alias.player_id for alias in changed_aliases.values())
+
+        index_objects(SearchEntry.PLAYER, player_ids)
+        index_objects(SearchEntry.CASTER, Caster.objects.filter(
+            player_id__in=player_ids).values_list('id', flat=True))
+
+        if player_ids:
+            invalidate_api_cache()
+
+    return {
+        'players': player_count,
+        'aliases': alias_count,
+        'conflicts': conflicts
+    }
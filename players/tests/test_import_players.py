@@ -0,0 +1,131 @@
+from pytest import mark
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from players.models import Alias, Player
+from players.services import bulk_import_players
+from players.tests.factories import PlayerFactory
+from search.models import SearchEntry
+
+
+def _row(name, primary, alts='', **kwargs):
+    row = {
+        'player_name': name,
+        'phoentic': '',
+        'pronouns': 'they/them',
+        'primary_in-game_name': primary,
+        'secondary_alts': alts,
+        'discord_id': f'{name.lower()}#0001',
+        'twitch_id': '',
+    }
+    row.update(kwargs)
+    return row
+
+
+def _aliases(player):
+    return set(player.aliases.values_list('name', 'is_primary'))
+
+
+@mark.django_db
+def test_bulk_import_players():
+    """
+    Players and aliases are matched by name ignoring case, created or
+    updated, and aliases that are taken are reported as conflicts.
+    """
+    alice = PlayerFactory(name='Alice')
+    Alias.objects.create(player=alice, name='OldAlice', is_primary=True)
+    Alias.objects.create(player=alice, name='alice alt')
+    bob = PlayerFactory(name='Bob')
+    Alias.objects.create(player=bob, name='Bobby', is_primary=True)
+
+    rows = [
+        _row('alice', 'NewAlice', 'Alice Alt, none, , Bobby'),
+        _row('Carol', 'Caz', 'C1,C2'),
+        _row('Dave', 'caz'),
+        _row('CAROL', 'Caz'),
+        _row('Nobody', ''),
+    ]
+
+    counts = bulk_import_players(rows)
+
+    assert counts['players'] == {
+        'created': 2, 'updated': 1, 'unchanged': 0, 'skipped': 2}
+    assert counts['aliases'] == {
+        'created': 3, 'updated': 2, 'unchanged': 0, 'deleted': 0,
+        'skipped': 2
+    }
+    assert counts['conflicts'] == [
+        {
+            'row': 1, 'player': 'Alice', 'alias': 'Bobby', 'owner': 'Bob',
+            'reason': 'alias belongs to another player'
+        },
+        {
+            'row': 3, 'player': 'Dave', 'alias': 'caz', 'owner': 'Carol',
+            'reason': 'alias belongs to another player'
+        },
+        {
+            'row': 4, 'player': 'CAROL', 'alias': None, 'owner': 'CAROL',
+            'reason': 'player listed more than once'
+        },
+    ]
+
+    alice.refresh_from_db()
+    assert alice.name == 'Alice'
+    assert alice.pronouns == 'they/them'
+    assert alice.discord_username == 'alice#0001'
+    assert _aliases(alice) == {('NewAlice', True), ('Alice Alt', False)}
+
+    carol = Player.objects.get(name='Carol')
+    assert _aliases(carol) == {('Caz', True), ('C1', False), ('C2', False)}
+    assert not Player.objects.get(name='Dave').aliases.exists()
+    assert _aliases(bob) == {('Bobby', True)}
+
+    # Aliases written in bulk still reach the search index
+    assert SearchEntry.objects.filter(
+        kind=SearchEntry.PLAYER, object_id=carol.id, name='C2',
+        is_alias=True).exists()
+    assert not SearchEntry.objects.filter(name='OldAlice').exists()
+
+
+@mark.django_db
+def test_bulk_import_players_is_idempotent():
+    rows = [_row(f'Player {n}', f'Main {n}', f'Alt {n}') for n in range(5)]
+    bulk_import_players(rows)
+
+    with CaptureQueriesContext(connection) as context:
+        counts = bulk_import_players(rows)
+
+    assert counts['players']['unchanged'] == 5
+    assert counts['aliases']['unchanged'] == 10
+    assert not counts['conflicts']
+    assert not [
+        query for query in context.captured_queries
+        if query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))
+    ]
+
+
+@mark.django_db
+def test_bulk_import_players_query_count():
+    """
+    The number of reads doesn't grow with the number of players imported.
+    """
+    def reads(context):
+        return [
+            query for query in context.captured_queries
+            if not query['sql'].startswith('INSERT')
+        ]
+
+    def rows(start, count, pronouns):
+        return [
+            _row(f'Player {n}', f'Main {n}', f'Alt {n}', pronouns=pronouns)
+            for n in range(start, start + count)
+        ]
+
+    connection.queries_log.clear()
+    with CaptureQueriesContext(connection) as few:
+        bulk_import_players(rows(0, 2, 'she/her'))
+
+    with CaptureQueriesContext(connection) as many:
+        bulk_import_players(rows(0, 2, 'he/him') + rows(2, 40, 'he/him'))
+
+    assert Alias.objects.count() == 84
+    assert len(reads(many)) <= len(reads(few)) + 2
@@ -0,0 +1,11 @@
+from django.contrib import admin
+from .models import SearchEntry
+
+class SearchEntryAdmin(admin.ModelAdmin):
+
+    list_display = ('name', 'kind', 'object_id', 'is_alias')
+    list_filter = ('kind', 'is_alias')
+    search_fields = ('normalized',)
+
+
+admin.site.register(SearchEntry, SearchEntryAdmin)
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from search.services import rebuild_search_index
+
+class Command(BaseCommand):
+    help = 'Bring the name search index up to date with every player, team, dynasty and caster.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Objects to index per round of queries')
+
+    def handle(self, *args, **options):
+        counts = rebuild_search_index(options['batch_size'])
+        summary = ', '.join(f'{count} {kind}' for kind, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f'Reindexed {summary}'))
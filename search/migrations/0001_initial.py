@@ -0,0 +1,46 @@
+# Generated by Django 3.1 on 2026-10-18 20:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('P', 'Player'), ('T', 'Team'), ('D', 'Dynasty'), ('C', 'Caster')], max_length=1)),
+                ('object_id', models.PositiveIntegerField()),
+                ('name', models.CharField(max_length=255)),
+                ('normalized', models.CharField(max_length=255)),
+                ('is_alias', models.BooleanField(default=False)),
+                ('trigram_count', models.PositiveSmallIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Search Entries',
+            },
+        ),
+        migrations.CreateModel(
+            name='SearchTrigram',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(max_length=3)),
+                ('entry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trigrams', to='search.searchentry')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='searchentry',
+            index=models.Index(fields=['kind', 'object_id'], name='search_sear_kind_e0a70d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='searchtrigram',
+            index=models.Index(fields=['trigram', 'entry'], name='search_sear_trigram_0e0108_idx'),
+        ),
+    ]
@@ -0,0 +1,117 @@
+import re
+import unicodedata
+from django.core.management.color import no_style
+from django.db import migrations
+from django.db.models import Max
+
+BATCH_SIZE = 500
+
+_NON_WORD = re.compile(r'[\W_]+')
+
+
+# Copies of search.services.normalize_name and get_trigrams as they were
+# when this migration was written, so later changes to them can't change
+# what it does
+def normalize_name(name):
+    text = unicodedata.normalize('NFKD', name or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    text = _NON_WORD.sub(' ', text.casefold())
+
+    return ' '.join(text.split())
+
+
+def get_trigrams(normalized):
+    if normalized:
+        normalized = f'  {normalized} '
+
+    return {
+        normalized[index:index + 3] for index in range(len(normalized) - 2)
+    }
+
+
+def index_names(apps, schema_editor):
+    """
+    Add search entries for every existing player, alias, team, dynasty and
+    caster.
+    """
+    SearchEntry = apps.get_model('search', 'SearchEntry')
+    SearchTrigram = apps.get_model('search', 'SearchTrigram')
+
+    Player = apps.get_model('players', 'Player')
+    Alias = apps.get_model('players', 'Alias')
+    Team = apps.get_model('teams', 'Team')
+    Dynasty = apps.get_model('teams', 'Dynasty')
+    Caster = apps.get_model('casters', 'Caster')
+
+    rows = [
+        ('P', pk, name, False)
+        for pk, name in Player.objects.values_list('id', 'name')
+    ]
+    rows += [
+        ('P', pk, name, True)
+        for pk, name in Alias.objects.values_list('player_id', 'name')
+    ]
+    rows += [
+        ('T', pk, name, False)
+        for pk, name in Team.objects.values_list('id', 'name')
+    ]
+    rows += [
+        ('D', pk, name, False)
+        for pk, name in Dynasty.objects.values_list('id', 'name')
+    ]
+    rows += [
+        ('C', pk, alias_name or player_name, False)
+        for pk, alias_name, player_name in Caster.objects.values_list(
+            'id', 'alias__name', 'player__name')
+    ]
+
+    # Ids are set up front so trigrams can point at entries without reading
+    # them back after each insert
+    next_id = (SearchEntry.objects.aggregate(Max('id'))['id__max'] or 0) + 1
+    entries = []
+    entry_trigrams = []
+
+    for kind, pk, name, is_alias in rows:
+        normalized = normalize_name(name)[:255]
+        if not normalized:
+            continue
+
+        trigrams = get_trigrams(normalized)
+        entries.append(SearchEntry(
+            id=next_id, kind=kind, object_id=pk, name=name,
+            normalized=normalized, is_alias=is_alias,
+            trigram_count=len(trigrams)
+        ))
+        entry_trigrams += [
+            SearchTrigram(entry_id=next_id, trigram=trigram)
+            for trigram in trigrams
+        ]
+        next_id += 1
+
+    SearchEntry.objects.bulk_create(entries, batch_size=BATCH_SIZE)
+    SearchTrigram.objects.bulk_create(entry_trigrams, batch_size=BATCH_SIZE)
+
+    # Move the id sequence past the ids set above, where there is one
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(
+            no_style(), [SearchEntry]):
+            cursor.execute(sql)
+
+
+def clear_index(apps, schema_editor):
+    apps.get_model('search', 'SearchEntry').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+        ('players', '0014_auto_20210318_1829'),
+        ('teams', '0012_teamstanding'),
+        ('casters', '0008_caster_alias'),
+    ]
+
+    operations = [
+        migrations.RunPython(index_names, clear_index)
+    ]
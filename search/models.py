@@ -0,0 +1,49 @@
+from django.db import models
+
+
+class SearchEntry(models.Model):
+    """
+    One searchable name for a Player, Team, Dynasty or Caster.
+
+    Players have an entry for their name and one for each of their aliases.
+    Entries are rebuilt by `search.signals` whenever a name changes.
+    """
+    PLAYER = 'P'
+    TEAM = 'T'
+    DYNASTY = 'D'
+    CASTER = 'C'
+
+    KIND_CHOICES = (
+        (PLAYER, 'Player'),
+        (TEAM, 'Team'),
+        (DYNASTY, 'Dynasty'),
+        (CASTER, 'Caster'),
+    )
+
+    kind = models.CharField(max_length=1, choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField()
+
+    name = models.CharField(max_length=255)
+    normalized = models.CharField(max_length=255)
+    is_alias = models.BooleanField(default=False)
+    trigram_count = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'Search Entries'
+        indexes = [models.Index(fields=['kind', 'object_id'])]
+
+    def __str__(self):
+        return f'{self.get_kind_display()}: {self.name}'
+
+
+class SearchTrigram(models.Model):
+    """A three character slice of a SearchEntry's normalized name."""
+    entry = models.ForeignKey(
+        SearchEntry, related_name='trigrams', on_delete=models.CASCADE)
+    trigram = models.CharField(max_length=3)
+
+    class Meta:
+        indexes = [models.Index(fields=['trigram', 'entry'])]
+
+    def __str__(self):
+        return self.trigram
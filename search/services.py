@@ -0,0 +1,380 @@
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Q
+from django.db.models.functions import Cast
+from buzz.services import bulk_create_with_ids, chunked
+from casters.models import Caster
+from players.models import Alias, Player
+from teams.models import Dynasty, Team
+from .models import SearchEntry, SearchTrigram
+
+_NON_WORD = re.compile(r'[\W_]+')
+
+_state = threading.local()
+
+# Query parameter values for each kind of entry
+KIND_NAMES = {
+    'player': SearchEntry.PLAYER,
+    'team': SearchEntry.TEAM,
+    'dynasty': SearchEntry.DYNASTY,
+    'caster': SearchEntry.CASTER,
+}
+
+
+def normalize_name(name):
+    """
+    Fold a name down to lowercase letters and digits separated by spaces.
+
+    Accents are stripped and punctuation is treated as a space, so
+    'Dynastié, Inc.' and 'dynastie inc' normalize to the same thing.
+
+    Arguments:
+    name -- Name to normalize. (str)
+    """
+    text = unicodedata.normalize('NFKD', name or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    text = _NON_WORD.sub(' ', text.casefold())
+
+    return ' '.join(text.split())
+
+
+def get_trigrams(normalized, pad=True):
+    """
+    Return the set of three character slices of a normalized name.
+
+    Padding marks the start and end of the name, so names sharing a prefix
+    score higher against each other. Leave it off to get the slices any
+    name containing `normalized` must also have.
+
+    Arguments:
+    normalized -- Output of normalize_name. (str)
+    pad -- Add leading and trailing spaces first. (bool) (optional)
+    """
+    if pad and normalized:
+        normalized = f'  {normalized} '
+
+    return {
+        normalized[index:index + 3] for index in range(len(normalized) - 2)
+    }
+
+
+def get_similarity(trigrams, other):
+    """Return the share of trigrams two names have in common, from 0 to 1."""
+    if not trigrams or not other:
+        return 0
+
+    shared = len(trigrams & other)
+    return shared / (len(trigrams) + len(other) - shared)
+
+
+def _get_names(kind, ids):
+    """
+    Return {object_id: {(name, is_alias), ...}} for the objects that exist.
+
+    Names that normalize to nothing are left out, since they can't be found.
+    """
+    names = defaultdict(set)
+
+    if kind == SearchEntry.PLAYER:
+        rows = [
+            (pk, name, False) for pk, name in
+            Player.objects.filter(id__in=ids).values_list('id', 'name')
+        ]
+        rows += [
+            (pk, name, True) for pk, name in
+            Alias.objects.filter(player_id__in=ids).values_list(
+                'player_id', 'name')
+        ]
+
+    elif kind == SearchEntry.CASTER:
+        rows = [
+            (pk, alias_name or player_name, False)
+            for pk, alias_name, player_name in
+            Caster.objects.filter(id__in=ids).values_list(
+                'id', 'alias__name', 'player__name')
+        ]
+
+    else:
+        model = Team if kind == SearchEntry.TEAM else Dynasty
+        rows = [
+            (pk, name, False) for pk, name in
+            model.objects.filter(id__in=ids).values_list('id', 'name')
+        ]
+
+    for pk, name, is_alias in rows:
+        if normalize_name(name):
+            names[pk].add((name, is_alias))
+
+    return names
+
+
+def index_objects(kind, ids, batch_size=500):
+    """
+    Bring the search entries for some Players, Teams, Dynasties or Casters
+    up to date with their names.
+
+    Objects whose names haven't changed are left alone, and entries for
+    objects that no longer exist are removed. Returns the number of objects
+    whose entries were rewritten.
+
+    Arguments:
+    kind -- One of the SearchEntry kinds, e.g. SearchEntry.TEAM. (str)
+    ids -- Primary keys of the objects to index. (iterable)
+    batch_size -- Objects to index per round of queries. (int) (optional)
+    """
+    if getattr(_state, 'suppressed', False):
+        return 0
+
+    count = 0
+
+    for chunk in chunked(sorted(set(ids)), batch_size):
+        names = _get_names(kind, chunk)
+
+        current = defaultdict(set)
+        rows = SearchEntry.objects.filter(
+            kind=kind, object_id__in=chunk).values_list(
+                'object_id', 'name', 'is_alias')
+
+        for object_id, name, is_alias in rows:
+            current[object_id].add((name, is_alias))
+
+        changed = [pk for pk in chunk if names.get(pk) != current.get(pk)]
+        if not changed:
+            continue
+
+        entries = []
+        for pk in changed:
+            for name, is_alias in sorted(names.get(pk, ())):
+                normalized = normalize_name(name)[:255]
+                entries.append(SearchEntry(
+                    kind=kind, object_id=pk, name=name, normalized=normalized,
+                    is_alias=is_alias,
+                    trigram_count=len(get_trigrams(normalized))
+                ))
+
+        stale = [pk for pk in changed if pk in current]
+
+        with transaction.atomic():
+            if stale:
+                SearchEntry.objects.filter(
+                    kind=kind, object_id__in=stale).delete()
+
+            bulk_create_with_ids(
+                SearchEntry, entries, ['object_id', 'name', 'is_alias'])
+
+            SearchTrigram.objects.bulk_create([
+                SearchTrigram(entry_id=entry.pk, trigram=trigram)
+                for entry in entries
+                for trigram in get_trigrams(entry.normalized)
+            ], batch_size=1000)
+
+        count += len(changed)
+
+    return count
+
+
+@contextmanager
+def suppress_search_indexing():
+    """
+    Skip reindexing names for writes made inside the block.
+
+    Only for writes that are rolled back, such as a dry run import, since
+    the index would otherwise be left out of date.
+    """
+    previous = getattr(_state, 'suppressed', False)
+    _state.suppressed = True
+
+    try:
+        yield
+    finally:
+        _state.suppressed = previous
+
+
+def rebuild_search_index(batch_size=500):
+    """
+    Bring the whole search index up to date, for instance after names were
+    changed with bulk updates that don't send signals.
+
+    Every Player, Team, Dynasty and Caster is checked, only changed names are
+    rewritten and entries for deleted objects are removed. Returns the number
+    of objects reindexed for each kind, keyed by the names in KIND_NAMES.
+
+    Arguments:
+    batch_size -- Objects to index per round of queries. (int) (optional)
+    """
+    models = {
+        'player': Player, 'team': Team, 'dynasty': Dynasty, 'caster': Caster
+    }
+    counts = {}
+
+    for name, model in models.items():
+        kind = KIND_NAMES[name]
+        ids = model.objects.values_list('id', flat=True)
+        counts[name] = index_objects(kind, ids.iterator(), batch_size)
+
+        SearchEntry.objects.filter(kind=kind).exclude(
+            object_id__in=model.objects.values('id')).delete()
+
+    return counts
+
+
+def get_containing_entries(kind, value, include_aliases=False):
+    """
+    Return the SearchEntries of one kind whose name contains `value`.
+
+    Matches the way `icontains` would, but ignoring accents and punctuation.
+    Entries are narrowed down to those having every trigram of `value`
+    through the trigram index before any names are compared.
+
+    Arguments:
+    kind -- One of the SearchEntry kinds, e.g. SearchEntry.TEAM. (str)
+    value -- Text to look for. (str)
+    include_aliases -- Also match Player aliases. (bool) (optional)
+    """
+    entries = SearchEntry.objects.filter(kind=kind)
+    if not include_aliases:
+        entries = entries.filter(is_alias=False)
+
+    normalized = normalize_name(value)
+    if not normalized:
+        return entries.filter(name__icontains=value)
+
+    trigrams = get_trigrams(normalized, pad=False)
+    if trigrams:
+        candidates = SearchTrigram.objects.filter(trigram__in=trigrams)
+        candidates = candidates.values('entry_id').annotate(
+            found=Count('trigram')).filter(found=len(trigrams))
+
+        entries = entries.filter(id__in=candidates.values('entry_id'))
+
+    return entries.filter(normalized__contains=normalized)
+
+
+def name_lookup(field_name, kind, value, include_aliases=False):
+    """
+    Return a Q object matching rows whose name at `field_name` contains
+    `value`, looked up through the search index.
+
+    Falls back to a plain `icontains` when SEARCH_INDEX_FILTERS is off.
+
+    Arguments:
+    field_name -- Path to an indexed name, e.g. 'home__dynasty__name'. (str)
+    kind -- The SearchEntry kind of the object holding the name. (str)
+    value -- Text to look for. (str)
+    include_aliases -- Also match Player aliases. (bool) (optional)
+    """
+    path = field_name.rpartition('__')[0]
+
+    if not getattr(settings, 'SEARCH_INDEX_FILTERS', True):
+        if kind != SearchEntry.CASTER:
+            return Q(**{f'{field_name}__icontains': value})
+
+        # Casters go by their alias, or their player's name without one
+        prefix = f'{path}__' if path else ''
+        return Q(**{f'{prefix}alias__name__icontains': value}) | Q(**{
+            f'{prefix}alias__isnull': True,
+            f'{prefix}player__name__icontains': value
+        })
+
+    path = path or 'pk'
+    ids = get_containing_entries(kind, value, include_aliases).values(
+        'object_id')
+
+    return Q(**{f'{path}__in': ids})
+
+
+def search_names(query, kinds=None, limit=20):
+    """
+    Return the Players, Teams, Dynasties and Casters best matching a query.
+
+    Exact names rank first, then names starting with the query, then names
+    containing it, then names only sharing enough trigrams with it to pass
+    SEARCH_SIMILARITY_THRESHOLD. Ties go to the more similar name. Players
+    found through an alias are listed once under their own name.
+
+    Each result is a dict of kind, id, name, the name that `matched` and
+    its similarity `score`.
+
+    Arguments:
+    query -- Text to search for. (str)
+    kinds -- SearchEntry kinds to search, None for all. (list) (optional)
+    limit -- Maximum number of results. (int) (optional)
+    """
+    normalized = normalize_name(query)
+    if not normalized:
+        return []
+
+    trigrams = get_trigrams(normalized)
+    threshold = getattr(settings, 'SEARCH_SIMILARITY_THRESHOLD', 0.3)
+    kinds = kinds or [code for code, _ in SearchEntry.KIND_CHOICES]
+
+    similar = SearchEntry.objects.filter(
+        kind__in=kinds, trigrams__trigram__in=trigrams)
+    similar = similar.annotate(shared=Count('trigrams')).annotate(
+        score=ExpressionWrapper(
+            Cast('shared', FloatField()) / (
+                len(trigrams) + F('trigram_count') - F('shared')),
+            output_field=FloatField()
+        )
+    ).filter(score__gte=threshold).order_by('-score', 'id')
+
+    candidates = {entry.id: entry for entry in similar[:limit * 2]}
+
+    for kind in kinds:
+        containing = get_containing_entries(
+            kind, normalized, include_aliases=True).order_by('trigram_count', 'id')
+        candidates.update((entry.id, entry) for entry in containing[:limit * 2])
+
+    def rank(entry):
+        if entry.normalized == normalized:
+            position = 3
+        elif entry.normalized.startswith(normalized):
+            position = 2
+        elif normalized in entry.normalized:
+            position = 1
+        else:
+            position = 0
+
+        score = get_similarity(trigrams, get_trigrams(entry.normalized))
+        return position, score
+
+    ranked = sorted(
+        ((rank(entry), entry) for entry in candidates.values()),
+        key=lambda item: (-item[0][0], -item[0][1], item[1].name, item[1].id)
+    )
+
+    matches = []
+    seen = set()
+
+    for (_, score), entry in ranked:
+        key = (entry.kind, entry.object_id)
+        if key in seen:
+            continue
+
+        seen.add(key)
+        matches.append((entry, score))
+
+        if len(matches) == limit:
+            break
+
+    # Players found by an alias are listed under their own name
+    names = dict(SearchEntry.objects.filter(
+        kind=SearchEntry.PLAYER, is_alias=False,
+        object_id__in=[entry.object_id for entry, _ in matches if entry.is_alias]
+    ).values_list('object_id', 'name'))
+
+    return [
+        {
+            'kind': entry.get_kind_display().lower(),
+            'id': entry.object_id,
+            'name': names.get(entry.object_id, entry.name),
+            'matched': entry.name,
+            'score': round(score, 3),
+        }
+        for entry, score in matches
+    ]
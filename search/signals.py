@@ -0,0 +1,98 @@
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from casters.models import Caster
+from players.models import Alias, Player
+from teams.models import Dynasty, Team
+from .models import SearchEntry
+from .services import index_objects
+
+_state = threading.local()
+
+
+@contextmanager
+def defer_search_indexing():
+    """
+    Collect names that need reindexing and index them once when the block
+    exits.
+
+    Useful around imports, where every saved Player, Alias or Team would
+    otherwise reindex on its own. Nested blocks are folded into the
+    outermost one.
+    """
+    if getattr(_state, 'pending', None) is not None:
+        yield
+        return
+
+    _state.pending = defaultdict(set)
+
+    try:
+        yield
+    except BaseException:
+        _state.pending = None
+        raise
+
+    pending, _state.pending = _state.pending, None
+
+    for kind, ids in pending.items():
+        index_objects(kind, ids)
+
+
+def queue_search_indexing(kind, ids):
+    """
+    Reindex objects of one kind now, or when the surrounding
+    defer_search_indexing block exits.
+
+    Arguments:
+    kind -- One of the SearchEntry kinds, e.g. SearchEntry.TEAM. (str)
+    ids -- Primary keys of the objects to index. (iterable)
+    """
+    pending = getattr(_state, 'pending', None)
+
+    if pending is not None:
+        pending[kind].update(ids)
+    else:
+        index_objects(kind, ids)
+
+
+@receiver([post_save, post_delete], sender=Player)
+def index_player(sender, instance, **kwargs):
+    queue_search_indexing(SearchEntry.PLAYER, [instance.id])
+
+    # Casters without an alias go by their player's name
+    queue_search_indexing(
+        SearchEntry.CASTER,
+        Caster.objects.filter(player_id=instance.id).values_list('id', flat=True)
+    )
+
+
+@receiver([post_save, post_delete], sender=Alias)
+def index_alias(sender, instance, **kwargs):
+    queue_search_indexing(SearchEntry.PLAYER, [instance.player_id])
+
+    # A deleted alias has already been cleared from its casters, which
+    # belong to the same player
+    queue_search_indexing(
+        SearchEntry.CASTER,
+        Caster.objects.filter(
+            Q(alias_id=instance.id) | Q(player_id=instance.player_id)
+        ).values_list('id', flat=True)
+    )
+
+
+@receiver([post_save, post_delete], sender=Caster)
+def index_caster(sender, instance, **kwargs):
+    queue_search_indexing(SearchEntry.CASTER, [instance.id])
+
+
+@receiver([post_save, post_delete], sender=Team)
+def index_team(sender, instance, **kwargs):
+    queue_search_indexing(SearchEntry.TEAM, [instance.id])
+
+
+@receiver([post_save, post_delete], sender=Dynasty)
+def index_dynasty(sender, instance, **kwargs):
+    queue_search_indexing(SearchEntry.DYNASTY, [instance.id])
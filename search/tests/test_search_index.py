@@ -0,0 +1,170 @@
+from pytest import mark
+from casters.tests.factories import CasterFactory
+from players.models import Alias
+from players.tests.factories import PlayerFactory
+from search.models import SearchEntry, SearchTrigram
+from search.services import (
+    get_containing_entries, get_trigrams, normalize_name,
+    rebuild_search_index, search_names)
+from search.signals import defer_search_indexing
+from teams.models import Team
+from teams.tests.factories import DynastyFactory, TeamFactory
+
+
+def _entries(kind):
+    return set(SearchEntry.objects.filter(kind=kind).values_list(
+        'name', 'is_alias'))
+
+
+def test_normalize_name():
+    assert normalize_name('  Dynastié,  Inc. ') == 'dynastie inc'
+    assert normalize_name('B_E_E') == 'b e e'
+    assert normalize_name('!!!') == ''
+
+    assert get_trigrams('bee') == {'  b', ' be', 'bee', 'ee '}
+    assert get_trigrams('bee', pad=False) == {'bee'}
+    assert get_trigrams('') == set()
+
+
+@mark.django_db
+def test_signals_keep_index_current():
+    """
+    Creating, renaming and deleting players, aliases, teams, dynasties and
+    casters updates their entries.
+    """
+    player = PlayerFactory(name='Killer Bee')
+    alias = Alias.objects.create(player=player, name='KB')
+    caster = CasterFactory(player=player)
+
+    assert _entries(SearchEntry.PLAYER) == {('Killer Bee', False), ('KB', True)}
+    assert _entries(SearchEntry.CASTER) == {('Killer Bee', False)}
+
+    caster.alias = alias
+    caster.save()
+    assert _entries(SearchEntry.CASTER) == {('KB', False)}
+
+    alias.name = 'Bee Caster'
+    alias.save()
+    assert _entries(SearchEntry.PLAYER) == {
+        ('Killer Bee', False), ('Bee Caster', True)}
+    assert _entries(SearchEntry.CASTER) == {('Bee Caster', False)}
+
+    alias.delete()
+    assert _entries(SearchEntry.PLAYER) == {('Killer Bee', False)}
+    assert _entries(SearchEntry.CASTER) == {('Killer Bee', False)}
+
+    team = TeamFactory(name='Hive Mind', dynasty=DynastyFactory(name='Hive'))
+    assert _entries(SearchEntry.TEAM) == {('Hive Mind', False)}
+    assert _entries(SearchEntry.DYNASTY) == {('Hive', False)}
+
+    team.name = 'Swarm'
+    team.save()
+    assert _entries(SearchEntry.TEAM) == {('Swarm', False)}
+
+    entry = SearchEntry.objects.get(kind=SearchEntry.TEAM)
+    assert entry.trigrams.count() == entry.trigram_count == len(
+        get_trigrams('swarm'))
+
+    player.delete()
+    team.delete()
+    assert not SearchEntry.objects.filter(
+        kind=SearchEntry.PLAYER, object_id=player.id).exists()
+    assert not _entries(SearchEntry.CASTER)
+    assert not _entries(SearchEntry.TEAM)
+
+
+@mark.django_db
+def test_unchanged_names_are_not_rewritten():
+    player = PlayerFactory(name='Killer Bee')
+    entry_id = SearchEntry.objects.get(kind=SearchEntry.PLAYER).id
+
+    player.bio = 'Buzz buzz'
+    player.save()
+
+    assert SearchEntry.objects.get(kind=SearchEntry.PLAYER).id == entry_id
+
+
+@mark.django_db
+def test_defer_search_indexing():
+    """
+    Names saved inside the block are indexed once it exits.
+    """
+    with defer_search_indexing():
+        players = [PlayerFactory(name=f'Player {n}') for n in range(3)]
+        assert not SearchEntry.objects.exists()
+
+    assert _entries(SearchEntry.PLAYER) == {
+        (player.name, False) for player in players}
+
+
+@mark.django_db
+def test_rebuild_search_index():
+    """
+    Names changed without signals are picked up and stale entries removed.
+    """
+    kept, renamed = [TeamFactory(name=name) for name in ('Kept', 'Renamed')]
+    stale = SearchEntry.objects.create(
+        kind=SearchEntry.TEAM, object_id=renamed.id + 1, name='Deleted',
+        normalized='deleted'
+    )
+    SearchTrigram.objects.create(entry=stale, trigram='del')
+
+    Team.objects.filter(id=renamed.id).update(name='New Name')
+
+    counts = rebuild_search_index()
+
+    assert counts['team'] == 1
+    assert _entries(SearchEntry.TEAM) == {('Kept', False), ('New Name', False)}
+    assert not SearchTrigram.objects.filter(trigram='del').exists()
+
+
+@mark.django_db
+def test_get_containing_entries():
+    """
+    Names are matched like icontains, ignoring accents and punctuation.
+    """
+    for name in ('Killer Bees', 'Beès Knees', 'Wasps', 'B.E.E.S.'):
+        TeamFactory(name=name)
+
+    def names(value):
+        return {
+            entry.name for entry in
+            get_containing_entries(SearchEntry.TEAM, value)
+        }
+
+    assert names('bees') == {'Killer Bees', 'Beès Knees'}
+    assert names('BEES KN') == {'Beès Knees'}
+    assert names('b e e') == {'B.E.E.S.'}
+    assert names('s') == {'Killer Bees', 'Beès Knees', 'Wasps', 'B.E.E.S.'}
+    assert names('hornets') == set()
+
+
+@mark.django_db
+def test_search_names_ranking():
+    """
+    Exact names come first, then prefixes, then names containing the query,
+    then names that are only similar.
+    """
+    # Captains get names of their own so random factory names can't clash
+    names = ['Queen Bees', 'Queen', 'The Queens', 'Drones']
+    for number, name in enumerate(names):
+        TeamFactory(name=name, captain__name=f'Captain {number}')
+    player = PlayerFactory(name='Regina')
+    Alias.objects.create(player=player, name='Quen')
+
+    results = search_names('queen')
+
+    assert [(result['kind'], result['name']) for result in results] == [
+        ('team', 'Queen'),
+        ('team', 'Queen Bees'),
+        ('team', 'The Queens'),
+        ('player', 'Regina'),
+    ]
+    assert results[0]['score'] == 1
+    assert results[-1]['matched'] == 'Quen'
+
+    results = search_names('queen', kinds=[SearchEntry.PLAYER])
+    assert [result['id'] for result in results] == [player.id]
+
+    assert len(search_names('queen', limit=2)) == 2
+    assert search_names('!!!') == []
@@ -16,3 +16,10 @@ class Command(BaseCommand):
             self.style.SUCCESS(f'Total Live Streams {results["total"]}'))
         self.stdout.write(
             self.style.SUCCESS(f'Streams Marked Offline {results["marked_offline"]}'))
+
+        if not results['complete']:
+            self.stdout.write(self.style.WARNING(
+                f'Only fetched {results["pages"]} pages in {results["seconds"]:.1f}s, left other streams as they were'))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Fetched {results["pages"]} pages in {results["seconds"]:.1f}s'))
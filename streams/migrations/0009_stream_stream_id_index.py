@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('streams', '0008_auto_20201229_1959'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='stream',
+            name='stream_id',
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+    ]
@@ -11,7 +11,7 @@ class Stream(models.Model):
         Player, null=True, blank=True, related_name='streams',
         on_delete=models.SET_NULL
     )
-    stream_id = models.CharField(max_length=255)
+    stream_id = models.CharField(max_length=255, db_index=True)
     max_viewer_count = models.SmallIntegerField(blank=True, default=0)
     thumbnail_url = models.CharField(max_length=255, blank=True, null=True)
 
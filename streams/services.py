@@ -1,109 +1,278 @@
 import re
-import requests
+import time
 from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from buzz.services import bulk_create_with_ids, get_http_session
 from players.models import Player
 from .models import Stream
 
+# Refresh access tokens this many seconds before Twitch says they expire
+TOKEN_REFRESH_MARGIN = 300
+
 class Twitch:
     
-    def __init__(self):
+    def __init__(self, session=None):
 
         # Twitch Settings
         self.CLIENT_ID = settings.TWITCH_CLIENT_ID
         self.CLIENT_SECRET = settings.TWITCH_CLIENT_SECRET
         self.GAME_ID = settings.TWITCH_GAME_ID
         self.API_BASE = 'https://api.twitch.tv/helix'
+        self.TOKEN_URL = 'https://id.twitch.tv/oauth2/token'
+
+        self.session = session or get_http_session()
+
+    @property
+    def token_cache_key(self):
+        return f'streams:twitch:access_token:{self.CLIENT_ID}'
 
-    def get_access_token(self):
+    def get_access_token(self, refresh=False, timeout=120):
         """
-        Use 
+        Return an app access token, minting a new one only when needed.
+
+        Tokens are kept in the Django cache until shortly before Twitch
+        expires them, so every process and cron run shares one token.
+
+        Arguments:
+        refresh -- Ignore any cached token and mint a new one. (bool)
+                   (optional)
+        timeout -- Seconds to wait for Twitch. (int) (optional)
         """
-        url ='https://id.twitch.tv/oauth2/token'
+        if not refresh:
+            access_token = cache.get(self.token_cache_key)
+            if access_token:
+                return access_token
+
         data = {
                 'client_id': self.CLIENT_ID,
                 'client_secret': self.CLIENT_SECRET,
                 'grant_type': 'client_credentials',
                 'scope': ''
         }
-        req = requests.post(url, data, timeout=120)
-        access_token = req.json()['access_token']
-                
+        resp = self.session.post(self.TOKEN_URL, data, timeout=timeout)
+        resp.raise_for_status()
+
+        token = resp.json()
+        access_token = token['access_token']
+        lifetime = token.get('expires_in', 0) - TOKEN_REFRESH_MARGIN
+
+        if lifetime > 0:
+            cache.set(self.token_cache_key, access_token, lifetime)
+        else:
+            cache.delete(self.token_cache_key)
+
         return access_token
 
+    def get(self, path, params=None, timeout=120):
+        """
+        Make an authenticated GET request to the Helix API.
+
+        A 401 means the cached token was revoked or expired early, so a new
+        one is minted and the request is tried once more.
+
+        Arguments:
+        path -- API path after the base URL, e.g. 'streams'. (str)
+        params -- Query string parameters. (dict) (optional)
+        timeout -- Seconds to wait for Twitch. (int) (optional)
+        """
+        for refresh in (False, True):
+            headers = {
+                'Authorization': f'Bearer {self.get_access_token(refresh, timeout)}',
+                'Client-ID': self.CLIENT_ID
+            }
+            resp = self.session.get(
+                f'{self.API_BASE}/{path}', params=params, headers=headers,
+                timeout=timeout
+            )
+
+            if resp.status_code != 401:
+                break
+
+        return resp
+
+    def iter_live_stream_pages(
+        self, stats=None, max_pages=None, max_seconds=None, timeout=120):
+        """
+        Yield pages of live KQB streams, following the pagination cursor.
+
+        Each page is yielded as soon as it arrives. Stops when Twitch runs
+        out of pages, a request fails, or a cap is hit. Pass a dict as
+        `stats` to have it filled with the number of pages and streams seen
+        and whether every page was fetched.
+
+        Arguments:
+        stats -- Dict to record the poll in. (dict) (optional)
+        max_pages -- Most pages to fetch, defaults to TWITCH_MAX_PAGES. (int)
+                     (optional)
+        max_seconds -- Stop asking for more pages after this long, defaults
+                       to TWITCH_MAX_POLL_SECONDS. (int) (optional)
+        timeout -- Seconds to wait for each request. (int) (optional)
+        """
+        if stats is None:
+            stats = {}
+
+        if max_pages is None:
+            max_pages = getattr(settings, 'TWITCH_MAX_PAGES', 20)
+
+        if max_seconds is None:
+            max_seconds = getattr(settings, 'TWITCH_MAX_POLL_SECONDS', 60)
+
+        stats.update(pages=0, streams=0, complete=False, seconds=0)
+        start = time.monotonic()
+        params = {'game_id': self.GAME_ID, 'first': 100}
+
+        try:
+            while stats['pages'] < max_pages:
+                if time.monotonic() - start > max_seconds:
+                    break
+
+                resp = self.get('streams', params=params, timeout=timeout)
+                if resp.status_code != 200:
+                    break
+
+                body = resp.json()
+                page = body['data']
+                stats['pages'] += 1
+                stats['streams'] += len(page)
+
+                if page:
+                    yield page
+
+                cursor = body.get('pagination', {}).get('cursor')
+                if not page or not cursor:
+                    stats['complete'] = True
+                    break
+
+                params['after'] = cursor
+
+        finally:
+            stats['seconds'] = time.monotonic() - start
+
     def get_live_streams(self, timeout=120):
-        """Get a list of all live twitch streams for KQB."""
+        """
+        Get a list of all live twitch streams for KQB.
 
-        params = {'game_id': self.GAME_ID}        
-        access_token = self.get_access_token()
+        Returns None if Twitch couldn't be reached or not every page could be
+        fetched.
+        """
+        stats = {}
+        streams = [
+            entry
+            for page in self.iter_live_stream_pages(stats, timeout=timeout)
+            for entry in page
+        ]
 
-        headers = {
-            'Authorization': f'Bearer {access_token}',
-            'Client-ID': self.CLIENT_ID
-        }
-        resp = requests.get(
-            f'{self.API_BASE}/streams', params=params, headers=headers, timeout=timeout)
-        
-        if resp.status_code == 200:
-            streams = resp.json()['data']
-            return streams                
-        
-        # Access token has expired, at least set it up for next time to work
-        elif resp.status_code == 401:
+        if not stats['complete']:
             return None
-        
-        return None
 
-def update_twitch_streams(timeout=120):
+        return streams
+
+def get_twitch_player_index():
+    """Return a dict of lowercase Twitch username to Player id."""
+    players = Player.objects.filter(
+        twitch_username__isnull=False).exclude(twitch_username='').order_by(
+            '-id').values_list('twitch_username', 'id')
+
+    # Lowest id wins when two players claim the same username
+    return {username.strip().lower(): player_id for username, player_id in players}
+
+
+def sync_twitch_stream_page(page, player_index):
     """
-    Update database with live Twitch streams for game.
+    Create or update the Streams in one page of Twitch results.
+
+    Existing streams are read in one query and written back with one
+    bulk_create and one bulk_update. Returns the ids of the page's streams
+    and the number created.
+
+    Arguments:
+    page -- Stream entries from the Helix streams endpoint. (list)
+    player_index -- Lowercase Twitch username to Player id, from
+                    `get_twitch_player_index`. (dict)
     """
-    tw = Twitch()
-    results = tw.get_live_streams(timeout=timeout)
-    created = 0
-    streams = []
-    live_stream_ids = []
+    entries = {entry['id']: entry for entry in page}
 
-    for entry in results:
-        stream, created = Stream.objects.get_or_create(
-            stream_id=entry['id'], start_time = entry['started_at'])
-        stream.twitch_id = entry['id']
-        stream.user_id = entry['user_id']
+    # The newest row wins if a stream id was ever saved twice
+    existing = {}
+    for stream in Stream.objects.filter(
+        stream_id__in=entries.keys()).order_by('id'):
+        existing[stream.stream_id] = stream
+
+    streams = []
+    new_streams = []
 
+    for stream_id, entry in entries.items():
         twitch_username = entry['user_name']
         if type(twitch_username) is not str:
             twitch_username = entry['user_name'][0]
 
+        stream = existing.get(stream_id)
+        if stream is None:
+            stream = Stream(stream_id=stream_id)
+            new_streams.append(stream)
+
+        stream.user_id = entry['user_id']
         stream.username = twitch_username
-        stream.player = Player.objects.filter(
-            twitch_username__icontains=twitch_username).first()
+        stream.player_id = player_index.get(twitch_username.strip().lower())
         stream.name = entry['title']
         stream.start_time = entry['started_at']
         stream.thumbnail_url = entry['thumbnail_url']
-        current_view_count = entry['viewer_count']
-
-        if entry['type'] == 'live':
-            stream.is_live = True
+        stream.is_live = entry['type'] == 'live'
+        stream.end_time = None
+        stream.max_viewer_count = max(
+            stream.max_viewer_count or 0, entry['viewer_count'])
 
-        if current_view_count > stream.max_viewer_count:
-            stream.max_viewer_count = current_view_count
-        
-        stream.save()
         streams.append(stream)
-        live_stream_ids.append(stream.id)
-        
 
-        if created:
-            created +=1
-    
-    # Set all streams no in results to is_live = False
-    marked_offline = Stream.objects.filter(is_live=True).exclude(id__in=live_stream_ids).update(is_live=False)
+    Stream.objects.bulk_update(
+        [stream for stream in streams if stream.pk], [
+            'user_id', 'username', 'player', 'name', 'start_time',
+            'thumbnail_url', 'is_live', 'end_time', 'max_viewer_count'
+        ]
+    )
+    bulk_create_with_ids(Stream, new_streams, ['stream_id'])
 
-    return {
-        'total': len(streams),
-        'updated': len(streams) - created,
-        'created': created,
-        'marked_offline': marked_offline
-    }
+    return [stream.id for stream in streams], len(new_streams)
 
 
+def update_twitch_streams(timeout=120):
+    """
+    Update database with live Twitch streams for game.
 
+    Streams are saved page by page as Twitch returns them. Streams missing
+    from the results are only marked offline if every page was fetched,
+    since a cut short poll can't tell offline streams from unfetched ones.
+    """
+    tw = Twitch()
+    poll = {}
+    now = timezone.now()
+    created = 0
+    live_stream_ids = set()
+    player_index = get_twitch_player_index()
+
+    for page in tw.iter_live_stream_pages(poll, timeout=timeout):
+        with transaction.atomic():
+            stream_ids, page_created = sync_twitch_stream_page(
+                page, player_index)
+
+        live_stream_ids.update(stream_ids)
+        created += page_created
+
+    # Set all streams not in results to is_live = False
+    marked_offline = 0
+    if poll['complete']:
+        went_offline = Stream.objects.filter(is_live=True).exclude(
+            id__in=live_stream_ids)
+        marked_offline = went_offline.update(is_live=False, end_time=now)
+
+    return {
+        'total': len(live_stream_ids),
+        'updated': len(live_stream_ids) - created,
+        'created': created,
+        'marked_offline': marked_offline,
+        'pages': poll['pages'],
+        'complete': poll['complete'],
+        'seconds': poll['seconds']
+    }
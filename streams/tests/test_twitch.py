@@ -0,0 +1,211 @@
+from unittest import mock
+from pytest import fixture, mark
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from players.tests.factories import PlayerFactory
+from streams.models import Stream
+from streams.services import Twitch, update_twitch_streams
+
+
+class FakeResponse:
+
+    def __init__(self, status_code, data):
+        self.status_code = status_code
+        self.data = data
+
+    def json(self):
+        return self.data
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(self.status_code)
+
+
+class FakeSession:
+    """Stands in for requests.Session, answering from queued responses."""
+
+    def __init__(self, streams):
+        self.streams = list(streams)
+        self.tokens_minted = 0
+        self.headers_sent = []
+        self.params_sent = []
+
+    def post(self, url, data, timeout=None):
+        self.tokens_minted += 1
+        return FakeResponse(200, {
+            'access_token': f'token-{self.tokens_minted}', 'expires_in': 3600})
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        self.headers_sent.append(headers['Authorization'])
+        self.params_sent.append(dict(params or {}))
+        return self.streams.pop(0)
+
+
+@fixture
+def twitch_settings(settings):
+    settings.TWITCH_CLIENT_ID = 'client'
+    settings.TWITCH_CLIENT_SECRET = 'secret'
+    cache.clear()
+
+
+def test_access_token_is_cached(twitch_settings):
+    """
+    Tokens are minted once and shared between runs until they expire.
+    """
+    session = FakeSession([
+        FakeResponse(200, {'data': [{'id': '1'}]}),
+        FakeResponse(200, {'data': []}),
+    ])
+
+    assert Twitch(session).get_live_streams() == [{'id': '1'}]
+    assert Twitch(session).get_live_streams() == []
+
+    assert session.tokens_minted == 1
+    assert session.headers_sent == ['Bearer token-1', 'Bearer token-1']
+
+
+def test_access_token_refreshed_on_401(twitch_settings):
+    """
+    A rejected token is replaced and the request tried once more.
+    """
+    session = FakeSession([
+        FakeResponse(401, {}),
+        FakeResponse(200, {'data': [{'id': '1'}]}),
+        FakeResponse(200, {'data': []}),
+    ])
+
+    assert Twitch(session).get_live_streams() == [{'id': '1'}]
+    assert session.headers_sent == ['Bearer token-1', 'Bearer token-2']
+
+    # The new token is the one cached
+    Twitch(session).get_live_streams()
+    assert session.headers_sent[-1] == 'Bearer token-2'
+
+
+def test_repeated_401_gives_up(twitch_settings):
+    session = FakeSession([FakeResponse(401, {}), FakeResponse(401, {})])
+
+    assert Twitch(session).get_live_streams() is None
+    assert session.tokens_minted == 2
+
+
+def _entry(number):
+    return {
+        'id': str(number), 'user_id': str(number), 'user_name': f'bee{number}',
+        'title': f'Stream {number}', 'started_at': '2021-03-01T20:00:00Z',
+        'thumbnail_url': '', 'viewer_count': number, 'type': 'live'
+    }
+
+
+def _page(numbers, cursor=None):
+    return FakeResponse(200, {
+        'data': [_entry(number) for number in numbers],
+        'pagination': {'cursor': cursor} if cursor else {}
+    })
+
+
+def test_live_stream_pages_follow_cursor(twitch_settings):
+    """
+    Pages are fetched 100 at a time until Twitch stops returning a cursor.
+    """
+    session = FakeSession([
+        _page([1, 2], 'abc'), _page([3], 'def'), _page([]),
+    ])
+    stats = {}
+
+    pages = list(Twitch(session).iter_live_stream_pages(stats))
+
+    assert [[entry['id'] for entry in page] for page in pages] == [
+        ['1', '2'], ['3']]
+    assert stats['pages'] == 3
+    assert stats['streams'] == 3
+    assert stats['complete']
+    assert [params.get('after') for params in session.params_sent] == [
+        None, 'abc', 'def']
+    assert all(params['first'] == 100 for params in session.params_sent)
+
+
+def test_live_stream_pages_capped(twitch_settings, settings):
+    """
+    Hitting the page cap leaves the poll marked incomplete.
+    """
+    session = FakeSession([_page([1], 'abc'), _page([2], 'def')])
+    stats = {}
+
+    pages = list(Twitch(session).iter_live_stream_pages(stats, max_pages=1))
+
+    assert len(pages) == 1
+    assert stats == {
+        'pages': 1, 'streams': 1, 'complete': False,
+        'seconds': stats['seconds']}
+
+    settings.TWITCH_MAX_PAGES = 1
+    assert Twitch(session).get_live_streams() is None
+
+
+@mark.django_db
+def test_update_twitch_streams_partial_poll(twitch_settings):
+    """
+    Streams missing from a poll that was cut short aren't marked offline.
+    """
+    offline = Stream.objects.create(
+        name='Earlier', username='earlier', stream_id='99', is_live=True,
+        start_time='2021-03-01T18:00:00Z')
+
+    session = FakeSession([_page([1], 'abc'), FakeResponse(500, {})])
+    with mock.patch('streams.services.get_http_session', return_value=session):
+        results = update_twitch_streams()
+
+    assert results['total'] == 1
+    assert not results['complete']
+    assert results['marked_offline'] == 0
+    assert Stream.objects.get(pk=offline.pk).is_live
+
+    session = FakeSession([_page([1, 2])])
+    with mock.patch('streams.services.get_http_session', return_value=session):
+        results = update_twitch_streams()
+
+    assert results['complete']
+    assert results['marked_offline'] == 1
+    assert not Stream.objects.get(pk=offline.pk).is_live
+
+
+@mark.django_db
+def test_update_twitch_streams_in_bulk(twitch_settings):
+    """
+    Streams are created and updated in bulk, matched to players by exact
+    Twitch username, and stamped with an end time when they go offline.
+    """
+    player = PlayerFactory(twitch_username='Bee1')
+    PlayerFactory(twitch_username='bee12')
+    existing = Stream.objects.create(
+        name='Old title', username='bee2', stream_id='2', is_live=True,
+        max_viewer_count=50, start_time='2021-03-01T20:00:00Z')
+
+    session = FakeSession([_page([1, 2, 3])])
+    with mock.patch('streams.services.get_http_session', return_value=session):
+        results = update_twitch_streams()
+
+    assert results['created'] == 2
+    assert results['updated'] == 1
+    assert results['total'] == 3
+
+    assert Stream.objects.get(stream_id='1').player == player
+    assert Stream.objects.get(stream_id='3').player is None
+
+    existing.refresh_from_db()
+    assert existing.name == 'Stream 2'
+    assert existing.max_viewer_count == 50
+
+    session = FakeSession([_page(range(10, 40))])
+    connection.queries_log.clear()
+    with CaptureQueriesContext(connection) as context:
+        with mock.patch(
+            'streams.services.get_http_session', return_value=session):
+            results = update_twitch_streams()
+
+    assert results['created'] == 30
+    assert results['marked_offline'] == 3
+    assert len(context.captured_queries) < 15
+    assert Stream.objects.get(stream_id='1').end_time is not None
@@ -1,6 +1,6 @@
 from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
-from buzz.services import get_sheet_csv
+from buzz.services import iter_sheet_csv
 from teams.services import parse_teams_csv, parse_teams_json, bulk_import_teams
 from leagues.models import League, Season, Circuit
 
@@ -24,7 +24,7 @@ class Command(BaseCommand):
         
         # Default to loading from a CSV link defined on the Season object
         else:
-            csv_data = get_sheet_csv(season.teams_csv_url)
+            csv_data = iter_sheet_csv(season.teams_csv_url)
             teams = parse_teams_csv(csv_data)
         
         result_count = bulk_import_teams(
@@ -34,7 +34,7 @@ class Command(BaseCommand):
 
         
         self.stdout.write(self.style.SUCCESS(
-            f'Created {result_count["teams"]["created"]} Teams and {result_count["players"]["created"]} Players.')
+            f'Created {result_count["teams"]["created"]} Teams and {result_count["players"]["created"]} Players, updated {result_count["teams"]["updated"]} Teams.')
         )
 
         self.stdout.write(self.style.SUCCESS(
@@ -0,0 +1,39 @@
+from django.db import models
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+class TeamQuerySet(models.QuerySet):
+
+    def with_standings(self):
+        """
+        Annotate match `wins` and `losses` from the TeamStanding table.
+
+        Standings are maintained as Results are written, so this is a single
+        LEFT JOIN instead of aggregating across every Result for each team.
+        Teams without a standing row yet are reported as 0 and 0.
+        """
+        return self.annotate(
+            wins=Coalesce('standing__match_wins', 0),
+            losses=Coalesce('standing__match_losses', 0)
+        )
+
+    def with_roster_flags(self):
+        """
+        Annotate what `Team.is_active` and `Team.can_add_members` need.
+
+        Adds `member_count` plus the season's `is_active`, `rosters_open` and
+        `max_team_members`, so the properties don't query per team. The
+        member count is a subquery rather than a JOIN so it can't be
+        multiplied by other annotations.
+        """
+        members = self.model.members.through.objects.filter(
+            team=OuterRef('pk')
+        ).order_by().values('team').annotate(total=Count('*')).values('total')
+
+        return self.annotate(
+            member_count=Coalesce(Subquery(members), 0),
+            season_is_active=F('circuit__season__is_active'),
+            season_rosters_open=F('circuit__season__rosters_open'),
+            season_max_team_members=F('circuit__season__max_team_members'),
+        )
@@ -0,0 +1,73 @@
+from collections import Counter
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+# Result.status values at the time of this migration
+SINGLE_FORFEIT = 'SF'
+DOUBLE_FORFEIT = 'DF'
+
+
+def tally(queryset, field):
+    """Return a Counter of team id to rows in queryset grouped by field."""
+    rows = queryset.exclude(**{f'{field}__isnull': True}).order_by()
+    return Counter(dict(rows.values_list(field).annotate(total=Count('pk'))))
+
+
+def backfill_standings(apps, schema_editor):
+    """Build a TeamStanding row for every existing Team."""
+    Team = apps.get_model('teams', 'Team')
+    TeamStanding = apps.get_model('teams', 'TeamStanding')
+    Result = apps.get_model('matches', 'Result')
+    Set = apps.get_model('matches', 'Set')
+    Game = apps.get_model('matches', 'Game')
+
+    double_forfeits = Result.objects.filter(status=DOUBLE_FORFEIT)
+    forfeits = tally(Result.objects.filter(status=SINGLE_FORFEIT), 'loser')
+    forfeits.update(tally(double_forfeits, 'match__home'))
+    forfeits.update(tally(double_forfeits, 'match__away'))
+
+    tallies = {
+        'match_wins': tally(Result.objects.all(), 'winner'),
+        'match_losses': tally(Result.objects.all(), 'loser'),
+        'set_wins': tally(Set.objects.all(), 'winner'),
+        'set_losses': tally(Set.objects.all(), 'loser'),
+        'game_wins': tally(Game.objects.all(), 'winner'),
+        'game_losses': tally(Game.objects.all(), 'loser'),
+        'forfeits': forfeits,
+    }
+
+    team_ids = Team.objects.order_by('id').values_list('id', flat=True)
+
+    TeamStanding.objects.bulk_create([
+        TeamStanding(team_id=team_id, **{
+            field: counts[team_id] for field, counts in tallies.items()})
+        for team_id in team_ids.iterator()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teams', '0011_auto_20210505_2113'),
+        ('matches', '0031_match_group'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TeamStanding',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('match_wins', models.PositiveIntegerField(default=0)),
+                ('match_losses', models.PositiveIntegerField(default=0)),
+                ('set_wins', models.PositiveIntegerField(default=0)),
+                ('set_losses', models.PositiveIntegerField(default=0)),
+                ('game_wins', models.PositiveIntegerField(default=0)),
+                ('game_losses', models.PositiveIntegerField(default=0)),
+                ('forfeits', models.PositiveIntegerField(default=0)),
+                ('modified', models.DateTimeField(auto_now=True)),
+                ('team', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='standing', to='teams.team')),
+            ],
+        ),
+        migrations.RunPython(backfill_standings, migrations.RunPython.noop),
+    ]
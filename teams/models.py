@@ -6,6 +6,7 @@ from django.db import models
 from django.db.models import Count, Q
 from leagues.models import Circuit, Group
 from players.models import Player
+from teams.managers import TeamQuerySet
 
 
 class Dynasty(models.Model):
@@ -62,19 +63,36 @@ class Team(models.Model):
         on_delete=models.SET_NULL)
     modified = models.DateTimeField(auto_now=True)
     created = models.DateTimeField(auto_now_add=True)
+
+    objects = TeamQuerySet.as_manager()
     
     @property
     def is_active(self):
         """
         Return True if season associated with this Team is marked active.
+
+        Uses the `with_roster_flags` annotation when the Team was loaded
+        with it.
         """
+        if hasattr(self, 'season_is_active'):
+            return self.season_is_active
+
         return self.circuit.season.is_active
 
     @property
     def can_add_members(self):
         """
         Return True if rosters for season open and not at max players on team.
+
+        Uses the `with_roster_flags` annotations when the Team was loaded
+        with them.
         """
+        if hasattr(self, 'member_count'):
+            return bool(
+                self.season_rosters_open and
+                self.member_count < self.season_max_team_members
+            )
+
         if (
             self.circuit.season.rosters_open and
             self.members.count() < self.circuit.season.max_team_members
@@ -91,11 +109,20 @@ class Team(models.Model):
 
     @property
     def loss_count(self):
-        return self.lost_match_results.filter().count()
+        try:
+            return self.standing.match_losses
+
+        # Standings not built for this team yet, count the slow way
+        except TeamStanding.DoesNotExist:
+            return self.lost_match_results.filter().count()
 
     @property
     def win_count(self):
-        return self.won_match_results.all().count()
+        try:
+            return self.standing.match_wins
+
+        except TeamStanding.DoesNotExist:
+            return self.won_match_results.all().count()
 
     def generate_invite_code(self):
         """
@@ -116,4 +143,27 @@ class Team(models.Model):
             return self.name
 
 
-    
\ No newline at end of file
+class TeamStanding(models.Model):
+    """
+    Denormalized win/loss record for a Team.
+
+    Kept up to date whenever a Result, Set or Game is written, once the
+    transaction commits (see matches.signals), so listings can read a team's record without
+    aggregating across every Result. Rebuild from scratch with the
+    `rebuild_standings` management command.
+    """
+    team = models.OneToOneField(
+        Team, related_name='standing', on_delete=models.CASCADE)
+
+    match_wins = models.PositiveIntegerField(default=0)
+    match_losses = models.PositiveIntegerField(default=0)
+    set_wins = models.PositiveIntegerField(default=0)
+    set_losses = models.PositiveIntegerField(default=0)
+    game_wins = models.PositiveIntegerField(default=0)
+    game_losses = models.PositiveIntegerField(default=0)
+    forfeits = models.PositiveIntegerField(default=0)
+
+    modified = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.team.name}: {self.match_wins}-{self.match_losses}'
@@ -1,21 +1,26 @@
-import csv
 import json
-from django.db import IntegrityError
-from buzz.services import get_sheet_csv
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+from buzz.services import (
+    bulk_create_with_ids, get_sheet_csv, read_csv_rows)
 from leagues.models import Circuit
 from players.models import Player
+from search.models import SearchEntry
+from search.services import index_objects
+from search.signals import defer_search_indexing
 from .models import Team
 
 def parse_teams_csv(csv_data):
     """
-    Parse through CSV data of teams, convert to a list of team data dicts.
+    Parse through CSV data of teams, yielding a team data dict per row.
 
     Arguments:
-    csv_data -- Raw CSV data containing team information. (str)
+    csv_data -- Raw CSV data containing team information, or an iterable
+                of its lines. (str|iterable)
     """
-    rows = csv.reader(csv_data.splitlines(), delimiter=',')
-    
-    teams = []
+    rows = read_csv_rows(csv_data)
+
     headers = {
         'Tier': None,
         'Circuit': None,
@@ -47,14 +52,11 @@ def parse_teams_csv(csv_data):
                 else:
                     team[key.lower().replace(' ', '_')] = row[val]
 
-            teams.append(team)
-
-        # Calculate Extra Stats
-        for team in teams:
+            # Calculate Extra Stats
             team['matches_lost'] = str(
                 int(team['matches_played']) - int(team['match_wins']))
-    
-    return teams
+
+            yield team
 
 
 def parse_teams_json(json_file_path, region):
@@ -86,81 +88,177 @@ def parse_teams_json(json_file_path, region):
 
 
 def bulk_import_teams(
-    teams, season, delete_before_import=False, delete_region=None):
+    teams, season, delete_before_import=False, delete_region=None,
+    batch_size=500):
     """
-    Given a list of team data, bulk import into database.
+    Given a list of team data, import it into the database.
+
+    Teams are identified by circuit and name, and players by name, both
+    ignoring case, so running the same import twice changes nothing:
 
-    Needs optimization in the future, but steps for now:
+    1. Load the season's circuits and teams, the players named anywhere in
+       the import and the season's current team memberships, once each
+    2. Create missing players and teams with bulk inserts
+    3. Point each team at its captain, when one was given and exists
+    4. Add any missing members in one insert into the membership table
 
-    1. Delete all existing teams.
-    2. Loop through a dicictionary of teams.
-    3. Create team based on data provided in teams list entries:        
-        - Season and League provided by model instances passed into this 
-          function.
-        - Circuit FK assigned based on  values in 'circuit' and 'tier' keys
-        - Player objects generated for all team members
-            - Attempt to re-use a Player object if it already exists
+    Members missing from the import are left on their teams. Rows whose
+    circuit isn't part of the season are skipped.
 
     Arguments:
-    team_list -- List of team data derived from team CSV sheet. (list)
+    teams -- Team dicts derived from the team CSV sheet, e.g. as yielded by
+             parse_teams_csv. (iterable)
     season -- A Season model instance to associate these teams with.
     delete_before_import -- Delete all existing !Teams then initiate
                             import process. A way to start clean with
                             new data. (bool) (optional)
     delete_region -- Only delete a specifc region when `delete_before_import`
                      param passed, not all regions in circuit
+    batch_size -- Rows per INSERT or UPDATE statement. (int) (optional)
     """
-    team_count = {'created': 0, 'updated': 0, 'deleted': 0}
+    from api.cache import invalidate_api_cache
+
+    team_count = {
+        'created': 0, 'updated': 0, 'unchanged': 0, 'deleted': 0, 'skipped': 0}
     player_count = {'created': 0, 'updated': 0, 'deleted': 0}
 
-    # Clear out all old data
-    if delete_before_import:
-        existing_teams = Team.objects.filter(circuit__in=season.circuits.all())
-        if delete_region:
-            existing_teams = existing_teams.filter(circuit__region=delete_region)
-        
-        team_count['deleted'] = existing_teams.count()
-        existing_teams.delete()
+    with transaction.atomic():
 
-    for entry in teams:
-        # Basic team object
-        
-        # Fix some region longhands to shorthand names
-        region = entry['circuit']
-        if region == 'All':
-            region = 'A'
+        # Clear out all old data
+        if delete_before_import:
+            existing_teams = Team.objects.filter(circuit__season=season)
+            if delete_region:
+                existing_teams = existing_teams.filter(
+                    circuit__region=delete_region)
 
-        circuit = season.circuits.filter(region=region, tier=entry['tier']).first()
-        
-        # There may be dummy teams with bogus circuits, skip if no circuit found
-        if not circuit:
-            continue
-        
-        team, created = Team.objects.get_or_create(
-            name__iexact=entry['team'], circuit=circuit)
-        
-        if created:        
-            team_count['created'] += 1
-            team.name = entry['team']
-            team.save()
-        else:
-            team_count['updated'] += 1
+            team_count['deleted'] = existing_teams.count()
 
-        # Add members to team
-        for member in entry['members']:
-            member = member[:254] # Only somewhat wacky names please
-            
-            player, created = Player.objects.get_or_create(name=member)
+            with defer_search_indexing():
+                existing_teams.delete()
 
-            if not team.members.filter(id=player.id).exists():
-                team.members.add(player)
+        circuits = {}
+        for circuit in season.circuits.order_by('pk'):
+            circuits.setdefault((circuit.region, circuit.tier), circuit)
 
-            
-            if created:
-                player_count['created'] += 1
+        rows = []
+        names = set()
+
+        for entry in teams:
+            # Fix some region longhands to shorthand names
+            region = entry['circuit']
+            if region == 'All':
+                region = 'A'
+
+            circuit = circuits.get((region, entry['tier']))
+
+            # There may be dummy teams with bogus circuits, skip if no circuit found
+            if not circuit:
+                team_count['skipped'] += 1
+                continue
+
+            # Only somewhat wacky names please
+            members = [member[:254] for member in entry['members']]
+            captain = entry.get('captain') or ''
+
+            rows.append((circuit, entry['team'], members, captain))
+            names.update(member.lower() for member in members)
+            names.add(captain.lower())
+
+        players = {}
+        matching_players = Player.objects.annotate(
+            lower_name=Lower('name')).filter(lower_name__in=names).order_by('pk')
+
+        for player in matching_players.only('id', 'name'):
+            players.setdefault(player.lower_name, player)
+
+        teams_by_key = {}
+        season_teams = Team.objects.filter(circuit__season=season).order_by('pk')
+
+        for team in season_teams.only('id', 'name', 'circuit', 'captain'):
+            teams_by_key.setdefault((team.circuit_id, team.name.lower()), team)
+
+        through = Team.members.through
+        memberships = set(through.objects.filter(
+            team__circuit__season=season).values_list('team_id', 'player_id'))
+
+        # Players
+        new_players = {}
+
+        for _, _, members, _ in rows:
+            for member in members:
+                if member.lower() not in players:
+                    player = Player(name=member)
+                    players[member.lower()] = new_players[member.lower()] = player
+
+        bulk_create_with_ids(
+            Player, new_players.values(), ['name'], batch_size)
+        player_count['created'] = len(new_players)
+
+        # Teams and captains
+        new_teams = {}
+        changed_teams = {}
+        resolved = []
+        now = timezone.now()
+
+        for circuit, name, members, captain in rows:
+            key = (circuit.id, name.lower())
+            captain = players.get(captain.lower())
+            captain_id = captain.id if captain else None
+
+            team = new_teams.get(key)
+            if team:
+                team.captain_id = captain_id
+
+            elif key not in teams_by_key:
+                team = new_teams[key] = Team(
+                    name=name, circuit=circuit, captain_id=captain_id)
+
+            else:
+                team = teams_by_key[key]
+                if team.captain_id != captain_id:
+                    team.captain_id = captain_id
+                    team.modified = now
+                    changed_teams[key] = team
+
+            resolved.append((key, team, members))
+
+        bulk_create_with_ids(
+            Team, new_teams.values(), ['circuit_id', 'name'], batch_size)
+        Team.objects.bulk_update(
+            changed_teams.values(), ['captain', 'modified'],
+            batch_size=batch_size
+        )
+        team_count['created'] = len(new_teams)
+
+        # Members
+        new_memberships = {}
+        updated_keys = set(changed_teams)
+
+        for key, team, members in resolved:
+            for member in members:
+                pair = (team.id, players[member.lower()].id)
+
+                if pair not in memberships and pair not in new_memberships:
+                    new_memberships[pair] = through(
+                        team_id=pair[0], player_id=pair[1])
+                    updated_keys.add(key)
+
+        through.objects.bulk_create(
+            new_memberships.values(), batch_size=batch_size,
+            ignore_conflicts=True
+        )
+
+        existing_keys = {key for key, _, _ in resolved if key not in new_teams}
+        team_count['updated'] = len(existing_keys & updated_keys)
+        team_count['unchanged'] = len(existing_keys - updated_keys)
+
+        # Bulk writes skip the signals that keep these up to date
+        index_objects(
+            SearchEntry.PLAYER, [player.id for player in new_players.values()])
+        index_objects(
+            SearchEntry.TEAM, [team.id for team in new_teams.values()])
+
+        if new_players or new_teams or changed_teams or new_memberships:
+            invalidate_api_cache()
 
-        # Assign captain player object
-        team.captain = Player.objects.filter(name=entry['captain']).first()
-        team.save()
-    
     return {'teams': team_count, 'players': player_count}
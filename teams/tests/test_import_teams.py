@@ -0,0 +1,137 @@
+from pytest import mark
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from buzz.services import iter_text_lines
+from leagues.tests.factories import CircuitFactory, SeasonFactory
+from players.models import Player
+from players.tests.factories import PlayerFactory
+from search.models import SearchEntry
+from teams.models import Team
+from teams.services import bulk_import_teams, parse_teams_csv
+from teams.tests.factories import TeamFactory
+
+TEAMS_CSV = (
+    'Tier,Circuit,Team,Match Wins,Matches Played,Set Wins,Captain,'
+    'all players,Playoff Seed,,,,P1,P2,P3,P4,P5,P6,P7\r\n'
+    '1,W,Bees,3,5,10,Alice,,1,,,,Alice,Bob,,,,,\r\n'
+    '2,E,Wasps,0,4,2,Carol,,2,,,,Carol,,,,,,\r\n'
+)
+
+
+def test_parse_teams_csv_streams_rows():
+    """
+    Teams are yielded one at a time from lines of CSV, each with its own
+    matches lost.
+    """
+    teams = parse_teams_csv(iter_text_lines([TEAMS_CSV[:50], TEAMS_CSV[50:]]))
+    first = next(teams)
+
+    assert first['team'] == 'Bees'
+    assert first['members'] == ['Alice', 'Bob']
+    assert first['matches_lost'] == '2'
+
+    rest = list(teams)
+    assert [team['team'] for team in rest] == ['Wasps']
+    assert rest[0]['matches_lost'] == '4'
+
+
+def _team(circuit, name, members, captain=None, region=None):
+    return {
+        'team': name,
+        'circuit': region or circuit.region,
+        'tier': circuit.tier,
+        'captain': captain or members[0],
+        'members': members,
+    }
+
+
+@mark.django_db
+def test_bulk_import_teams():
+    """
+    Teams and players are matched by name ignoring case, missing ones are
+    created, and captains and members are filled in.
+    """
+    season = SeasonFactory()
+    circuit = CircuitFactory(season=season, region='W', tier='1')
+    existing = TeamFactory(circuit=circuit, name='Killer Bees')
+    old_captain = existing.captain
+    alice = PlayerFactory(name='Alice')
+
+    rows = [
+        _team(circuit, 'killer bees', ['alice', 'Bob'], captain='Bob'),
+        _team(circuit, 'Wasps', ['Carol', 'ALICE']),
+        _team(circuit, 'Nowhere', ['Dave'], region='Z'),
+    ]
+
+    counts = bulk_import_teams(rows, season)
+
+    assert counts == {
+        'teams': {
+            'created': 1, 'updated': 1, 'unchanged': 0, 'deleted': 0,
+            'skipped': 1
+        },
+        'players': {'created': 2, 'updated': 0, 'deleted': 0},
+    }
+
+    existing.refresh_from_db()
+    assert existing.name == 'Killer Bees'
+    assert existing.captain.name == 'Bob'
+
+    # Members missing from the import stay on the team
+    assert set(existing.members.all()) == {
+        alice, existing.captain, old_captain}
+
+    wasps = Team.objects.get(name='Wasps')
+    assert wasps.circuit == circuit
+    assert wasps.captain == Player.objects.get(name='Carol')
+    assert set(wasps.members.all()) == {alice, wasps.captain}
+    assert not Player.objects.filter(name='Dave').exists()
+
+    # New names can be found through the search index
+    assert SearchEntry.objects.filter(
+        kind=SearchEntry.TEAM, object_id=wasps.id).exists()
+    assert SearchEntry.objects.filter(
+        kind=SearchEntry.PLAYER, name='Bob').exists()
+
+    with CaptureQueriesContext(connection) as context:
+        counts = bulk_import_teams(rows, season)
+
+    assert counts['teams']['unchanged'] == 2
+    assert not [
+        query for query in context.captured_queries
+        if query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))
+    ]
+
+
+@mark.django_db
+def test_bulk_import_teams_query_count():
+    """
+    The number of queries doesn't grow with the number of teams imported.
+    """
+    season = SeasonFactory()
+    circuit = CircuitFactory(season=season, region='W', tier='1')
+
+    def rows(start, count):
+        return [
+            _team(circuit, f'Team {n}', [f'Player {n} {m}' for m in range(5)])
+            for n in range(start, start + count)
+        ]
+
+    connection.queries_log.clear()
+    with CaptureQueriesContext(connection) as few:
+        bulk_import_teams(rows(0, 2), season)
+
+    with CaptureQueriesContext(connection) as many:
+        bulk_import_teams(rows(2, 40), season)
+
+    assert Team.objects.count() == 42
+    assert Team.members.through.objects.count() == 210
+
+    # Inserts are only split up by the database's limit on parameters
+    def reads(context):
+        return [
+            query for query in context.captured_queries
+            if not query['sql'].startswith('INSERT')
+        ]
+
+    assert len(reads(many)) == len(reads(few))
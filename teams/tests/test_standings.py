@@ -0,0 +1,150 @@
+from django.db import transaction
+from pytest import mark
+from matches.models import Result
+from matches.services import rebuild_team_standings
+from matches.signals import defer_standings_updates
+from matches.tests.factories import (
+    GameFactory, MatchFactory, ResultFactory, SetFactory)
+from teams.models import TeamStanding
+from api.tests.services import BuzzClient
+
+
+@mark.django_db(transaction=True)
+def test_standings_follow_result_writes():
+    """
+    Creating a Result, its Sets and Games updates both teams' standings.
+    """
+    result = ResultFactory()
+    home = result.match.home
+    away = result.match.away
+
+    game_set = SetFactory(result=result, winner=away, loser=home)
+    GameFactory(set=game_set)
+    GameFactory(set=game_set, number=2)
+
+    home.standing.refresh_from_db()
+    away.standing.refresh_from_db()
+
+    assert home.standing.match_wins == 1
+    assert home.standing.match_losses == 0
+    assert away.standing.match_losses == 1
+    assert away.standing.set_wins == 1
+    assert home.standing.set_losses == 1
+    assert away.standing.game_wins == 2
+    assert home.standing.game_losses == 2
+
+
+@mark.django_db(transaction=True)
+def test_standings_follow_result_changes_and_deletes():
+    """
+    Flipping a Result's winner or deleting it is reflected in standings.
+    """
+    result = ResultFactory()
+    home = result.match.home
+    away = result.match.away
+
+    result.winner, result.loser = away, home
+    result.save()
+
+    home.standing.refresh_from_db()
+    away.standing.refresh_from_db()
+    assert home.standing.match_wins == 0
+    assert away.standing.match_wins == 1
+
+    result.delete()
+
+    away.standing.refresh_from_db()
+    assert away.standing.match_wins == 0
+    assert away.standing.match_losses == 0
+
+
+@mark.django_db(transaction=True)
+def test_standings_count_forfeits():
+    """
+    Double forfeits count against both teams, single forfeits the loser.
+    """
+    match = MatchFactory()
+    Result.objects.create(
+        match=match, status=Result.DOUBLE_FORFEIT, winner=None, loser=None)
+
+    other_match = MatchFactory(circuit=match.circuit, home=match.home)
+    ResultFactory(match=other_match, status=Result.SINGLE_FORFEIT)
+
+    assert TeamStanding.objects.get(team=match.home).forfeits == 1
+    assert TeamStanding.objects.get(team=match.away).forfeits == 1
+    assert TeamStanding.objects.get(team=other_match.away).forfeits == 1
+
+
+@mark.django_db(transaction=True)
+def test_standings_update_once_per_transaction(monkeypatch):
+    """
+    Writes inside a transaction recalculate each group once, on commit.
+    """
+    calls = []
+    monkeypatch.setattr(
+        'matches.signals.update_team_standings',
+        lambda team_ids, groups: calls.append((set(team_ids), groups)))
+
+    with transaction.atomic():
+        result = ResultFactory()
+        home = result.match.home
+        away = result.match.away
+
+        game_set = SetFactory(result=result, winner=away, loser=home)
+        GameFactory(set=game_set, winner=away, loser=home)
+        GameFactory(set=game_set, number=2, winner=away, loser=home)
+
+        assert not calls
+
+    assert sorted(groups for _, groups in calls) == [
+        ['games'], ['matches'], ['sets']]
+
+    for team_ids, _ in calls:
+        assert team_ids == {home.id, away.id}
+
+
+@mark.django_db
+def test_deferred_standings_updates():
+    """
+    Standings changes inside defer_standings_updates are applied on exit.
+    """
+    with defer_standings_updates():
+        result = ResultFactory()
+        assert not TeamStanding.objects.filter(
+            team=result.match.home).exists()
+
+    assert TeamStanding.objects.get(team=result.match.home).match_wins == 1
+
+
+@mark.django_db
+def test_rebuild_team_standings():
+    """
+    Rebuilding from scratch recreates standings that have gone missing.
+    """
+    result = ResultFactory()
+    SetFactory(result=result)
+    TeamStanding.objects.all().delete()
+
+    rebuild_team_standings()
+
+    standing = TeamStanding.objects.get(team=result.match.home)
+    assert standing.match_wins == 1
+    assert standing.set_wins == 1
+
+
+@mark.django_db(transaction=True)
+def test_get_teams_reads_standings(django_app):
+    """
+    Team listing reports wins and losses from the standings table.
+    """
+    client = BuzzClient(django_app)
+    result = ResultFactory()
+
+    resp = client.teams(f'circuit={result.match.circuit.id}')
+    records = {
+        entry['id']: (entry['wins'], entry['losses'])
+        for entry in resp['results']
+    }
+
+    assert records[result.winner.id] == (1, 0)
+    assert records[result.loser.id] == (0, 1)